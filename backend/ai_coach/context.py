@@ -0,0 +1,110 @@
+import re
+
+from django.conf import settings
+
+from .intents import classify_intent
+from .models import Conversation, Message
+
+# Most recent messages sent to the model verbatim
+DEFAULT_CONTEXT_MESSAGES = 6
+# Upper bound on the whole prompt: profile, history and the new question
+DEFAULT_PROMPT_CHAR_BUDGET = 3000
+# Upper bound on the stored summary of older turns
+DEFAULT_SUMMARY_CHARS = 800
+# Longest single message quoted in the window
+MAX_TURN_CHARS = 400
+# Summary line length per folded message
+MAX_SUMMARY_LINE_CHARS = 120
+# Messages folded into the summary per request. Only a long thread seen for
+# the first time has more; its oldest turns are skipped rather than loaded.
+MAX_FOLDED_MESSAGES = 20
+
+_sentence_re = re.compile(r'(?<=[.!?])\s')
+_whitespace_re = re.compile(r'\s+')
+
+def clip(text, max_chars):
+    text = _whitespace_re.sub(' ', text).strip()
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars - 3].rstrip() + '...'
+
+def summarize_message(message):
+    """One summary line: the first sentence of a turn, tagged with the student's topic"""
+    first_sentence = _sentence_re.split(message.content.strip(), 1)[0]
+    if message.is_from_ai:
+        return clip(f'- Coach: {first_sentence}', MAX_SUMMARY_LINE_CHARS)
+    intent = classify_intent(message.content).intent
+    topic = f" ({intent.replace('_', ' ')})" if intent else ''
+    return clip(f'- Student{topic}: {first_sentence}', MAX_SUMMARY_LINE_CHARS)
+
+def trim_lines(lines, max_chars):
+    """The newest (last) lines that fit in `max_chars`, in their original order"""
+    kept = []
+    used = 0
+    for line in reversed(lines):
+        used += len(line) + 1
+        if used > max_chars:
+            break
+        kept.append(line)
+    kept.reverse()
+    return kept
+
+class ContextWindow:
+    """The last K messages of a conversation plus the summary of the turns before them"""
+
+    def __init__(self, summary, messages):
+        self.summary = summary
+        self.messages = messages
+
+    def render(self, max_chars):
+        """
+        Prompt text of at most `max_chars`. Recent turns take priority over
+        the summary, and newer turns over older ones.
+        """
+        turns = trim_lines([
+            f"{'AI Coach' if message.is_from_ai else 'Student'}: {clip(message.content, MAX_TURN_CHARS)}"
+            for message in self.messages
+        ], max_chars)
+        remaining = max_chars - sum(len(turn) + 1 for turn in turns)
+
+        header = 'Earlier in this conversation:'
+        summary = trim_lines(self.summary.splitlines(), remaining - len(header) - 1) if self.summary else []
+        lines = ([header] + summary if summary else []) + turns
+        return ''.join(f'\n{line}' for line in lines)
+
+def build_context_window(conversation, before_id):
+    """
+    Load the prompt history of `conversation` preceding message `before_id`.
+
+    At most AI_COACH_CONTEXT_MESSAGES recent messages are read, and the
+    messages that have dropped out of that window since the last call are
+    folded into the conversation's stored summary, so the cost does not
+    grow with the length of the conversation.
+    """
+    size = getattr(settings, 'AI_COACH_CONTEXT_MESSAGES', DEFAULT_CONTEXT_MESSAGES)
+    history = conversation.messages.filter(
+        status=Message.STATUS_COMPLETE, id__lt=before_id
+    ).only('id', 'conversation', 'content', 'is_from_ai', 'timestamp').order_by('-timestamp', '-id')
+
+    recent = list(history[:size])
+    recent.reverse()
+    if not recent:
+        return ContextWindow(conversation.summary, recent)
+
+    dropped = list(history.filter(
+        id__gt=conversation.summarized_through, id__lt=recent[0].id
+    )[:MAX_FOLDED_MESSAGES])
+    if dropped:
+        dropped.reverse()
+        summary_chars = getattr(settings, 'AI_COACH_SUMMARY_CHARS', DEFAULT_SUMMARY_CHARS)
+        lines = conversation.summary.splitlines() + [summarize_message(message) for message in dropped]
+        summary = '\n'.join(trim_lines(lines, summary_chars))
+        summarized_through = max(message.id for message in dropped)
+        # Concurrent replies in one conversation may fold the same turns; only one wins
+        Conversation.objects.filter(
+            id=conversation.id, summarized_through=conversation.summarized_through
+        ).update(summary=summary, summarized_through=summarized_through)
+        conversation.summary = summary
+        conversation.summarized_through = summarized_through
+
+    return ContextWindow(conversation.summary, recent)
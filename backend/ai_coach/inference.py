@@ -0,0 +1,243 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INFERENCE_URL = "https://api-inference.huggingface.co/models/microsoft/DialoGPT-medium"
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 20
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.5
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_RESET = 30
+
+# Upstream statuses worth another attempt; anything else is final
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After `failure_threshold` failures in a row the circuit opens and calls
+    are refused for `reset_timeout` seconds. Then a single trial call is let
+    through (half-open): success closes the circuit, failure re-opens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=DEFAULT_BREAKER_THRESHOLD, reset_timeout=DEFAULT_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """Whether a call may go upstream now"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            # Half-open: only one trial call at a time
+            if self._trial_running:
+                return False
+            self._state = self.HALF_OPEN
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info('Inference circuit closed')
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning('Inference circuit opened after %s failures', self._failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+class InferenceMetrics:
+    """Per-process counters for the inference client"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.latency_total_ms = 0.0
+        self.latency_max_ms = 0.0
+        self.last_error = None
+
+    def record_attempt(self, latency_ms, ok, error=None, timed_out=False):
+        with self._lock:
+            self.requests += 1
+            self.latency_total_ms += latency_ms
+            self.latency_max_ms = max(self.latency_max_ms, latency_ms)
+            if ok:
+                self.successes += 1
+            else:
+                self.failures += 1
+                self.last_error = error
+                if timed_out:
+                    self.timeouts += 1
+
+    def increment(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'successes': self.successes,
+                'failures': self.failures,
+                'timeouts': self.timeouts,
+                'retries': self.retries,
+                'short_circuited': self.short_circuited,
+                'error_rate': self.failures / self.requests if self.requests else 0.0,
+                'latency_avg_ms': self.latency_total_ms / self.requests if self.requests else 0.0,
+                'latency_max_ms': self.latency_max_ms,
+                'last_error': self.last_error,
+            }
+
+class InferenceClient:
+    """
+    HTTP client for the text generation backend.
+
+    Connections are pooled on one `requests.Session`, every attempt is bounded
+    by connect/read timeouts, failed attempts are retried a bounded number of
+    times with jittered exponential backoff, and a circuit breaker refuses
+    calls outright while the backend keeps failing. `generate()` returns None
+    whenever no reply could be had, so callers fall back immediately.
+    """
+
+    def __init__(self, url, token=None, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, breaker=None, pool_size=10):
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = InferenceMetrics()
+
+        self.session = requests.Session()
+        # Retries are done here, so the adapter must not retry on its own
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if token:
+            self.session.headers['Authorization'] = f'Bearer {token}'
+
+    def generate(self, payload):
+        """POST `payload` and return the decoded JSON body, or None"""
+        if not self.breaker.allow():
+            self.metrics.increment('short_circuited')
+            return None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.metrics.increment('retries')
+                # Full jitter keeps workers from retrying in lockstep
+                time.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+
+            started = time.perf_counter()
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                self.metrics.record_attempt(
+                    (time.perf_counter() - started) * 1000, ok=False,
+                    error=type(e).__name__, timed_out=isinstance(e, requests.Timeout)
+                )
+                continue
+            latency_ms = (time.perf_counter() - started) * 1000
+
+            if response.status_code == 200:
+                try:
+                    result = response.json()
+                except ValueError:
+                    self.metrics.record_attempt(latency_ms, ok=False, error='invalid JSON')
+                    break
+                self.metrics.record_attempt(latency_ms, ok=True)
+                self.breaker.record_success()
+                return result
+
+            self.metrics.record_attempt(latency_ms, ok=False, error=f'HTTP {response.status_code}')
+            if response.status_code not in RETRY_STATUSES:
+                break
+
+        self.breaker.record_failure()
+        return None
+
+    def status(self):
+        return {
+            'url': self.url,
+            'breaker_state': self.breaker.state,
+            **self.metrics.snapshot(),
+        }
+
+_client = None
+_client_config = None
+_client_lock = threading.Lock()
+
+def _config_from_settings(token):
+    return (
+        getattr(settings, 'AI_COACH_INFERENCE_URL', DEFAULT_INFERENCE_URL),
+        token,
+        getattr(settings, 'AI_COACH_INFERENCE_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT),
+        getattr(settings, 'AI_COACH_INFERENCE_TIMEOUT', DEFAULT_READ_TIMEOUT),
+        getattr(settings, 'AI_COACH_INFERENCE_RETRIES', DEFAULT_RETRIES),
+        getattr(settings, 'AI_COACH_INFERENCE_BACKOFF', DEFAULT_BACKOFF),
+        getattr(settings, 'AI_COACH_BREAKER_THRESHOLD', DEFAULT_BREAKER_THRESHOLD),
+        getattr(settings, 'AI_COACH_BREAKER_RESET', DEFAULT_BREAKER_RESET),
+    )
+
+def get_inference_client(token=None):
+    """Process-wide inference client; rebuilt only when its settings change"""
+    global _client, _client_config
+    config = _config_from_settings(token)
+    with _client_lock:
+        if _client is None or _client_config != config:
+            url, token, connect_timeout, read_timeout, retries, backoff, threshold, reset = config
+            _client = InferenceClient(
+                url, token=token,
+                connect_timeout=connect_timeout, read_timeout=read_timeout,
+                retries=retries, backoff=backoff,
+                breaker=CircuitBreaker(threshold, reset),
+                pool_size=getattr(settings, 'AI_COACH_REPLY_WORKERS', 4),
+            )
+            _client_config = config
+        return _client
+
+def get_inference_status():
+    """Counters of the current client, or None before the first call"""
+    with _client_lock:
+        return _client.status() if _client is not None else None
@@ -0,0 +1,112 @@
+import re
+from collections import namedtuple
+
+from nltk.stem import PorterStemmer
+
+IntentMatch = namedtuple('IntentMatch', ['intent', 'confidence', 'scores'])
+
+NO_MATCH = IntentMatch(None, 0.0, {})
+
+# Each intent maps keywords (single words or short phrases) to a weight.
+# Keywords are stemmed, so list one form per word: 'career' also matches
+# 'careers', 'study' matches 'studying'. Matching is by whole token, so
+# 'work' does not fire on 'homework'. Declaration order breaks ties.
+INTENTS = {
+    'career': {
+        'career': 1.0, 'job': 1.0, 'work': 1.0, 'profession': 1.0,
+        'occupation': 1.0, 'employment': 1.0, 'salary': 1.0, 'become': 0.5,
+    },
+    'study': {
+        'study': 1.0, 'learn': 1.0, 'exam': 1.0, 'revision': 1.0, 'revise': 1.0,
+        'homework': 1.0, 'notes': 0.5, 'concentrate': 1.0, 'memorize': 1.0,
+    },
+    'motivation': {
+        'motivate': 1.0, 'encourage': 1.0, 'stressed': 1.0, 'tired': 1.0,
+        'anxious': 1.0, 'overwhelmed': 1.0, 'bored': 1.0, 'lazy': 1.0,
+        'give up': 1.5, 'hopeless': 1.0,
+    },
+    'subjects': {
+        'subject': 1.0, 'combination': 1.0, 'elective': 1.0, 'drop': 0.5,
+        'biology': 0.5, 'chemistry': 0.5, 'physics': 0.5, 'mathematics': 0.5,
+        'maths': 0.5, 'geography': 0.5, 'history': 0.5, 'cre': 0.5,
+        'business studies': 1.5, 'agriculture': 0.5, 'computer studies': 1.5,
+    },
+    'kcse_grades': {
+        'kcse': 1.0, 'grade': 1.0, 'mean grade': 2.0, 'marks': 0.5,
+        'results': 0.5, 'aggregate': 1.0, 'pass': 0.5, 'fail': 0.5,
+    },
+    'cluster_points': {
+        'cluster': 1.5, 'cluster points': 2.5, 'kuccps': 2.0, 'cut off': 1.5,
+        'cutoff': 1.5, 'weighted': 1.0, 'university': 0.5, 'placement': 1.0,
+        'points': 0.5,
+    },
+}
+
+_token_re = re.compile(r'[a-z0-9]+')
+_stemmer = PorterStemmer()
+
+# Stemming is the slow part; chat vocabulary is small, so memoise it
+_stems = {}
+MAX_CACHED_STEMS = 50000
+
+def _stem(token):
+    stem = _stems.get(token)
+    if stem is None:
+        stem = _stemmer.stem(token)
+        if len(_stems) < MAX_CACHED_STEMS:
+            _stems[token] = stem
+    return stem
+
+def tokenize(text):
+    """Lower-cased, stemmed word tokens"""
+    cached = _stems.get
+    return [cached(token) or _stem(token) for token in _token_re.findall(text.lower())]
+
+class IntentClassifier:
+    """
+    Keyword-index intent classifier.
+
+    Keywords of every intent are stemmed once into dicts keyed by stem, so
+    classifying a message costs a couple of dict lookups per token however
+    many intents and keywords are registered.
+    Confidence is the winning intent's share of all matched weight.
+    """
+
+    def __init__(self, intents):
+        self.intents = tuple(intents)
+        self.order = {intent: i for i, intent in enumerate(self.intents)}
+        # stem -> ((intent, weight), ...) for single words
+        self.words = {}
+        # first stem -> ((rest of phrase, intent, weight), ...) for phrases
+        self.phrases = {}
+        for intent, keywords in intents.items():
+            for keyword, weight in keywords.items():
+                stems = tokenize(keyword)
+                if len(stems) == 1:
+                    self.words.setdefault(stems[0], []).append((intent, weight))
+                else:
+                    self.phrases.setdefault(stems[0], []).append((tuple(stems[1:]), intent, weight))
+
+    def classify(self, message):
+        tokens = tokenize(message)
+        scores = {}
+        words, phrases = self.words, self.phrases
+        for i, token in enumerate(tokens):
+            for intent, weight in words.get(token, ()):
+                scores[intent] = scores.get(intent, 0.0) + weight
+            # Phrases are only tried from a token that can start one
+            for rest, intent, weight in phrases.get(token, ()):
+                if tuple(tokens[i + 1:i + 1 + len(rest)]) == rest:
+                    scores[intent] = scores.get(intent, 0.0) + weight
+
+        if not scores:
+            return NO_MATCH
+        order = self.order
+        best = min(scores, key=lambda intent: (-scores[intent], order[intent]))
+        return IntentMatch(best, scores[best] / sum(scores.values()), scores)
+
+intent_classifier = IntentClassifier(INTENTS)
+
+def classify_intent(message):
+    """Return IntentMatch(intent, confidence, scores); intent is None when nothing matched"""
+    return intent_classifier.classify(message)
@@ -0,0 +1,83 @@
+import time
+
+from django.core.management.base import BaseCommand
+from ai_coach.intents import INTENTS, IntentClassifier, classify_intent
+
+SAMPLE_MESSAGES = [
+    'What career suits my personality?',
+    'How do I study for KCSE chemistry?',
+    'I have too much homework and I feel tired',
+    'Which subject combination should I pick for engineering?',
+    'What mean grade do I need for medicine?',
+    'How are cluster points calculated by KUCCPS?',
+    'I am so stressed about exams',
+    'Can you encourage me? I want to give up',
+    'Which jobs pay well in Kenya?',
+    'hello, who are you?',
+]
+
+def legacy_classify(message):
+    """The original substring scans of AICoachService._generate_rule_based_response"""
+    message_lower = message.lower()
+    if any(word in message_lower for word in ['career', 'job', 'work', 'profession']):
+        return 'career'
+    elif any(word in message_lower for word in ['study', 'learn', 'exam', 'subject']):
+        return 'study'
+    elif any(word in message_lower for word in ['motivate', 'encourage', 'stressed', 'tired']):
+        return 'motivation'
+    return None
+
+def substring_scanner(intents):
+    """The same substring scans extended to every keyword of `intents`"""
+    def scan(message):
+        message_lower = message.lower()
+        for intent, keywords in intents.items():
+            if any(keyword in message_lower for keyword in keywords):
+                return intent
+        return None
+    return scan
+
+class Command(BaseCommand):
+    help = 'Benchmark the keyword-index intent classifier against the original substring scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000,
+                            help='Passes over the sample messages per classifier')
+        parser.add_argument('--extra-intents', type=int, default=50,
+                            help='Synthetic intents (10 keywords each) added to show how cost scales')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        extended = {
+            **INTENTS,
+            **{f'extra_{i}': {f'keyword{i}x{j}': 1.0 for j in range(10)}
+               for i in range(options['extra_intents'])},
+        }
+        classifiers = (
+            ('substring', 'original', legacy_classify),
+            ('substring', len(INTENTS), substring_scanner(INTENTS)),
+            ('index', len(INTENTS), classify_intent),
+            ('substring', len(extended), substring_scanner(extended)),
+            ('index', len(extended), IntentClassifier(extended).classify),
+        )
+
+        self.stdout.write(f"{'classifier':>10} {'intents':>9} {'us/message':>11} {'messages/sec':>13}")
+        for name, intents, classify in classifiers:
+            started = time.perf_counter()
+            for _ in range(iterations):
+                for message in SAMPLE_MESSAGES:
+                    classify(message)
+            elapsed = time.perf_counter() - started
+            calls = iterations * len(SAMPLE_MESSAGES)
+            self.stdout.write(
+                f'{name:>10} {intents:>9} {elapsed / calls * 1e6:>11.2f} {calls / elapsed:>13.0f}'
+            )
+
+        self.stdout.write('')
+        self.stdout.write(f"{'message':<60} {'substring':>10} {'index':>15}")
+        for message in SAMPLE_MESSAGES:
+            match = classify_intent(message)
+            self.stdout.write(
+                f'{message:<60} {legacy_classify(message) or "-":>10} '
+                f'{match.intent or "-":>15} ({match.confidence:.2f})'
+            )
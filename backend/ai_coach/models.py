@@ -4,6 +4,10 @@ from users.models import StudentProfile
 class Conversation(models.Model):
     student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
+    # Rolling digest of the turns that have left the prompt's context window
+    summary = models.TextField(blank=True)
+    # Id of the newest message folded into `summary`
+    summarized_through = models.PositiveBigIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -11,13 +15,27 @@ class Conversation(models.Model):
         return f"{self.title} - {self.student.user.username}"
 
 class Message(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_COMPLETE = 'complete'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_COMPLETE, 'Complete'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages')
     content = models.TextField()
     is_from_ai = models.BooleanField(default=False)
+    # AI replies are created pending and filled in by a reply worker
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_COMPLETE)
     timestamp = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['conversation', '-timestamp']),
+        ]
 
 class CoachingPlan(models.Model):
     student = models.OneToOneField(StudentProfile, on_delete=models.CASCADE)
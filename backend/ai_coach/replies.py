@@ -0,0 +1,128 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from analytics.events import track_event
+from analytics.models import Event
+from .context import build_context_window
+from .models import Message
+from .services import AICoachService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPLY_WORKERS = 4
+# Replies queued beyond this many per worker get the rule-based answer straight away
+DEFAULT_MAX_QUEUED_REPLIES = 16
+# A reply still pending after this many seconds is given up on, e.g. because
+# the process running its worker was restarted
+DEFAULT_REPLY_TIMEOUT = 120
+
+FAILED_REPLY = "Sorry, I couldn't come up with a reply just now. Please try again."
+
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            workers = getattr(settings, 'AI_COACH_REPLY_WORKERS', DEFAULT_REPLY_WORKERS)
+            max_queued = getattr(settings, 'AI_COACH_MAX_QUEUED_REPLIES', DEFAULT_MAX_QUEUED_REPLIES * workers)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ai-coach-reply')
+            _slots = threading.BoundedSemaphore(workers + max_queued)
+        return _executor, _slots
+
+def start_reply(conversation, message_content):
+    """
+    Save the student's message and a pending AI reply, and hand the reply
+    to the worker pool. Returns (user_message, ai_message) without waiting.
+    """
+    with transaction.atomic():
+        user_message = Message.objects.create(
+            conversation=conversation,
+            content=message_content,
+            is_from_ai=False
+        )
+        ai_message = Message.objects.create(
+            conversation=conversation,
+            content='',
+            is_from_ai=True,
+            status=Message.STATUS_PENDING
+        )
+        # Workers use their own connection, so only queue once the rows are visible
+        transaction.on_commit(lambda: enqueue_reply(ai_message.id, message_content, user_message.id))
+        transaction.on_commit(lambda: track_event(
+            Event.COACH_MESSAGE_SENT, conversation.student_id, len(message_content),
+            conversation_id=conversation.id
+        ))
+    return user_message, ai_message
+
+def enqueue_reply(ai_message_id, message_content, question_id=None):
+    if not getattr(settings, 'AI_COACH_ASYNC_REPLIES', True):
+        generate_reply(ai_message_id, message_content, question_id)
+        return
+
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        # The pool is saturated: answer without the model rather than queue forever
+        logger.warning('AI coach reply queue full; using rule-based reply for message %s', ai_message_id)
+        generate_reply(ai_message_id, message_content, question_id, use_model=False)
+        return
+    executor.submit(_run_reply, slots, ai_message_id, message_content, question_id)
+
+def _run_reply(slots, ai_message_id, message_content, question_id):
+    close_old_connections()
+    try:
+        generate_reply(ai_message_id, message_content, question_id)
+    finally:
+        slots.release()
+        # Pool threads are long-lived; don't leave their connections open
+        connection.close()
+
+def generate_reply(ai_message_id, message_content, question_id=None, use_model=True):
+    """
+    Fill in a pending AI message; the message is never left pending.
+    `question_id` is the student's message being answered, which the prompt
+    history stops before.
+    """
+    ai_message = Message.objects.select_related('conversation__student').get(id=ai_message_id)
+    try:
+        coach_service = AICoachService(ai_message.conversation.student)
+        if use_model:
+            content = coach_service.generate_ai_response(
+                message_content,
+                conversation_history=build_context_window(
+                    ai_message.conversation, before_id=question_id or ai_message.id
+                )
+            )
+        else:
+            content = coach_service._generate_rule_based_response(message_content)
+        status = Message.STATUS_COMPLETE
+    except Exception:
+        logger.exception('AI coach reply %s failed', ai_message_id)
+        content = FAILED_REPLY
+        status = Message.STATUS_FAILED
+
+    Message.objects.filter(id=ai_message_id, status=Message.STATUS_PENDING).update(
+        content=content, status=status
+    )
+
+def expire_stale_reply(message):
+    """Mark a reply that has been pending for too long as failed"""
+    if message.status != Message.STATUS_PENDING:
+        return message
+    timeout = getattr(settings, 'AI_COACH_REPLY_TIMEOUT', DEFAULT_REPLY_TIMEOUT)
+    if message.timestamp > timezone.now() - timedelta(seconds=timeout):
+        return message
+
+    Message.objects.filter(id=message.id, status=Message.STATUS_PENDING).update(
+        content=FAILED_REPLY, status=Message.STATUS_FAILED
+    )
+    message.refresh_from_db(fields=['content', 'status'])
+    return message
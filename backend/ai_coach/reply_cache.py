@@ -0,0 +1,114 @@
+import hashlib
+import re
+import threading
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_REPLY_CACHE_TTL = 60 * 60 * 6
+# How long a request waits for an identical in-flight prompt before giving up
+DEFAULT_SINGLEFLIGHT_WAIT = 30
+
+_punctuation_re = re.compile(r'[^\w\s]')
+_whitespace_re = re.compile(r'\s+')
+
+def normalize_message(message):
+    """Fold case, Unicode forms, punctuation and spacing"""
+    text = unicodedata.normalize('NFKC', message).casefold()
+    text = _punctuation_re.sub(' ', text)
+    return _whitespace_re.sub(' ', text).strip()
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.reply = None
+
+class ReplyCache:
+    """
+    Cache of first-turn upstream model replies, keyed by the student's
+    personality type, learning style and normalized message. Callers only
+    cache prompts built from exactly those, never ones carrying conversation
+    history or other per-student text.
+
+    Replies live in the Django cache alias AI_COACH_REPLY_CACHE (default
+    'default') for AI_COACH_REPLY_CACHE_TTL seconds; eviction beyond that is
+    the backend's LRU (LocMemCache culls least recently used entries at
+    MAX_ENTRIES, Redis with an allkeys-lru policy). Concurrent misses for the
+    same key within a process share a single upstream call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stores = 0
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'AI_COACH_REPLY_CACHE', 'default')]
+
+    @staticmethod
+    def make_key(mbti_type, learning_style, message):
+        """Key of a first-turn prompt: the student's profile and the normalized message"""
+        digest = hashlib.sha1(f'{mbti_type}\0{learning_style}\0{normalize_message(message)}'.encode()).hexdigest()
+        return f'ai_coach:reply:{digest}'
+
+    def get_or_generate(self, key, generate):
+        """
+        Return the cached reply for `key`, or call `generate()` once for all
+        concurrent callers. Falsy results (no upstream reply) are not cached.
+        """
+        reply = self.cache.get(key)
+        if reply is not None:
+            self._count('hits')
+            return reply
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        if not leader:
+            self._count('coalesced')
+            flight.done.wait(getattr(settings, 'AI_COACH_REPLY_SINGLEFLIGHT_WAIT', DEFAULT_SINGLEFLIGHT_WAIT))
+            return flight.reply
+
+        try:
+            # A previous leader may have stored the reply since our lookup
+            reply = self.cache.get(key)
+            if reply is not None:
+                self._count('hits')
+            else:
+                self._count('misses')
+                reply = generate()
+                if reply:
+                    self.cache.set(key, reply, getattr(settings, 'AI_COACH_REPLY_CACHE_TTL', DEFAULT_REPLY_CACHE_TTL))
+                    self._count('stores')
+            flight.reply = reply
+            return reply
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'stores': self.stores,
+                'hit_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                'in_flight': len(self._inflight),
+            }
+
+reply_cache = ReplyCache()
@@ -7,8 +7,8 @@ from recommendations.models import LearningStyle
 class MessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
-        fields = ['id', 'content', 'is_from_ai', 'timestamp']
-        read_only_fields = ['is_from_ai', 'timestamp']
+        fields = ['id', 'content', 'is_from_ai', 'status', 'timestamp']
+        read_only_fields = ['is_from_ai', 'status', 'timestamp']
 
 class ConversationSerializer(serializers.ModelSerializer):
     messages = MessageSerializer(many=True, read_only=True)
@@ -18,6 +18,16 @@ class ConversationSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'student', 'messages', 'created_at', 'updated_at']
         read_only_fields = ['student', 'created_at', 'updated_at']
 
+class ConversationSummarySerializer(serializers.ModelSerializer):
+    """List entry for a conversation; its messages are paged separately"""
+    # Annotated by ConversationViewSet.get_queryset
+    message_count = serializers.IntegerField(read_only=True)
+    last_message_preview = serializers.CharField(read_only=True, allow_null=True)
+    
+    class Meta:
+        model = Conversation
+        fields = ['id', 'title', 'message_count', 'last_message_preview', 'created_at', 'updated_at']
+
 class ChatMessageSerializer(serializers.Serializer):
     """Serializer for chat message input"""
     message = serializers.CharField(max_length=1000)
@@ -1,12 +1,46 @@
-import requests
 import json
 import os
 from django.conf import settings
 from django.core.cache import cache
 from assessments.models import AssessmentResult
 from recommendations.models import LearningStyle
+from .context import DEFAULT_PROMPT_CHAR_BUDGET, clip
+from .inference import DEFAULT_INFERENCE_URL, get_inference_client
+from .reply_cache import reply_cache
+from .intents import classify_intent
+
+# MBTI to learning style mapping
+LEARNING_STYLE_BY_MBTI = {
+    'INTJ': 'reading',    # Prefer structured, theoretical learning
+    'INTP': 'reading',    # Enjoy independent research
+    'ENTJ': 'visual',     # Like big picture and diagrams
+    'ENTP': 'kinesthetic',# Learn by doing and experimenting
+    'INFJ': 'reading',    # Prefer meaningful, conceptual learning
+    'INFP': 'reading',    # Enjoy creative and independent study
+    'ENFJ': 'auditory',   # Learn well through discussion
+    'ENFP': 'kinesthetic',# Prefer interactive learning
+    'ISTJ': 'reading',    # Like structured, sequential learning
+    'ISFJ': 'reading',    # Prefer practical, hands-on with structure
+    'ESTJ': 'visual',     # Like organized, factual presentations
+    'ESFJ': 'auditory',   # Learn well in social settings
+    'ISTP': 'kinesthetic',# Prefer learning through hands-on experience
+    'ISFP': 'kinesthetic',# Learn by doing and experiencing
+    'ESTP': 'kinesthetic',# Prefer active, practical learning
+    'ESFP': 'kinesthetic',# Learn through interaction and experience
+}
+DEFAULT_LEARNING_STYLE = 'reading'
 
 class AICoachService:
+    # Intent (see ai_coach.intents) -> method producing the fallback reply
+    INTENT_RESPONDERS = {
+        'career': '_generate_career_advice',
+        'study': '_generate_study_advice',
+        'motivation': '_generate_motivational_message',
+        'subjects': '_generate_subject_advice',
+        'kcse_grades': '_generate_grade_advice',
+        'cluster_points': '_generate_cluster_points_advice',
+    }
+    
     def __init__(self, student):
         self.student = student
         self.assessment_result = AssessmentResult.objects.get(student=student)
@@ -14,40 +48,30 @@ class AICoachService:
         
     def get_learning_style_recommendation(self):
         """Determine learning style based on personality"""
-        # MBTI to learning style mapping
-        learning_style_map = {
-            'INTJ': 'reading',    # Prefer structured, theoretical learning
-            'INTP': 'reading',    # Enjoy independent research
-            'ENTJ': 'visual',     # Like big picture and diagrams
-            'ENTP': 'kinesthetic',# Learn by doing and experimenting
-            'INFJ': 'reading',    # Prefer meaningful, conceptual learning
-            'INFP': 'reading',    # Enjoy creative and independent study
-            'ENFJ': 'auditory',   # Learn well through discussion
-            'ENFP': 'kinesthetic',# Prefer interactive learning
-            'ISTJ': 'reading',    # Like structured, sequential learning
-            'ISFJ': 'reading',    # Prefer practical, hands-on with structure
-            'ESTJ': 'visual',     # Like organized, factual presentations
-            'ESFJ': 'auditory',   # Learn well in social settings
-            'ISTP': 'kinesthetic',# Prefer learning through hands-on experience
-            'ISFP': 'kinesthetic',# Learn by doing and experiencing
-            'ESTP': 'kinesthetic',# Prefer active, practical learning
-            'ESFP': 'kinesthetic',# Learn through interaction and experience
-        }
-        
-        recommended_style = learning_style_map.get(
-            self.personality_type.mbti_type, 
-            'reading'  # Default fallback
-        )
-        
-        return LearningStyle.objects.get(name=recommended_style)
+        return LearningStyle.objects.get(name=self.get_learning_style_name())
+    
+    def get_learning_style_name(self):
+        """Name of the learning style suited to the student's personality"""
+        return LEARNING_STYLE_BY_MBTI.get(self.personality_type.mbti_type, DEFAULT_LEARNING_STYLE)
     
     def generate_ai_response(self, message, conversation_history=None):
         """
         Generate AI response using free API (Hugging Face Inference API)
         Fallback to rule-based if API fails
         """
-        # Try Hugging Face API first (free tier available)
-        ai_response = self._try_hugging_face_api(message, conversation_history)
+        context, question = self._build_prompt(message, conversation_history)
+        # Try Hugging Face API first (free tier available). Only first-turn
+        # replies are shared: their prompt is built from the personality type
+        # and learning style alone, so students with the same profile asking
+        # the same question reuse one. Follow-ups depend on the history and
+        # are always generated.
+        if self._is_first_turn(conversation_history):
+            ai_response = reply_cache.get_or_generate(
+                reply_cache.make_key(self.personality_type.mbti_type, self.get_learning_style_name(), message),
+                lambda: self._try_hugging_face_api(context + question)
+            )
+        else:
+            ai_response = self._try_hugging_face_api(context + question)
         
         if not ai_response:
             # Fallback to rule-based response
@@ -55,20 +79,33 @@ class AICoachService:
         
         return ai_response
     
-    def _try_hugging_face_api(self, message, conversation_history):
+    @staticmethod
+    def _is_first_turn(conversation_history):
+        """Whether no earlier turns (or summary of them) precede the message"""
+        return conversation_history is None or not (conversation_history.messages or conversation_history.summary)
+    
+    def _build_prompt(self, message, conversation_history):
+        """(context, question) of the prompt; the context ends with the rendered history"""
+        # The recent turns and the summary of older ones share whatever the
+        # character budget leaves over. First turns get the shared profile
+        # context only, since their replies are cached across students.
+        first_turn = self._is_first_turn(conversation_history)
+        context = self._build_conversation_context(conversation_history, personal=not first_turn)
+        question = f"\nStudent: {clip(message, 1000)}\nAI Coach:"
+        if not first_turn:
+            budget = getattr(settings, 'AI_COACH_PROMPT_CHAR_BUDGET', DEFAULT_PROMPT_CHAR_BUDGET)
+            context += conversation_history.render(budget - len(context) - len(question))
+        return context, question
+    
+    def _try_hugging_face_api(self, full_prompt):
         """Use Hugging Face Inference API with a small model"""
         try:
-            # You'll need to create a free account and get an API token
+            # You'll need to create a free account and get an API token.
+            # A self-hosted or stub model server can be used without one.
             API_TOKEN = os.getenv('HUGGINGFACE_API_TOKEN')
-            if not API_TOKEN:
+            API_URL = getattr(settings, 'AI_COACH_INFERENCE_URL', DEFAULT_INFERENCE_URL)
+            if not API_TOKEN and API_URL == DEFAULT_INFERENCE_URL:
                 return None
-                
-            API_URL = "https://api-inference.huggingface.co/models/microsoft/DialoGPT-medium"
-            headers = {"Authorization": f"Bearer {API_TOKEN}"}
-            
-            # Prepare conversation context
-            context = self._build_conversation_context(conversation_history)
-            full_prompt = f"{context}\nStudent: {message}\nAI Coach:"
             
             payload = {
                 "inputs": full_prompt,
@@ -78,16 +115,17 @@ class AICoachService:
                     "do_sample": True,
                 },
                 "options": {
-                    "wait_for_model": True
+                    # A loading model answers 503 at once, which the client
+                    # retries with backoff instead of holding the connection
+                    "wait_for_model": False
                 }
             }
             
-            response = requests.post(API_URL, headers=headers, json=payload)
+            # Pooled, time-bounded and short-circuited while the backend is down
+            result = get_inference_client(API_TOKEN).generate(payload)
             
-            if response.status_code == 200:
-                result = response.json()
-                if isinstance(result, list) and len(result) > 0:
-                    return result[0].get('generated_text', '').split('AI Coach:')[-1].strip()
+            if isinstance(result, list) and len(result) > 0:
+                return result[0].get('generated_text', '').split('AI Coach:')[-1].strip()
             
             return None
             
@@ -95,14 +133,22 @@ class AICoachService:
             print(f"Hugging Face API error: {e}")
             return None
     
-    def _build_conversation_context(self, conversation_history):
-        """Build context for the AI based on student profile"""
+    def _build_conversation_context(self, conversation_history, personal=True):
+        """
+        Build context for the AI based on student profile; history is rendered
+        separately. Without `personal` the student's own career aspirations
+        are left out, so the context is the same for every student of the
+        personality type.
+        """
+        interests = ''
+        if personal:
+            interests = f"\n        - Career Interests: {self.student.career_aspirations[:100] if self.student.career_aspirations else 'Not specified'}"
         context = f"""
         You are an AI career and academic coach for Kenyan students.
         Student Profile:
         - Personality Type: {self.personality_type.mbti_type} ({self.personality_type.name})
         - Strengths: {self.personality_type.strengths[:200]}
-        - Career Interests: {self.student.career_aspirations[:100] if self.student.career_aspirations else 'Not specified'}
+        - Learning Style: {self.get_learning_style_name()}{interests}
         
         Your role is to provide:
         1. Career guidance based on personality and Kenyan market
@@ -118,23 +164,13 @@ class AICoachService:
     
     def _generate_rule_based_response(self, message):
         """Fallback rule-based response system"""
-        message_lower = message.lower()
-        
-        # Career-related queries
-        if any(word in message_lower for word in ['career', 'job', 'work', 'profession']):
-            return self._generate_career_advice()
-        
-        # Study-related queries
-        elif any(word in message_lower for word in ['study', 'learn', 'exam', 'subject']):
-            return self._generate_study_advice()
-        
-        # Motivation-related queries
-        elif any(word in message_lower for word in ['motivate', 'encourage', 'stressed', 'tired']):
-            return self._generate_motivational_message()
+        match = classify_intent(message)
+        responder = self.INTENT_RESPONDERS.get(match.intent)
+        if responder:
+            return getattr(self, responder)()
         
         # Default response
-        else:
-            return "I understand you're looking for guidance. Could you tell me more about what specific area you'd like help with - career choices, study strategies, or personal development?"
+        return "I understand you're looking for guidance. Could you tell me more about what specific area you'd like help with - career choices, study strategies, or personal development?"
     
     def _generate_career_advice(self):
         """Generate career advice based on personality"""
@@ -175,6 +211,35 @@ class AICoachService:
         base_advice = f"As a {learning_style.name} learner, "
         return base_advice + advice_map.get(learning_style.name, "experiment with different study methods to find what works best for you.")
     
+    def _generate_subject_advice(self):
+        """Generate subject combination advice"""
+        subjects = ', '.join(self.student.subjects.values_list('name', flat=True)[:8])
+        advice = (
+            "Choose your subject combination with the careers you want in mind: most degree "
+            "programmes require specific cluster subjects, so check KUCCPS requirements before dropping any. "
+        )
+        if subjects:
+            advice += f"You are currently taking {subjects}. "
+        return advice + "Your recommendations page shows which subjects each suggested career needs."
+    
+    def _generate_grade_advice(self):
+        """Explain KCSE grading"""
+        return (
+            "KCSE grades run from A (12 points) down to E (1 point). Your mean grade is the average "
+            "of your best seven subjects, and a C+ (plus) mean grade is the usual minimum for direct "
+            "degree entry, with C- or D+ for diploma and certificate courses. Improving your weakest "
+            "subjects lifts your mean grade fastest."
+        )
+    
+    def _generate_cluster_points_advice(self):
+        """Explain KUCCPS cluster points"""
+        return (
+            "KUCCPS cluster points weigh the four subjects a course needs against your overall "
+            "performance: C = sqrt((r / 48) x (t / 84)) x 48, where r is the total points of the four "
+            "cluster subjects and t is your aggregate points in seven subjects. Each course sets its own "
+            "cut-off, so strong grades in its cluster subjects matter most."
+        )
+    
     def _generate_motivational_message(self):
         """Generate culturally appropriate motivational messages"""
         motivations = [
@@ -1,3 +1,378 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from assessments.models import AssessmentResult, PersonalityType
+from users.models import CustomUser
+from .context import build_context_window
+from .inference import CircuitBreaker, get_inference_status
+from .intents import IntentClassifier, classify_intent
+from .models import Conversation, Message
+from .reply_cache import normalize_message, reply_cache
+
+class StubModelServer:
+    """Local stand-in for the inference API; answers after `delay` seconds"""
+
+    def __init__(self, reply='Stub coach reply', status=200, delay=0):
+        self.reply = reply
+        self.status = status
+        self.delay = delay
+        self.requests = []
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                stub.requests.append(json.loads(self.rfile.read(length)))
+                time.sleep(stub.delay)
+                body = json.dumps([{'generated_text': f'Student: hi\nAI Coach: {stub.reply}'}]).encode()
+                try:
+                    self.send_response(stub.status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up waiting, as the timeout tests intend
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/model'
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+class IntentClassifierTests(SimpleTestCase):
+    def test_keywords_match_whole_words_only(self):
+        self.assertEqual(classify_intent('I have so much homework').intent, 'study')
+        self.assertEqual(classify_intent('Which jobs suit an INTJ?').intent, 'career')
+
+    def test_phrases_and_new_intents(self):
+        self.assertEqual(classify_intent('What are my cluster points?').intent, 'cluster_points')
+        self.assertEqual(classify_intent('My mean grade was B+').intent, 'kcse_grades')
+        self.assertEqual(classify_intent('Should I drop Physics?').intent, 'subjects')
+
+    def test_confidence_and_no_match(self):
+        match = classify_intent('I want to give up')
+        self.assertEqual((match.intent, match.confidence), ('motivation', 1.0))
+        self.assertIsNone(classify_intent('hello there').intent)
+
+    def test_ties_go_to_the_first_declared_intent(self):
+        classifier = IntentClassifier({'first': {'apple': 1.0}, 'second': {'pear': 1.0}})
+        match = classifier.classify('pear and apple')
+        self.assertEqual((match.intent, match.confidence), ('first', 0.5))
+
+class CoachTestMixin:
+    def create_student(self, username='student', mbti_type='ENFJ', aspirations='', clear_cache=True):
+        """Create a student with a conversation and act as them; returns (client, conversation)"""
+        if clear_cache:
+            cache.clear()
+        personality_type, _ = PersonalityType.objects.get_or_create(
+            mbti_type=mbti_type, defaults={'name': mbti_type, 'description': '', 'strengths': '',
+                                           'weaknesses': '', 'career_recommendations': ''}
+        )
+        user = CustomUser.objects.create_user(username=username, password='password123')
+        user.studentprofile.career_aspirations = aspirations
+        user.studentprofile.save()
+        AssessmentResult.objects.create(
+            student=user.studentprofile, personality_type=personality_type,
+            ei_score=0, sn_score=0, tf_score=0, jp_score=0, confidence=0
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.conversation = Conversation.objects.create(student=user.studentprofile, title='Chat')
+        return self.client, self.conversation
+
+    def act_as(self, student):
+        self.client, self.conversation = student
+
+    def send(self, text='hello'):
+        return self.client.post(
+            f'/ai-coach/api/conversations/{self.conversation.id}/send_message/',
+            {'message': text}, format='json'
+        )
+
+    def poll(self, message_id):
+        return self.client.get(f'/ai-coach/api/messages/{message_id}/').json()
+
+@override_settings(AI_COACH_ASYNC_REPLIES=False, AI_COACH_INFERENCE_BACKOFF=0, ANALYTICS_EVENTS_ASYNC=False)
+class InlineReplyTests(CoachTestMixin, TestCase):
+    def setUp(self):
+        self.create_student()
+
+    def send(self, text='hello'):
+        # Replies are queued on commit, which TestCase otherwise never reaches
+        with self.captureOnCommitCallbacks(execute=True):
+            return super().send(text)
+
+    def test_reply_comes_from_model_server(self):
+        with StubModelServer() as stub, override_settings(AI_COACH_INFERENCE_URL=stub.url):
+            response = self.send()
+
+        self.assertEqual(response.status_code, 202)
+        reply = self.poll(response.data['ai_message']['id'])
+        self.assertEqual(reply['status'], Message.STATUS_COMPLETE)
+        self.assertEqual(reply['content'], 'Stub coach reply')
+
+    def test_model_error_falls_back_to_rule_based_reply(self):
+        with StubModelServer(status=503) as stub, override_settings(AI_COACH_INFERENCE_URL=stub.url):
+            response = self.send('I feel stressed')
+
+        reply = self.poll(response.data['ai_message']['id'])
+        self.assertEqual(reply['status'], Message.STATUS_COMPLETE)
+        self.assertNotEqual(reply['content'], 'Stub coach reply')
+        self.assertTrue(reply['content'])
+
+    def test_model_timeout_falls_back_to_rule_based_reply(self):
+        with StubModelServer(delay=1) as stub, override_settings(
+            AI_COACH_INFERENCE_URL=stub.url, AI_COACH_INFERENCE_TIMEOUT=0.2
+        ):
+            response = self.send()
+
+        reply = self.poll(response.data['ai_message']['id'])
+        self.assertEqual(reply['status'], Message.STATUS_COMPLETE)
+        self.assertNotEqual(reply['content'], 'Stub coach reply')
+
+    @override_settings(AI_COACH_INFERENCE_RETRIES=2)
+    def test_failed_calls_are_retried(self):
+        with StubModelServer(status=503) as stub, override_settings(AI_COACH_INFERENCE_URL=stub.url):
+            self.send()
+
+        self.assertEqual(len(stub.requests), 3)
+        self.assertEqual(get_inference_status()['retries'], 2)
+
+    @override_settings(AI_COACH_INFERENCE_RETRIES=0, AI_COACH_BREAKER_THRESHOLD=2)
+    def test_open_breaker_skips_model_server(self):
+        with StubModelServer(status=500) as stub, override_settings(AI_COACH_INFERENCE_URL=stub.url):
+            responses = [self.send() for _ in range(4)]
+
+        # The last two messages never reached the backend but still got a reply
+        self.assertEqual(len(stub.requests), 2)
+        for response in responses:
+            self.assertEqual(self.poll(response.data['ai_message']['id'])['status'], Message.STATUS_COMPLETE)
+        status = get_inference_status()
+        self.assertEqual(status['breaker_state'], CircuitBreaker.OPEN)
+        self.assertEqual(status['short_circuited'], 2)
+
+    def test_same_question_is_answered_from_cache(self):
+        first = (self.client, self.conversation)
+        second = self.create_student(username='other', clear_cache=False)
+        with StubModelServer() as stub, override_settings(AI_COACH_INFERENCE_URL=stub.url):
+            self.act_as(first)
+            self.send('What career suits me?')
+            self.act_as(second)
+            response = self.send('  what CAREER suits me ')
+
+        self.assertEqual(len(stub.requests), 1)
+        self.assertEqual(self.poll(response.data['ai_message']['id'])['content'], 'Stub coach reply')
+        self.assertEqual(normalize_message('  what CAREER suits me '), 'what career suits me')
+
+    def test_cache_is_keyed_by_personality_type(self):
+        first = (self.client, self.conversation)
+        second = self.create_student(username='other', mbti_type='ISTP', clear_cache=False)
+        with StubModelServer() as stub, override_settings(AI_COACH_INFERENCE_URL=stub.url):
+            self.act_as(first)
+            self.send('What career suits me?')
+            cache_hits = reply_cache.hits
+            self.act_as(second)
+            self.send('What career suits me?')
+
+        self.assertEqual(len(stub.requests), 2)
+        self.assertEqual(reply_cache.hits, cache_hits)
+
+    def test_first_reply_is_shared_across_career_aspirations(self):
+        first = self.create_student(username='doctor', aspirations='Doctor', clear_cache=False)
+        second = self.create_student(username='pilot', aspirations='Pilot', clear_cache=False)
+        with StubModelServer() as stub, override_settings(AI_COACH_INFERENCE_URL=stub.url):
+            self.act_as(first)
+            self.send('What should I study?')
+            self.act_as(second)
+            self.send('What should I study?')
+
+        self.assertEqual(len(stub.requests), 1)
+        self.assertNotIn('Doctor', stub.requests[0]['inputs'])
+        self.assertIn('Learning Style: auditory', stub.requests[0]['inputs'])
+
+    def test_follow_ups_are_never_cached(self):
+        first = self.create_student(username='doctor', aspirations='Doctor', clear_cache=False)
+        second = self.create_student(username='pilot', aspirations='Pilot', clear_cache=False)
+        with StubModelServer() as stub, override_settings(AI_COACH_INFERENCE_URL=stub.url):
+            self.act_as(first)
+            self.send('What should I study?')
+            self.send('Tell me more')
+            self.act_as(second)
+            self.send('What should I study?')
+            self.send('Tell me more')
+
+        # Both histories are identical, yet only the first turn is shared
+        self.assertEqual(len(stub.requests), 3)
+        self.assertIn('Career Interests: Doctor', stub.requests[1]['inputs'])
+        self.assertIn('Career Interests: Pilot', stub.requests[2]['inputs'])
+
+    def test_follow_ups_are_not_answered_from_another_conversation(self):
+        first = (self.client, self.conversation)
+        second = self.create_student(username='other', clear_cache=False)
+        with StubModelServer() as stub, override_settings(AI_COACH_INFERENCE_URL=stub.url):
+            self.act_as(first)
+            self.send('What career suits me?')
+            self.send('Tell me more')
+            self.act_as(second)
+            self.send('Which subjects matter?')
+            self.send('Tell me more')
+
+        # Each "Tell me more" follows a different history
+        self.assertEqual(len(stub.requests), 4)
+
+    @override_settings(AI_COACH_REPLY_TIMEOUT=0)
+    def test_lost_pending_reply_is_expired(self):
+        ai_message = Message.objects.create(
+            conversation=self.conversation, content='', is_from_ai=True, status=Message.STATUS_PENDING
+        )
+        self.assertEqual(self.poll(ai_message.id)['status'], Message.STATUS_FAILED)
+
+@override_settings(AI_COACH_CONTEXT_MESSAGES=4)
+class ContextWindowTests(CoachTestMixin, TestCase):
+    def setUp(self):
+        self.create_student()
+        self.messages = [
+            Message.objects.create(conversation=self.conversation, content=f'Turn {i}. More detail.',
+                                   is_from_ai=bool(i % 2))
+            for i in range(10)
+        ]
+
+    def test_window_holds_last_messages_and_summarizes_the_rest(self):
+        window = build_context_window(self.conversation, before_id=self.messages[-1].id + 1)
+
+        self.assertEqual([m.content for m in window.messages], [f'Turn {i}. More detail.' for i in range(6, 10)])
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.summarized_through, self.messages[5].id)
+        self.assertEqual(self.conversation.summary.splitlines()[0], '- Student: Turn 0.')
+        self.assertEqual(len(self.conversation.summary.splitlines()), 6)
+
+    def test_folded_turns_are_not_read_again(self):
+        build_context_window(self.conversation, before_id=self.messages[-1].id + 1)
+        self.conversation.refresh_from_db()
+        with self.assertNumQueries(2):
+            build_context_window(self.conversation, before_id=self.messages[-1].id + 1)
+
+    def test_render_fits_the_budget(self):
+        window = build_context_window(self.conversation, before_id=self.messages[-1].id + 1)
+        for budget in (0, 40, 120, 1000):
+            self.assertLessEqual(len(window.render(budget)), budget)
+        self.assertIn('Earlier in this conversation:', window.render(1000))
+        self.assertTrue(window.render(40).endswith('AI Coach: Turn 9. More detail.'))
+
+    @override_settings(AI_COACH_ASYNC_REPLIES=False, AI_COACH_PROMPT_CHAR_BUDGET=1500, ANALYTICS_EVENTS_ASYNC=False)
+    def test_prompt_includes_recent_turns_within_budget(self):
+        with StubModelServer() as stub, override_settings(AI_COACH_INFERENCE_URL=stub.url):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.send('What next?')
+
+        prompt = stub.requests[0]['inputs']
+        self.assertLessEqual(len(prompt), 1500)
+        self.assertIn('AI Coach: Turn 9. More detail.', prompt)
+        self.assertEqual(prompt.count('What next?'), 1)
+
+class ConversationApiTests(CoachTestMixin, TestCase):
+    def setUp(self):
+        self.create_student()
+        for i in range(5):
+            Message.objects.create(conversation=self.conversation, content=f'Message {i}', is_from_ai=bool(i % 2))
+
+    def test_list_summarizes_conversations(self):
+        Conversation.objects.create(student=self.conversation.student, title='Empty')
+        with self.assertNumQueries(1):
+            response = self.client.get('/ai-coach/api/conversations/')
+
+        summaries = {c['title']: c for c in response.json()}
+        self.assertNotIn('messages', summaries['Chat'])
+        self.assertEqual(summaries['Chat']['message_count'], 5)
+        self.assertEqual(summaries['Chat']['last_message_preview'], 'Message 4')
+        self.assertEqual(summaries['Empty']['message_count'], 0)
+        self.assertIsNone(summaries['Empty']['last_message_preview'])
+
+    def test_create_and_rename_do_not_send_the_history(self):
+        url = f'/ai-coach/api/conversations/{self.conversation.id}/'
+        response = self.client.patch(url, {'title': 'Renamed'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('messages', response.json())
+        self.assertEqual((response.json()['title'], response.json()['message_count']), ('Renamed', 5))
+        self.assertEqual(Conversation.objects.get(id=self.conversation.id).title, 'Renamed')
+
+        response = self.client.post('/ai-coach/api/conversations/', {'title': 'New'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            {key: response.json()[key] for key in ('title', 'message_count', 'last_message_preview')},
+            {'title': 'New', 'message_count': 0, 'last_message_preview': None},
+        )
+        self.assertNotIn('messages', response.json())
+
+    def test_messages_are_cursor_paginated(self):
+        url = f'/ai-coach/api/conversations/{self.conversation.id}/messages/?page_size=2'
+        contents = []
+        while url:
+            page = self.client.get(url).json()
+            contents += [message['content'] for message in page['results']]
+            url = page['next']
+        self.assertEqual(contents, [f'Message {i}' for i in range(5)])
+
+    def test_other_students_messages_are_hidden(self):
+        conversation_id = self.conversation.id
+        self.create_student(username='other')
+        response = self.client.get(f'/ai-coach/api/conversations/{conversation_id}/messages/')
+        self.assertEqual(response.status_code, 404)
+
+@override_settings(AI_COACH_ASYNC_REPLIES=True)
+class BackgroundReplyTests(CoachTestMixin, TransactionTestCase):
+    def setUp(self):
+        self.create_student()
+
+    def test_send_returns_before_slow_model_answers(self):
+        with StubModelServer(delay=1) as stub, override_settings(AI_COACH_INFERENCE_URL=stub.url):
+            started = time.monotonic()
+            response = self.send()
+            self.assertLess(time.monotonic() - started, 0.5)
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(response.data['ai_message']['status'], Message.STATUS_PENDING)
+
+            message_id = response.data['ai_message']['id']
+            deadline = time.monotonic() + 10
+            reply = self.poll(message_id)
+            while reply['status'] == Message.STATUS_PENDING and time.monotonic() < deadline:
+                time.sleep(0.1)
+                reply = self.poll(message_id)
+
+        self.assertEqual(reply['status'], Message.STATUS_COMPLETE)
+        self.assertEqual(reply['content'], 'Stub coach reply')
+
+    def test_concurrent_identical_prompts_share_one_call(self):
+        # Students with the same profile asking the same first question build the same prompt
+        students = [self.create_student(username=f'student{i}', clear_cache=False) for i in range(3)]
+        with StubModelServer(delay=1) as stub, override_settings(AI_COACH_INFERENCE_URL=stub.url):
+            message_ids = []
+            for student in students:
+                self.act_as(student)
+                message_ids.append(self.send('How do I study for KCSE?').data['ai_message']['id'])
+            deadline = time.monotonic() + 10
+            while Message.objects.filter(id__in=message_ids, status=Message.STATUS_PENDING).exists():
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.1)
+
+        self.assertEqual(len(stub.requests), 1)
+        for message_id in message_ids:
+            self.assertEqual(Message.objects.get(id=message_id).content, 'Stub coach reply')
@@ -4,6 +4,7 @@ from . import views
 
 router = DefaultRouter()
 router.register(r'conversations', views.ConversationViewSet, basename='conversation')
+router.register(r'messages', views.MessageViewSet, basename='message')
 router.register(r'coaching-plans', views.CoachingPlanViewSet, basename='coachingplan')
 
 app_name = 'ai_coach'
@@ -11,6 +12,7 @@ app_name = 'ai_coach'
 urlpatterns = [
     # API URLs
     path('api/', include(router.urls)),
+    path('api/inference-status/', views.InferenceStatusView.as_view(), name='inference_status'),
     
     # Template URLs
     path('', views.AICoachChatView.as_view(), name='chat'),
@@ -22,5 +24,6 @@ urlpatterns = [
     # API endpoints for templates
     path('api/send-message/', views.AICoachAPIView.as_view(), name='send_message'),
     path('api/send-message/<int:conversation_id>/', views.AICoachAPIView.as_view(), name='send_message_conversation'),
+    path('api/messages/<int:message_id>/stream/', views.MessageStreamView.as_view(), name='message_stream'),
     path('api/update-goals/', views.UpdateGoalsView.as_view(), name='update_goals'),
 ]
\ No newline at end of file
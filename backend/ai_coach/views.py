@@ -1,35 +1,76 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.pagination import CursorPagination
+from rest_framework.views import APIView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView, DetailView
 from django.views import View
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Left
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.urls import reverse
 import json
+import time
 
 from .models import Conversation, Message, CoachingPlan, ResourceRecommendation
 from .serializers import (
-    ConversationSerializer, MessageSerializer, 
+    ConversationSummarySerializer, MessageSerializer,
     CoachingPlanSerializer, ChatMessageSerializer
 )
 from .services import AICoachService
+from .replies import start_reply, expire_stale_reply
+from .inference import get_inference_status
+from .reply_cache import reply_cache
 from users.models import StudentProfile
 from assessments.models import AssessmentResult
 
+LAST_MESSAGE_PREVIEW_CHARS = 100
+
+class MessageCursorPagination(CursorPagination):
+    """Oldest first; the cursor keeps pages stable while new messages arrive"""
+    ordering = ('timestamp', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
 class ConversationViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
-    serializer_class = ConversationSerializer
+    # Conversations are always summarized; the messages have their own paged endpoint
+    serializer_class = ConversationSummarySerializer
     
     def get_queryset(self):
-        return Conversation.objects.filter(
+        queryset = Conversation.objects.filter(
             student=self.request.user.studentprofile
-        ).prefetch_related('messages')
+        )
+        if self.action in ('list', 'retrieve', 'update', 'partial_update'):
+            last_message = Message.objects.filter(
+                conversation=OuterRef('pk')
+            ).order_by('-timestamp', '-id')
+            queryset = queryset.defer('summary', 'summarized_through').annotate(
+                message_count=Count('messages'),
+                last_message_preview=Subquery(
+                    last_message.values(preview=Left('content', LAST_MESSAGE_PREVIEW_CHARS))[:1]
+                ),
+            ).order_by('-updated_at')
+        return queryset
     
     def perform_create(self, serializer):
-        serializer.save(student=self.request.user.studentprofile)
+        conversation = serializer.save(student=self.request.user.studentprofile)
+        conversation.message_count = 0
+        conversation.last_message_preview = None
+    
+    @action(detail=True, methods=['get'], pagination_class=MessageCursorPagination)
+    def messages(self, request, pk=None):
+        """Cursor-paginated message history of a conversation"""
+        conversation = self.get_object()
+        page = self.paginate_queryset(conversation.messages.all())
+        return self.get_paginated_response(MessageSerializer(page, many=True).data)
     
     @action(detail=True, methods=['post'])
     def send_message(self, request, pk=None):
@@ -40,26 +81,8 @@ class ConversationViewSet(viewsets.ModelViewSet):
         if serializer.is_valid():
             message_content = serializer.validated_data['message']
             
-            # Save user message
-            user_message = Message.objects.create(
-                conversation=conversation,
-                content=message_content,
-                is_from_ai=False
-            )
-            
-            # Generate AI response
-            coach_service = AICoachService(conversation.student)
-            ai_response = coach_service.generate_ai_response(
-                message_content,
-                conversation_history=conversation.messages.all()
-            )
-            
-            # Save AI response
-            ai_message = Message.objects.create(
-                conversation=conversation,
-                content=ai_response,
-                is_from_ai=True
-            )
+            # Save the message; the AI reply is generated in the background
+            user_message, ai_message = start_reply(conversation, message_content)
             
             # Update conversation title if it's the first message
             if conversation.messages.count() == 2:  # User + AI message
@@ -69,10 +92,24 @@ class ConversationViewSet(viewsets.ModelViewSet):
             return Response({
                 'user_message': MessageSerializer(user_message).data,
                 'ai_message': MessageSerializer(ai_message).data
-            })
+            }, status=status.HTTP_202_ACCEPTED)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class MessageViewSet(viewsets.ReadOnlyModelViewSet):
+    """Messages of the student's conversations; poll an AI reply until it is no longer pending"""
+    permission_classes = [IsAuthenticated]
+    serializer_class = MessageSerializer
+    pagination_class = MessageCursorPagination
+    
+    def get_queryset(self):
+        return Message.objects.filter(
+            conversation__student=self.request.user.studentprofile
+        )
+    
+    def get_object(self):
+        return expire_stale_reply(super().get_object())
+
 class CoachingPlanViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = CoachingPlanSerializer
@@ -113,6 +150,16 @@ class CoachingPlanViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(plan)
         return Response(serializer.data)
 
+class InferenceStatusView(APIView):
+    """Inference client and reply cache counters of this worker"""
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        return Response({
+            **(get_inference_status() or {'breaker_state': None, 'requests': 0}),
+            'reply_cache': reply_cache.stats(),
+        })
+
 # ==================== TEMPLATE VIEWS ====================
 
 class AICoachChatView(LoginRequiredMixin, TemplateView):
@@ -243,36 +290,8 @@ class AICoachAPIView(LoginRequiredMixin, View):
                     defaults={'title': 'Career Guidance Session'}
                 )
             
-            # Save user message
-            user_message = Message.objects.create(
-                conversation=conversation,
-                content=message,
-                is_from_ai=False
-            )
-            
-            # Generate AI response
-            ai_coach = AICoachService(student)
-            
-            # Get conversation history for context
-            previous_messages = Message.objects.filter(
-                conversation=conversation
-            ).order_by('timestamp')[:10]
-            
-            history = []
-            for msg in previous_messages:
-                history.append({
-                    'role': 'ai' if msg.is_from_ai else 'user',
-                    'content': msg.content
-                })
-            
-            ai_response_text = ai_coach.generate_ai_response(message, history)
-            
-            # Save AI response
-            ai_message = Message.objects.create(
-                conversation=conversation,
-                content=ai_response_text,
-                is_from_ai=True
-            )
+            # Save the message; the AI reply is generated in the background
+            user_message, ai_message = start_reply(conversation, message)
             
             # Update conversation title if it's the first message
             if conversation.title == 'Career Guidance Session' and Message.objects.filter(conversation=conversation).count() == 2:
@@ -281,17 +300,50 @@ class AICoachAPIView(LoginRequiredMixin, View):
             
             return JsonResponse({
                 'success': True,
-                'response': ai_response_text,
+                'status': ai_message.status,
                 'message_id': user_message.id,
                 'ai_message_id': ai_message.id,
-                'conversation_id': conversation.id
-            })
+                'conversation_id': conversation.id,
+                'poll_url': reverse('ai_coach:message-detail', args=[ai_message.id]),
+                'stream_url': reverse('ai_coach:message_stream', args=[ai_message.id]),
+            }, status=202)
             
         except Exception as e:
             return JsonResponse({
                 'error': str(e)
             }, status=500)
 
+class MessageStreamView(LoginRequiredMixin, View):
+    """
+    Server-Sent Events stream that emits an AI reply once it is ready.
+    
+    The stream holds its worker until the reply is done, so prefer polling
+    the message endpoint when running on sync workers.
+    """
+    
+    def get(self, request, message_id):
+        message = get_object_or_404(
+            Message, id=message_id, conversation__student=request.user.studentprofile
+        )
+        response = StreamingHttpResponse(
+            self.events(message), content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+    
+    def events(self, message):
+        interval = getattr(settings, 'AI_COACH_STREAM_POLL_INTERVAL', 0.5)
+        while True:
+            message = expire_stale_reply(message)
+            if message.status != Message.STATUS_PENDING:
+                yield f"event: reply\ndata: {json.dumps(MessageSerializer(message).data, cls=DjangoJSONEncoder)}\n\n"
+                return
+            # Comment lines keep proxies from closing an idle stream
+            yield ": pending\n\n"
+            time.sleep(interval)
+            message.refresh_from_db(fields=['content', 'status'])
+
 class UpdateGoalsView(LoginRequiredMixin, View):
     """API endpoint to update student goals"""
     
@@ -1,3 +1,14 @@
 from django.contrib import admin
+from .models import EndpointStats, SlowRequestSample
 
-# Register your models here.
+@admin.register(EndpointStats)
+class EndpointStatsAdmin(admin.ModelAdmin):
+    list_display = ['url_name', 'method', 'period_start', 'requests', 'max_ms', 'db_queries']
+    list_filter = ['method', 'period_start']
+    search_fields = ['url_name']
+
+@admin.register(SlowRequestSample)
+class SlowRequestSampleAdmin(admin.ModelAdmin):
+    list_display = ['path', 'url_name', 'duration_ms', 'db_queries', 'db_ms', 'created_at']
+    list_filter = ['method', 'created_at']
+    search_fields = ['url_name', 'path']
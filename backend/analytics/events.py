@@ -0,0 +1,139 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import Event
+
+logger = logging.getLogger(__name__)
+
+# Events waiting to be written; further events are dropped, not waited for
+DEFAULT_QUEUE_SIZE = 50000
+DEFAULT_BATCH_SIZE = 1000
+# Longest an event waits in the queue before its batch is written
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+class EventPipeline:
+    """
+    In-process queue of usage events drained by one writer thread.
+
+    `track` only appends to a bounded queue, so request handlers never wait
+    on the database: when the writer falls behind and the queue is full, the
+    event is dropped and counted. The writer inserts with bulk_create once
+    ANALYTICS_EVENT_BATCH_SIZE events are queued or the oldest has waited
+    ANALYTICS_EVENT_FLUSH_INTERVAL seconds. With ANALYTICS_EVENTS_ASYNC off,
+    events are written inline instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = None
+        self._pid = None
+        self.accepted = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    def _get_queue(self):
+        # Started lazily, and again in a forked worker, which doesn't inherit threads
+        if self._pid == os.getpid():
+            return self._queue
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(getattr(settings, 'ANALYTICS_EVENT_QUEUE_SIZE', DEFAULT_QUEUE_SIZE))
+                threading.Thread(
+                    target=self._run, args=(self._queue,), name='analytics-events', daemon=True
+                ).start()
+                self._pid = os.getpid()
+            return self._queue
+
+    def track(self, event_type, student=None, value=None, properties=None):
+        """Queue an event with a dict of properties; returns False if it was dropped"""
+        row = (event_type, getattr(student, 'pk', student), value, dict(properties or {}), timezone.now())
+        if not getattr(settings, 'ANALYTICS_EVENTS_ASYNC', True):
+            self._write([row])
+            return True
+
+        try:
+            self._get_queue().put_nowait(row)
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('accepted')
+        return True
+
+    def flush(self, timeout=10):
+        """Wait until every event queued so far has been written"""
+        if self._pid != os.getpid():
+            return True
+        marker = threading.Event()
+        self._queue.put(marker, timeout=timeout)
+        return marker.wait(timeout)
+
+    def _run(self, events):
+        while True:
+            batch_size = getattr(settings, 'ANALYTICS_EVENT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+            interval = getattr(settings, 'ANALYTICS_EVENT_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+            batch = []
+            marker = None
+            item = events.get()
+            deadline = time.monotonic() + interval
+            while True:
+                if isinstance(item, threading.Event):
+                    marker = item
+                    break
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= batch_size or remaining <= 0:
+                    break
+                try:
+                    item = events.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if batch:
+                close_old_connections()
+                self._write(batch)
+            if marker is not None:
+                marker.set()
+
+    def _write(self, rows):
+        try:
+            Event.objects.bulk_create([
+                Event(event_type=event_type, student_id=student_id, value=value,
+                      properties=properties, created_at=created_at)
+                for event_type, student_id, value, properties, created_at in rows
+            ])
+        except Exception:
+            logger.exception('Could not write %s analytics events', len(rows))
+            self._count('failed', len(rows))
+            return
+        self._count('written', len(rows))
+        self._count('batches')
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'accepted': self.accepted,
+                'dropped': self.dropped,
+                'written': self.written,
+                'failed': self.failed,
+                'batches': self.batches,
+                'queued': self._queue.qsize() if self._pid == os.getpid() else 0,
+            }
+
+event_pipeline = EventPipeline()
+
+def track_event(event_type, student=None, value=None, **properties):
+    """Record a usage event without waiting for the database"""
+    return event_pipeline.track(event_type, student, value, properties)
@@ -0,0 +1,99 @@
+import csv
+from itertools import groupby, islice
+
+from assessments.models import AssessmentResult
+from recommendations.models import StudentRecommendation
+
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_TOP_N = 3
+
+def cohort_columns(top_n=DEFAULT_TOP_N):
+    columns = [
+        'username', 'first_name', 'last_name', 'grade_level', 'school_code', 'school', 'county',
+        'mbti_type', 'ei_score', 'sn_score', 'tf_score', 'jp_score', 'confidence', 'assessed_at',
+    ]
+    for rank in range(1, top_n + 1):
+        columns += [f'career_{rank}', f'career_{rank}_score']
+    return columns
+
+def iter_cohort_chunks(school, chunk_size=DEFAULT_CHUNK_SIZE, top_n=DEFAULT_TOP_N):
+    """
+    Yield lists of up to `chunk_size` flat export rows (in cohort_columns
+    order) for the assessed students of `school`.
+
+    Results are streamed from a server-side cursor and each chunk's
+    recommendations are read with one query, so memory depends on
+    `chunk_size` and not on the size of the school.
+    """
+    results = AssessmentResult.objects.filter(student__school=school).select_related(
+        'personality_type', 'student__user', 'student__school'
+    ).order_by('student_id').iterator(chunk_size=chunk_size)
+
+    while True:
+        chunk = list(islice(results, chunk_size))
+        if not chunk:
+            return
+
+        recommendations = StudentRecommendation.objects.filter(
+            student_id__in=[result.student_id for result in chunk]
+        ).order_by('student_id', '-overall_score').values_list('student_id', 'career__name', 'overall_score')
+        top_careers = {
+            student_id: [(name, score) for _, name, score in islice(rows, top_n)]
+            for student_id, rows in groupby(recommendations, key=lambda row: row[0])
+        }
+
+        rows = []
+        for result in chunk:
+            student = result.student
+            row = [
+                student.user.username, student.user.first_name, student.user.last_name, student.grade_level,
+                student.school.code, student.school.name, student.school.county,
+                result.personality_type.mbti_type, result.ei_score, result.sn_score, result.tf_score,
+                result.jp_score, result.confidence, result.created_at.isoformat(),
+            ]
+            careers = top_careers.get(result.student_id, [])
+            for rank in range(top_n):
+                row += careers[rank] if rank < len(careers) else ['', '']
+            rows.append(row)
+        yield rows
+
+class Echo:
+    """File-like object whose write returns the line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+def stream_cohort_csv(school, chunk_size=DEFAULT_CHUNK_SIZE, top_n=DEFAULT_TOP_N):
+    """CSV lines of the cohort export, header first, one chunk at a time"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(cohort_columns(top_n))
+    for rows in iter_cohort_chunks(school, chunk_size, top_n):
+        # One string per chunk keeps the number of response writes down
+        yield ''.join(writer.writerow(row) for row in rows)
+
+def write_cohort_parquet(school, path, chunk_size=DEFAULT_CHUNK_SIZE, top_n=DEFAULT_TOP_N):
+    """
+    Write the cohort export to a Parquet file, one row group per chunk.
+    Requires pyarrow, which is not installed by default. Returns the row count.
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = cohort_columns(top_n)
+    score_columns = {'ei_score', 'sn_score', 'tf_score', 'jp_score', 'confidence'} | {
+        f'career_{rank}_score' for rank in range(1, top_n + 1)
+    }
+    schema = pa.schema([
+        (column, pa.float64() if column in score_columns else pa.string()) for column in columns
+    ])
+
+    written = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in iter_cohort_chunks(school, chunk_size, top_n):
+            frame = pd.DataFrame(rows, columns=columns)
+            for column in score_columns:
+                frame[column] = pd.to_numeric(frame[column], errors='coerce').astype('float64')
+            writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+            written += len(rows)
+    return written
@@ -0,0 +1,54 @@
+import csv
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from analytics.exports import (
+    DEFAULT_CHUNK_SIZE, DEFAULT_TOP_N, cohort_columns, iter_cohort_chunks, write_cohort_parquet
+)
+from users.models import School
+
+class Command(BaseCommand):
+    help = "Export a school's assessment results and top recommended careers as CSV or Parquet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', required=True, help='KNEC code of the school')
+        parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+        parser.add_argument('--output', help='File to write; CSV goes to stdout when omitted')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Students fetched per chunk (one Parquet row group each)')
+        parser.add_argument('--top-n', type=int, default=DEFAULT_TOP_N,
+                            help='Recommended careers per student')
+
+    def handle(self, *args, **options):
+        try:
+            school = School.objects.get(code=options['school'])
+        except School.DoesNotExist:
+            raise CommandError(f"No school with code {options['school']}")
+
+        started = time.perf_counter()
+        if options['format'] == 'parquet':
+            if not options['output']:
+                raise CommandError('--output is required for Parquet exports')
+            try:
+                rows = write_cohort_parquet(school, options['output'], options['chunk_size'], options['top_n'])
+            except ImportError:
+                raise CommandError('Parquet exports need pyarrow: pip install pyarrow')
+        else:
+            output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+            try:
+                writer = csv.writer(output)
+                writer.writerow(cohort_columns(options['top_n']))
+                rows = 0
+                for chunk in iter_cohort_chunks(school, options['chunk_size'], options['top_n']):
+                    writer.writerows(chunk)
+                    rows += len(chunk)
+            finally:
+                if output is not sys.stdout:
+                    output.close()
+
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Exported {rows} students of {school.name} to {options['output']} "
+                f"in {time.perf_counter() - started:.1f}s"
+            ))
@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from analytics.models import EndpointStats, SlowRequestSample
+from analytics.profiling import histogram_percentile, request_profiler
+
+ORDERINGS = {
+    'p95': lambda row: row['p95'],
+    'requests': lambda row: row['requests'],
+    'queries': lambda row: row['queries'],
+    'db': lambda row: row['db_ms'] * row['requests'],
+}
+
+class Command(BaseCommand):
+    help = 'Report latency percentiles and queries per request for each URL name'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='How far back to report')
+        parser.add_argument('--limit', type=int, default=20, help='URL names to list')
+        parser.add_argument('--order', choices=sorted(ORDERINGS), default='p95',
+                            help='Sort key: p95 latency, request count, queries per request '
+                                 'or total DB time')
+        parser.add_argument('--samples', type=int, default=3,
+                            help='Slow request samples shown per URL name')
+
+    def handle(self, *args, **options):
+        # Include this process's own unflushed timings
+        request_profiler.flush()
+        since = timezone.now() - timedelta(hours=options['hours'])
+
+        endpoints = {}
+        for stats in EndpointStats.objects.filter(period_start__gte=since - timedelta(hours=1)):
+            endpoint = endpoints.setdefault((stats.url_name, stats.method), {
+                'requests': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'db_queries': 0, 'db_ms': 0.0, 'histogram': {},
+            })
+            endpoint['requests'] += stats.requests
+            endpoint['total_ms'] += stats.total_ms
+            endpoint['max_ms'] = max(endpoint['max_ms'], stats.max_ms)
+            endpoint['db_queries'] += stats.db_queries
+            endpoint['db_ms'] += stats.db_ms
+            for bucket, count in stats.histogram.items():
+                endpoint['histogram'][bucket] = endpoint['histogram'].get(bucket, 0) + count
+
+        if not endpoints:
+            self.stdout.write(f"No requests recorded in the last {options['hours']} hours")
+            return
+
+        rows = []
+        for (url_name, method), endpoint in endpoints.items():
+            requests = endpoint['requests']
+            rows.append({
+                'url_name': url_name,
+                'method': method,
+                'requests': requests,
+                'p50': histogram_percentile(endpoint['histogram'], 0.50),
+                'p95': histogram_percentile(endpoint['histogram'], 0.95),
+                'p99': histogram_percentile(endpoint['histogram'], 0.99),
+                'max_ms': endpoint['max_ms'],
+                'queries': endpoint['db_queries'] / requests,
+                'db_ms': endpoint['db_ms'] / requests,
+            })
+        rows.sort(key=ORDERINGS[options['order']], reverse=True)
+        rows = rows[:options['limit']]
+
+        self.stdout.write('Percentiles are bucket upper bounds in ms')
+        self.stdout.write(
+            f"{'url name':<45} {'method':<7} {'requests':>9} {'p50':>6} {'p95':>6} {'p99':>6} "
+            f"{'max':>8} {'queries/req':>12} {'db ms/req':>10}"
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{row['url_name'][:45]:<45} {row['method']:<7} {row['requests']:>9} "
+                f"{row['p50']:>6g} {row['p95']:>6g} {row['p99']:>6g} {row['max_ms']:>8.0f} "
+                f"{row['queries']:>12.1f} {row['db_ms']:>10.1f}"
+            )
+
+        if options['samples']:
+            self.write_samples(rows, since, options['samples'])
+
+    def write_samples(self, rows, since, per_endpoint):
+        for row in rows:
+            samples = SlowRequestSample.objects.filter(
+                url_name=row['url_name'], method=row['method'], created_at__gte=since
+            )[:per_endpoint]
+            for sample in samples:
+                self.stdout.write('')
+                self.stdout.write(
+                    f'{sample.method} {sample.path}: {sample.duration_ms:.0f} ms, '
+                    f'{sample.db_queries} queries in {sample.db_ms:.0f} ms'
+                )
+                for query in sample.top_queries:
+                    self.stdout.write(f"  {query['count']:>4}x {query['ms']:>8.1f} ms  {query['sql'][:160]}")
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+from analytics.rollups import DEFAULT_BATCH_SIZE, update_rollups
+
+class Command(BaseCommand):
+    help = 'Fold assessment, recommendation and response changes since the last run into the analytics rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Re-read every student instead of only those changed since the last run')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Students read and applied per transaction')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        students, rows = update_rollups(full=options['full'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated {rows} rollup rows from {students} students in {time.perf_counter() - started:.1f}s'
+        ))
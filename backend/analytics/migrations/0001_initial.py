@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowRequestSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_name', models.CharField(max_length=200)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('duration_ms', models.FloatField()),
+                ('db_queries', models.PositiveIntegerField()),
+                ('db_ms', models.FloatField()),
+                ('top_queries', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['url_name', '-created_at'], name='analytics_s_url_nam_8e7c4b_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EndpointStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_name', models.CharField(max_length=200)),
+                ('method', models.CharField(max_length=10)),
+                ('period_start', models.DateTimeField()),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('db_queries', models.PositiveBigIntegerField(default=0)),
+                ('db_ms', models.FloatField(default=0)),
+                ('histogram', models.JSONField(default=dict)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period_start'], name='analytics_e_period__1f8a37_idx')],
+                'unique_together': {('url_name', 'method', 'period_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_studentprofile_grade_level_and_more'),
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Event',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('assessment_started', 'Assessment started'), ('assessment_completed', 'Assessment completed'), ('question_answered', 'Question answered'), ('recommendations_viewed', 'Recommendations viewed'), ('career_viewed', 'Career viewed'), ('coach_message_sent', 'Coach message sent')], max_length=30)),
+                ('value', models.FloatField(blank=True, null=True)),
+                ('properties', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField()),
+                ('student', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='users.studentprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event_type', 'created_at'], name='analytics_e_event_t_ef40a5_idx'), models.Index(fields=['student', 'created_at'], name='analytics_e_student_4a77e7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_studentprofile_grade_level_and_more'),
+        ('analytics', '0002_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StudentContribution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rows', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to='users.studentprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Rollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('school', 'School'), ('county', 'County'), ('mbti', 'MBTI type')], max_length=10)),
+                ('scope_key', models.CharField(max_length=100)),
+                ('metric', models.CharField(max_length=20)),
+                ('bucket', models.CharField(blank=True, max_length=50)),
+                ('count', models.BigIntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['scope', 'scope_key', 'metric', '-count'], name='analytics_r_scope_e5d1f7_idx')],
+                'unique_together': {('scope', 'scope_key', 'metric', 'bucket')},
+            },
+        ),
+    ]
@@ -1,3 +1,132 @@
 from django.db import models
 
-# Create your models here.
+class EndpointStats(models.Model):
+    """Request timings of one view over one hour, merged from every worker's profiler"""
+    url_name = models.CharField(max_length=200)
+    method = models.CharField(max_length=10)
+    period_start = models.DateTimeField()
+    requests = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    db_queries = models.PositiveBigIntegerField(default=0)
+    db_ms = models.FloatField(default=0)
+    # Request count per latency bucket, keyed by the bucket's upper bound in ms
+    histogram = models.JSONField(default=dict)
+    
+    class Meta:
+        unique_together = ['url_name', 'method', 'period_start']
+        indexes = [
+            models.Index(fields=['period_start']),
+        ]
+    
+    def __str__(self):
+        return f"{self.method} {self.url_name} @ {self.period_start:%Y-%m-%d %H:00}"
+
+class SlowRequestSample(models.Model):
+    """A request slower than ANALYTICS_SLOW_REQUEST_MS and the SQL it repeated most"""
+    url_name = models.CharField(max_length=200)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    duration_ms = models.FloatField()
+    db_queries = models.PositiveIntegerField()
+    db_ms = models.FloatField()
+    # [{'sql': ..., 'count': ..., 'ms': ...}], most executed first
+    top_queries = models.JSONField(default=list)
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['url_name', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+class Event(models.Model):
+    """Usage event, written in batches by analytics.events"""
+    ASSESSMENT_STARTED = 'assessment_started'
+    ASSESSMENT_COMPLETED = 'assessment_completed'
+    QUESTION_ANSWERED = 'question_answered'
+    RECOMMENDATIONS_VIEWED = 'recommendations_viewed'
+    CAREER_VIEWED = 'career_viewed'
+    COACH_MESSAGE_SENT = 'coach_message_sent'
+    EVENT_TYPES = [
+        (ASSESSMENT_STARTED, 'Assessment started'),
+        (ASSESSMENT_COMPLETED, 'Assessment completed'),
+        (QUESTION_ANSWERED, 'Question answered'),
+        (RECOMMENDATIONS_VIEWED, 'Recommendations viewed'),
+        (CAREER_VIEWED, 'Career viewed'),
+        (COACH_MESSAGE_SENT, 'Coach message sent'),
+    ]
+    # Reported by clients through the event API; the rest are tracked server-side
+    CLIENT_EVENT_TYPES = [RECOMMENDATIONS_VIEWED, CAREER_VIEWED]
+    
+    event_type = models.CharField(max_length=30, choices=EVENT_TYPES)
+    # No database constraint: events are append-only and outlive deleted students
+    student = models.ForeignKey(
+        'users.StudentProfile', null=True, blank=True, on_delete=models.DO_NOTHING, db_constraint=False
+    )
+    # Measurement carried by the event, e.g. a question's response time in seconds
+    value = models.FloatField(null=True, blank=True)
+    properties = models.JSONField(default=dict, blank=True)
+    # When it happened, not when the batch was written
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['event_type', 'created_at']),
+            models.Index(fields=['student', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_type} @ {self.created_at:%Y-%m-%d %H:%M:%S}"
+
+class Rollup(models.Model):
+    """
+    Pre-aggregated count and total of one metric bucket within one scope,
+    e.g. scope 'school' / key '12' / metric 'mbti' / bucket 'INTJ'.
+    Maintained incrementally by analytics.rollups.
+    """
+    SCOPE_SCHOOL = 'school'
+    SCOPE_COUNTY = 'county'
+    SCOPE_MBTI = 'mbti'
+    SCOPES = [
+        (SCOPE_SCHOOL, 'School'),
+        (SCOPE_COUNTY, 'County'),
+        (SCOPE_MBTI, 'MBTI type'),
+    ]
+    
+    scope = models.CharField(max_length=10, choices=SCOPES)
+    scope_key = models.CharField(max_length=100)
+    metric = models.CharField(max_length=20)
+    bucket = models.CharField(max_length=50, blank=True)
+    count = models.BigIntegerField(default=0)
+    total = models.FloatField(default=0)
+    
+    class Meta:
+        unique_together = ['scope', 'scope_key', 'metric', 'bucket']
+        indexes = [
+            models.Index(fields=['scope', 'scope_key', 'metric', '-count']),
+        ]
+    
+    def __str__(self):
+        return f"{self.scope}:{self.scope_key} {self.metric}[{self.bucket}] = {self.count}"
+
+class StudentContribution(models.Model):
+    """What one student currently adds to the rollups, so a change can be applied as a delta"""
+    # No database constraint: a deleted student's contribution must still be subtracted
+    student = models.OneToOneField(
+        'users.StudentProfile', on_delete=models.DO_NOTHING, db_constraint=False
+    )
+    # [[scope, scope_key, metric, bucket, count, total], ...]
+    rows = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+class RollupWatermark(models.Model):
+    """How far the rollups have caught up with source changes"""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.name} @ {self.value}"
@@ -0,0 +1,199 @@
+import bisect
+import logging
+import threading
+import time
+from collections import Counter, deque, namedtuple
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import EndpointStats, SlowRequestSample
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUFFER_SIZE = 10000
+DEFAULT_FLUSH_INTERVAL = 60
+DEFAULT_SLOW_REQUEST_MS = 500
+# Slow requests kept per flush; beyond this the oldest samples are dropped
+MAX_SLOW_SAMPLES = 200
+# Repeated statements stored with each slow sample
+TOP_QUERIES = 5
+MAX_SQL_CHARS = 1000
+
+# Upper bounds (ms) of the latency histogram buckets; slower requests go in 'inf'
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000)
+
+RequestTiming = namedtuple('RequestTiming', ['url_name', 'method', 'period_start', 'duration_ms', 'db_queries', 'db_ms'])
+
+def latency_bucket(duration_ms):
+    index = bisect.bisect_left(LATENCY_BUCKETS_MS, duration_ms)
+    return str(LATENCY_BUCKETS_MS[index]) if index < len(LATENCY_BUCKETS_MS) else 'inf'
+
+def histogram_percentile(histogram, fraction):
+    """Upper bound (ms) of the bucket holding the `fraction` quantile, or None if empty"""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    seen = 0
+    for bound in LATENCY_BUCKETS_MS + (float('inf'),):
+        key = 'inf' if bound == float('inf') else str(bound)
+        seen += histogram.get(key, 0)
+        if seen >= fraction * total:
+            return bound
+    return float('inf')
+
+class QueryRecorder:
+    """connection.execute_wrapper hook counting and timing the queries of one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.ms = 0.0
+        self.statements = Counter()
+        self.statement_ms = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.count += 1
+            self.ms += elapsed
+            # SQL still has its placeholders here, so N+1 queries share one key
+            self.statements[sql] += 1
+            self.statement_ms[sql] += elapsed
+
+    def top_queries(self, limit=TOP_QUERIES):
+        return [
+            {'sql': sql[:MAX_SQL_CHARS], 'count': count, 'ms': round(self.statement_ms[sql], 2)}
+            for sql, count in self.statements.most_common(limit)
+        ]
+
+class RequestProfiler:
+    """
+    Per-process ring buffer of request timings.
+
+    Timings are buffered in memory and, every ANALYTICS_PROFILER_FLUSH_INTERVAL
+    seconds, merged into hourly EndpointStats rows by whichever request
+    notices the interval has passed. If the database falls behind, the
+    oldest timings are dropped rather than the buffer growing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timings = deque(maxlen=getattr(settings, 'ANALYTICS_PROFILER_BUFFER_SIZE', DEFAULT_BUFFER_SIZE))
+        self._slow = deque(maxlen=MAX_SLOW_SAMPLES)
+        self._last_flush = time.monotonic()
+
+    def record(self, timing, slow_sample=None):
+        with self._lock:
+            self._timings.append(timing)
+            if slow_sample is not None:
+                self._slow.append(slow_sample)
+        interval = getattr(settings, 'ANALYTICS_PROFILER_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        if time.monotonic() - self._last_flush >= interval:
+            self.flush()
+
+    def flush(self):
+        """Write buffered timings and slow samples; concurrent callers skip"""
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        timings = []
+        try:
+            self._last_flush = time.monotonic()
+            with self._lock:
+                timings, self._timings = list(self._timings), deque(maxlen=self._timings.maxlen)
+                slow, self._slow = list(self._slow), deque(maxlen=MAX_SLOW_SAMPLES)
+            if not timings and not slow:
+                return
+            try:
+                self._write(timings, slow)
+            except IntegrityError:
+                # Another worker created one of the same hourly rows; merge into it
+                self._write(timings, slow)
+        except Exception:
+            logger.exception('Could not flush %s request timings', len(timings))
+        finally:
+            self._flush_lock.release()
+
+    @staticmethod
+    def _write(timings, slow):
+        groups = {}
+        for timing in timings:
+            key = (timing.url_name, timing.method, timing.period_start)
+            stats = groups.get(key)
+            if stats is None:
+                stats = groups[key] = EndpointStats(
+                    url_name=timing.url_name, method=timing.method, period_start=timing.period_start,
+                    histogram={}
+                )
+            stats.requests += 1
+            stats.total_ms += timing.duration_ms
+            stats.max_ms = max(stats.max_ms, timing.duration_ms)
+            stats.db_queries += timing.db_queries
+            stats.db_ms += timing.db_ms
+            bucket = latency_bucket(timing.duration_ms)
+            stats.histogram[bucket] = stats.histogram.get(bucket, 0) + 1
+
+        with transaction.atomic():
+            existing = EndpointStats.objects.select_for_update().filter(
+                period_start__in={key[2] for key in groups},
+                url_name__in={key[0] for key in groups},
+            )
+            updated = []
+            for row in existing:
+                stats = groups.pop((row.url_name, row.method, row.period_start), None)
+                if stats is None:
+                    continue
+                row.requests += stats.requests
+                row.total_ms += stats.total_ms
+                row.max_ms = max(row.max_ms, stats.max_ms)
+                row.db_queries += stats.db_queries
+                row.db_ms += stats.db_ms
+                for bucket, count in stats.histogram.items():
+                    row.histogram[bucket] = row.histogram.get(bucket, 0) + count
+                updated.append(row)
+            EndpointStats.objects.bulk_update(
+                updated, ['requests', 'total_ms', 'max_ms', 'db_queries', 'db_ms', 'histogram']
+            )
+            EndpointStats.objects.bulk_create(groups.values())
+            SlowRequestSample.objects.bulk_create(slow)
+
+request_profiler = RequestProfiler()
+
+class ProfilerMiddleware:
+    """
+    Record wall time, query count and query time of every request against
+    its URL name, and keep the top repeated SQL of slow requests.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'ANALYTICS_PROFILER_ENABLED', True):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        match = request.resolver_match
+        url_name = (match.view_name if match else None) or '<unresolved>'
+        now = timezone.now()
+        slow_sample = None
+        if duration_ms >= getattr(settings, 'ANALYTICS_SLOW_REQUEST_MS', DEFAULT_SLOW_REQUEST_MS):
+            slow_sample = SlowRequestSample(
+                url_name=url_name, method=request.method, path=request.path[:500],
+                duration_ms=duration_ms, db_queries=recorder.count, db_ms=recorder.ms,
+                top_queries=recorder.top_queries(), created_at=now,
+            )
+        request_profiler.record(RequestTiming(
+            url_name, request.method, now.replace(minute=0, second=0, microsecond=0),
+            duration_ms, recorder.count, recorder.ms,
+        ), slow_sample)
+        return response
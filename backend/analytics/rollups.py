@@ -0,0 +1,174 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from assessments.models import AssessmentResult, AssessmentSession, QuestionResponse
+from recommendations.models import StudentRecommendation
+from users.models import StudentProfile
+from .models import Rollup, RollupWatermark, StudentContribution
+
+WATERMARK = 'rollups'
+# Rows committed up to this long after their updated_at are still picked up.
+# Students in the overlap are read twice, which is harmless: only the
+# difference from their stored contribution is applied.
+SAFETY_LAG = timedelta(minutes=5)
+DEFAULT_BATCH_SIZE = 500
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+def changed_student_ids(since=None):
+    """Students whose results, recommendations or sessions changed after `since` (all when None)"""
+    if since is None:
+        ids = set(StudentProfile.objects.values_list('id', flat=True))
+    else:
+        ids = set(AssessmentResult.objects.filter(updated_at__gt=since).values_list('student_id', flat=True))
+        ids.update(StudentRecommendation.objects.filter(updated_at__gt=since).values_list('student_id', flat=True))
+        ids.update(AssessmentSession.objects.filter(updated_at__gt=since).values_list('student_id', flat=True))
+    # Deleted students still have a contribution to take back out
+    ids.update(StudentContribution.objects.exclude(
+        student_id__in=StudentProfile.objects.values('id')
+    ).values_list('student_id', flat=True))
+    return ids
+
+def student_contributions(student_ids):
+    """
+    What each student adds to the rollups, as {student_id: {(scope, scope_key,
+    metric, bucket): [count, total]}}. Costs five queries per batch.
+    """
+    contributions = {student_id: {} for student_id in student_ids}
+    scopes = defaultdict(list)
+    for student_id, school_id, county in StudentProfile.objects.filter(
+        id__in=student_ids
+    ).values_list('id', 'school_id', 'school__county'):
+        if school_id:
+            scopes[student_id] = [(Rollup.SCOPE_SCHOOL, str(school_id)), (Rollup.SCOPE_COUNTY, county)]
+
+    def add(student_id, scope, metric, bucket='', count=1, total=0.0):
+        row = contributions[student_id].setdefault((*scope, metric, bucket), [0, 0.0])
+        row[0] += count
+        row[1] += total
+
+    for student_id in contributions:
+        for scope in scopes[student_id]:
+            add(student_id, scope, 'students')
+
+    mbti_types = dict(AssessmentResult.objects.filter(
+        student_id__in=student_ids
+    ).values_list('student_id', 'personality_type__mbti_type'))
+    for student_id, mbti_type in mbti_types.items():
+        for scope in scopes[student_id]:
+            add(student_id, scope, 'mbti', mbti_type)
+
+    for student_id, career_id, score in StudentRecommendation.objects.filter(
+        student_id__in=student_ids
+    ).values_list('student_id', 'career_id', 'overall_score'):
+        career_scopes = scopes[student_id] + (
+            [(Rollup.SCOPE_MBTI, mbti_types[student_id])] if student_id in mbti_types else []
+        )
+        for scope in career_scopes:
+            add(student_id, scope, 'career', str(career_id), total=float(score))
+
+    for row in AssessmentSession.objects.filter(student_id__in=student_ids).values('student_id').annotate(
+        started=Count('id'), completed=Count('id', filter=Q(is_completed=True))
+    ):
+        for scope in scopes[row['student_id']]:
+            add(row['student_id'], scope, 'sessions', 'started', row['started'])
+            if row['completed']:
+                add(row['student_id'], scope, 'sessions', 'completed', row['completed'])
+
+    for row in QuestionResponse.objects.filter(session__student_id__in=student_ids).values(
+        'session__student_id'
+    ).annotate(responses=Count('id'), seconds=Sum('response_time')):
+        for scope in scopes[row['session__student_id']]:
+            add(row['session__student_id'], scope, 'response_time', count=row['responses'], total=row['seconds'] or 0)
+
+    return contributions
+
+def apply_deltas(deltas):
+    """Add {(scope, scope_key, metric, bucket): [count, total]} to the rollup rows"""
+    deltas = {key: delta for key, delta in deltas.items() if delta[0] or delta[1]}
+    if not deltas:
+        return 0
+    existing = Rollup.objects.select_for_update().filter(
+        scope__in={key[0] for key in deltas}, scope_key__in={key[1] for key in deltas}
+    )
+    updated = []
+    emptied = []
+    for row in existing:
+        delta = deltas.pop((row.scope, row.scope_key, row.metric, row.bucket), None)
+        if delta is None:
+            continue
+        row.count += delta[0]
+        row.total += delta[1]
+        (updated if row.count else emptied).append(row)
+    Rollup.objects.bulk_update(updated, ['count', 'total'])
+    Rollup.objects.filter(id__in=[row.id for row in emptied]).delete()
+    Rollup.objects.bulk_create([
+        Rollup(scope=scope, scope_key=scope_key, metric=metric, bucket=bucket, count=count, total=total)
+        for (scope, scope_key, metric, bucket), (count, total) in deltas.items()
+    ])
+    return len(updated) + len(emptied) + len(deltas)
+
+@transaction.atomic
+def update_students(student_ids):
+    """Bring the rollups in line with the current data of `student_ids`"""
+    previous = {
+        contribution.student_id: contribution
+        for contribution in StudentContribution.objects.select_for_update().filter(student_id__in=student_ids)
+    }
+    current = student_contributions(student_ids)
+    existing_students = set(StudentProfile.objects.filter(id__in=student_ids).values_list('id', flat=True))
+
+    deltas = defaultdict(lambda: [0, 0.0])
+    changed = []
+    created = []
+    deleted = []
+    for student_id in student_ids:
+        rows = current[student_id] if student_id in existing_students else {}
+        contribution = previous.get(student_id)
+        old_rows = {tuple(row[:4]): row[4:] for row in contribution.rows} if contribution else {}
+        if rows == old_rows:
+            continue
+        for key, (count, total) in old_rows.items():
+            deltas[key][0] -= count
+            deltas[key][1] -= total
+        for key, (count, total) in rows.items():
+            deltas[key][0] += count
+            deltas[key][1] += total
+
+        serialized = [[*key, count, total] for key, (count, total) in rows.items()]
+        if student_id not in existing_students:
+            deleted.append(student_id)
+        elif contribution is None:
+            created.append(StudentContribution(student_id=student_id, rows=serialized))
+        else:
+            contribution.rows = serialized
+            changed.append(contribution)
+
+    StudentContribution.objects.bulk_update(changed, ['rows'])
+    StudentContribution.objects.filter(student_id__in=deleted).delete()
+    StudentContribution.objects.bulk_create(created)
+    return apply_deltas(deltas)
+
+def update_rollups(full=False, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Fold every change since the last run into the rollup tables, one batch
+    of students per transaction. `full` re-reads every student, which is
+    only needed after changes the watermark can't see (e.g. a student
+    moving school). Returns (students read, rollup rows written).
+    """
+    started = timezone.now()
+    watermark, _ = RollupWatermark.objects.get_or_create(name=WATERMARK, defaults={'value': EPOCH})
+    student_ids = sorted(changed_student_ids(None if full else watermark.value))
+
+    rows_written = 0
+    for start in range(0, len(student_ids), batch_size):
+        rows_written += update_students(student_ids[start:start + batch_size])
+
+    RollupWatermark.objects.filter(name=WATERMARK, value__lt=started - SAFETY_LAG).update(
+        value=started - SAFETY_LAG
+    )
+    return len(student_ids), rows_written
@@ -0,0 +1,15 @@
+from rest_framework import serializers
+from .models import Event
+
+MAX_EVENTS_PER_REQUEST = 100
+
+class ClientEventSerializer(serializers.Serializer):
+    event_type = serializers.ChoiceField(choices=Event.CLIENT_EVENT_TYPES)
+    value = serializers.FloatField(required=False, allow_null=True)
+    properties = serializers.DictField(required=False, default=dict)
+
+class EventBatchSerializer(serializers.Serializer):
+    """Serializer for a batch of client-reported events"""
+    events = serializers.ListField(
+        child=ClientEventSerializer(), min_length=1, max_length=MAX_EVENTS_PER_REQUEST
+    )
@@ -1,3 +1,276 @@
-from django.test import TestCase
+import csv
+import os
+import tempfile
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import resolve
+from rest_framework.test import APIClient
+
+from assessments.models import AnswerChoice, AssessmentResult, AssessmentSession, PersonalityType, Question, QuestionResponse
+from recommendations.catalogue import get_catalogue
+from recommendations.models import Career, StudentRecommendation
+from users.models import School
+from .events import EventPipeline
+from .exports import cohort_columns, iter_cohort_chunks
+from .models import EndpointStats, Event, Rollup, SlowRequestSample
+from .rollups import update_rollups
+from .profiling import ProfilerMiddleware, histogram_percentile, latency_bucket, request_profiler
+
+class ProfilerMiddlewareTests(TestCase):
+    def setUp(self):
+        request_profiler.flush()
+        EndpointStats.objects.all().delete()
+        get_user_model().objects.create_user(username='student', password='password123')
+
+    def profile(self, queries=1):
+        def view(request):
+            for _ in range(queries):
+                list(get_user_model().objects.filter(username='student'))
+            return HttpResponse()
+
+        request = RequestFactory().get('/users/login/')
+        request.resolver_match = resolve('/users/login/')
+        ProfilerMiddleware(view)(request)
+
+    def test_timings_are_merged_into_hourly_stats(self):
+        for queries in (1, 3):
+            self.profile(queries)
+        request_profiler.flush()
+        self.profile(2)
+        request_profiler.flush()
+
+        stats = EndpointStats.objects.get()
+        self.assertEqual((stats.url_name, stats.method), (resolve('/users/login/').view_name, 'GET'))
+        self.assertEqual(stats.requests, 3)
+        self.assertEqual(stats.db_queries, 6)
+        self.assertEqual(sum(stats.histogram.values()), 3)
+
+    @override_settings(ANALYTICS_SLOW_REQUEST_MS=0)
+    def test_slow_requests_keep_their_repeated_sql(self):
+        self.profile(queries=4)
+        request_profiler.flush()
+
+        sample = SlowRequestSample.objects.get()
+        self.assertEqual(sample.db_queries, 4)
+        self.assertEqual(sample.top_queries[0]['count'], 4)
+        self.assertIn('users_customuser', sample.top_queries[0]['sql'])
+
+    def test_report_lists_url_names(self):
+        self.profile(queries=2)
+        out = StringIO()
+        call_command('report_hot_paths', stdout=out)
+        self.assertIn(resolve('/users/login/').view_name, out.getvalue())
+
+    def test_histogram_percentiles(self):
+        histogram = {latency_bucket(8): 90, latency_bucket(120): 9, latency_bucket(20000): 1}
+        self.assertEqual(histogram_percentile(histogram, 0.5), 10)
+        self.assertEqual(histogram_percentile(histogram, 0.95), 150)
+        self.assertEqual(histogram_percentile(histogram, 1.0), float('inf'))
+        self.assertIsNone(histogram_percentile({}, 0.5))
+
+class EventPipelineTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='student', password='password123')
+        self.client.force_login(self.user)
+
+    @override_settings(ANALYTICS_EVENTS_ASYNC=False)
+    def test_client_events_are_recorded(self):
+        response = self.client.post('/analytics/api/events/', {'events': [
+            {'event_type': Event.CAREER_VIEWED, 'properties': {'career_id': 3}},
+            {'event_type': Event.RECOMMENDATIONS_VIEWED, 'value': 10},
+        ]}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {'accepted': 2, 'dropped': 0})
+        event = Event.objects.get(event_type=Event.CAREER_VIEWED)
+        self.assertEqual((event.student_id, event.properties), (self.user.studentprofile.id, {'career_id': 3}))
+
+    @override_settings(ANALYTICS_EVENTS_ASYNC=False)
+    def test_properties_may_use_any_key(self):
+        properties = {'student': 1, 'event_type': 'x', 'value': 2, 'properties': {}}
+        response = self.client.post('/analytics/api/events/', {'events': [
+            {'event_type': Event.CAREER_VIEWED, 'value': 5, 'properties': properties},
+        ]}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 202)
+        event = Event.objects.get(event_type=Event.CAREER_VIEWED)
+        self.assertEqual((event.student_id, event.value, event.properties), (self.user.studentprofile.id, 5, properties))
+
+    def test_server_side_event_types_are_rejected(self):
+        response = self.client.post('/analytics/api/events/', {'events': [
+            {'event_type': Event.ASSESSMENT_COMPLETED},
+        ]}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(ANALYTICS_EVENTS_ASYNC=False)
+    def test_answers_are_tracked_once_committed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/assessments/api/sessions/', content_type='application/json')
+        self.assertEqual(Event.objects.filter(event_type=Event.ASSESSMENT_STARTED).count(), 1)
+
+class EventPipelineThreadTests(TransactionTestCase):
+    @override_settings(ANALYTICS_EVENT_BATCH_SIZE=100, ANALYTICS_EVENT_QUEUE_SIZE=1000)
+    def test_events_are_written_in_batches_and_overflow_is_dropped(self):
+        pipeline = EventPipeline()
+        results = [pipeline.track(Event.CAREER_VIEWED, properties={'career_id': i}) for i in range(250)]
+        self.assertTrue(pipeline.flush())
+
+        self.assertTrue(all(results))
+        self.assertEqual(Event.objects.count(), 250)
+        stats = pipeline.stats()
+        self.assertEqual((stats['written'], stats['dropped'], stats['queued']), (250, 0, 0))
+        self.assertGreaterEqual(stats['batches'], 3)
+
+    @override_settings(ANALYTICS_EVENT_QUEUE_SIZE=1, ANALYTICS_EVENT_FLUSH_INTERVAL=0.5)
+    def test_full_queue_drops_instead_of_blocking(self):
+        pipeline = EventPipeline()
+        results = [pipeline.track(Event.CAREER_VIEWED) for _ in range(50)]
+        pipeline.flush()
+
+        self.assertFalse(all(results))
+        stats = pipeline.stats()
+        self.assertEqual(stats['accepted'] + stats['dropped'], 50)
+        self.assertEqual(Event.objects.count(), stats['written'])
+
+class CohortMixin:
+    def create_cohort(self):
+        self.school = School.objects.create(name='Alliance', code='10001', county='Kiambu', type='national')
+        self.types = {
+            mbti_type: PersonalityType.objects.create(
+                mbti_type=mbti_type, name=mbti_type, description='', strengths='', weaknesses='',
+                career_recommendations=''
+            )
+            for mbti_type in ('INTJ', 'ENFP')
+        }
+        self.career = Career.objects.create(
+            name='Engineer', description='', category='stem', job_outlook='high', kenyan_market_demand='growing'
+        )
+        question = Question.objects.create(text='Q', category='EI')
+        self.answer = AnswerChoice.objects.create(question=question, text='A', value=1)
+
+        self.students = []
+        for i, mbti_type in enumerate(['INTJ', 'INTJ', 'ENFP']):
+            student = get_user_model().objects.create_user(username=f'student{i}', password='x').studentprofile
+            student.school = self.school
+            student.save()
+            AssessmentResult.objects.create(
+                student=student, personality_type=self.types[mbti_type],
+                ei_score=0, sn_score=0, tf_score=0, jp_score=0, confidence=0
+            )
+            session = AssessmentSession.objects.create(student=student, is_completed=i < 2)
+            QuestionResponse.objects.create(session=session, question=question, answer=self.answer, response_time=10 * (i + 1))
+            StudentRecommendation.objects.create(
+                student=student, career=self.career, personality_match_score=0.8, overall_score=0.5, reasoning=''
+            )
+            self.students.append(student)
+
+class RollupTests(CohortMixin, TestCase):
+    def setUp(self):
+        self.create_cohort()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(username='school', password='x', user_type='school', school=self.school)
+        )
+
+    def dashboard(self, scope, key):
+        return self.client.get(f'/analytics/api/rollups/{scope}/{key}/').json()
+
+    def test_dashboard_is_served_from_rollups(self):
+        update_rollups()
+        get_catalogue()
+        # Two rollup queries, however many students there are
+        with self.assertNumQueries(2):
+            data = self.dashboard('school', self.school.id)
+
+        self.assertEqual(data['students'], 3)
+        self.assertEqual(data['mbti_distribution'], {'ENFP': 1, 'INTJ': 2})
+        self.assertEqual(data['completion_rate'], 2 / 3)
+        self.assertEqual(data['average_response_time'], 20)
+        self.assertEqual(data['top_careers'][0]['recommendations'], 3)
+        self.assertEqual(self.dashboard('county', 'Kiambu')['students'], 3)
+        self.assertEqual(self.dashboard('mbti', 'INTJ')['top_careers'][0]['recommendations'], 2)
+
+    def test_changes_are_applied_as_deltas(self):
+        update_rollups()
+        result = self.students[0].assessmentresult
+        result.personality_type = self.types['ENFP']
+        result.save()
+        self.students[2].user.delete()
+        update_rollups()
+
+        data = self.dashboard('school', self.school.id)
+        self.assertEqual(data['students'], 2)
+        self.assertEqual(data['mbti_distribution'], {'ENFP': 1, 'INTJ': 1})
+        self.assertEqual(data['average_response_time'], 15)
+        self.assertEqual(self.dashboard('mbti', 'ENFP')['top_careers'][0]['recommendations'], 1)
+
+        # Running again without changes leaves every row as it is
+        before = list(Rollup.objects.order_by('id').values_list('count', 'total'))
+        update_rollups(full=True)
+        self.assertEqual(list(Rollup.objects.order_by('id').values_list('count', 'total')), before)
+
+    def test_students_cannot_read_dashboards(self):
+        self.client.force_authenticate(self.students[0].user)
+        response = self.client.get(f'/analytics/api/rollups/school/{self.school.id}/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_school_accounts_only_read_their_own_school(self):
+        other = School.objects.create(name='Other', code='10002', county='Kiambu', type='county')
+        response = self.client.get(f'/analytics/api/rollups/school/{other.id}/')
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(username='ministry', password='x', user_type='admin')
+        )
+        response = self.client.get(f'/analytics/api/rollups/school/{other.id}/')
+        self.assertEqual(response.status_code, 200)
+
+class CohortExportTests(CohortMixin, TestCase):
+    def setUp(self):
+        self.create_cohort()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(username='school', password='x', user_type='school', school=self.school)
+        )
+
+    def test_csv_is_streamed_in_chunks(self):
+        response = self.client.get(f'/analytics/api/exports/cohort/{self.school.code}/')
+
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0], cohort_columns())
+        self.assertEqual([row[0] for row in rows[1:]], ['student0', 'student1', 'student2'])
+        self.assertEqual(rows[1][7:8] + rows[1][14:16], ['INTJ', 'Engineer', '0.50'])
+
+    def test_school_accounts_cannot_export_another_school(self):
+        School.objects.create(name='Other', code='10002', county='Kiambu', type='county')
+        response = self.client.get('/analytics/api/exports/cohort/10002/')
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(username='staff', password='x', is_staff=True)
+        )
+        response = self.client.get('/analytics/api/exports/cohort/10002/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_queries_grow_with_chunks_not_students(self):
+        with self.assertNumQueries(1 + 2):
+            chunks = list(iter_cohort_chunks(self.school, chunk_size=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+
+    def test_parquet_export(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest('pyarrow is not installed')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cohort.parquet')
+            call_command('export_cohort', school=self.school.code, format='parquet', output=path,
+                         chunk_size=2, stdout=StringIO())
+            parquet = pq.ParquetFile(path)
+            self.assertEqual((parquet.metadata.num_rows, parquet.num_row_groups), (3, 2))
+            self.assertEqual(parquet.read().column('career_1_score').to_pylist(), [0.5, 0.5, 0.5])
@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+app_name = 'analytics'
+
+urlpatterns = [
+    path('api/events/', views.EventIngestView.as_view(), name='events'),
+    path('api/events/status/', views.EventPipelineStatusView.as_view(), name='event_status'),
+    path('api/exports/cohort/<str:school_code>/', views.CohortExportView.as_view(), name='cohort_export'),
+    path('api/rollups/<str:scope>/<str:key>/', views.RollupView.as_view(), name='rollup'),
+]
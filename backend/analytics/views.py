@@ -1,3 +1,118 @@
-from django.shortcuts import render
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import BasePermission, IsAuthenticated, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from recommendations.catalogue import get_catalogue
+from users.models import School
+from .events import event_pipeline
+from .exports import stream_cohort_csv
+from .models import Rollup
+from .serializers import EventBatchSerializer
+
+class EventIngestView(APIView):
+    """Queue a batch of client-reported events; answers before they are written"""
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        serializer = EventBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        student = getattr(request.user, 'studentprofile', None)
+        # Properties stay one dict: client keys must not become keyword arguments
+        accepted = sum(
+            event_pipeline.track(event['event_type'], student, event.get('value'), event['properties'])
+            for event in serializer.validated_data['events']
+        )
+        return Response({
+            'accepted': accepted,
+            'dropped': len(serializer.validated_data['events']) - accepted,
+        }, status=status.HTTP_202_ACCEPTED)
+
+class EventPipelineStatusView(APIView):
+    """Event pipeline counters of this worker"""
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        return Response(event_pipeline.stats())
+
+class IsSchoolOrAdmin(BasePermission):
+    """School and administrator accounts, and staff"""
+    
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and (user.is_staff or user.user_type in ('school', 'admin')))
+
+def can_read_school(user, school_id):
+    """Staff and administrators read every school; a school account only its own"""
+    return user.is_staff or user.user_type == 'admin' or (user.school_id is not None and user.school_id == school_id)
+
+class RollupView(APIView):
+    """
+    Dashboard figures of a school (by id), county (by name) or MBTI type,
+    served from the analytics rollups in two indexed queries. School
+    accounts only see their own school's dashboard.
+    """
+    permission_classes = [IsSchoolOrAdmin]
+    top_careers = 10
+    
+    def get(self, request, scope, key):
+        if scope not in dict(Rollup.SCOPES):
+            raise Http404
+        if scope == 'school' and not can_read_school(request.user, int(key) if key.isdigit() else None):
+            raise PermissionDenied
+        rows = Rollup.objects.filter(scope=scope, scope_key=key)
+        
+        summary = {
+            (row.metric, row.bucket): row
+            for row in rows.filter(metric__in=['students', 'mbti', 'sessions', 'response_time'])
+        }
+        careers_by_id = get_catalogue().careers_by_id
+        top_careers = [
+            {
+                'career_id': int(row.bucket),
+                'name': getattr(careers_by_id.get(int(row.bucket)), 'name', None),
+                'recommendations': row.count,
+                'average_score': row.total / row.count,
+            }
+            for row in rows.filter(metric='career').order_by('-count', 'bucket')[:self.top_careers]
+        ]
+        
+        def count(metric, bucket=''):
+            row = summary.get((metric, bucket))
+            return row.count if row else 0
+        
+        started = count('sessions', 'started')
+        responses = summary.get(('response_time', ''))
+        return Response({
+            'scope': scope,
+            'key': key,
+            'students': count('students'),
+            'mbti_distribution': {
+                bucket: row.count for (metric, bucket), row in sorted(summary.items()) if metric == 'mbti'
+            },
+            'top_careers': top_careers,
+            'sessions_started': started,
+            'sessions_completed': count('sessions', 'completed'),
+            'completion_rate': count('sessions', 'completed') / started if started else None,
+            'average_response_time': responses.total / responses.count if responses else None,
+        })
+
+class CohortExportView(APIView):
+    """
+    CSV of a school's assessment results and top careers, streamed in
+    chunks. School accounts can only export their own school.
+    """
+    permission_classes = [IsSchoolOrAdmin]
+    
+    def get(self, request, school_code):
+        school = get_object_or_404(School, code=school_code)
+        if not can_read_school(request.user, school.id):
+            raise PermissionDenied
+        response = StreamingHttpResponse(stream_cohort_csv(school), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="cohort-{school.code}.csv"'
+        return response
@@ -1,33 +1,30 @@
 from django.core.management.base import BaseCommand
-from assessments.models import PersonalityType, MBTIDimension
+from recommendations.loaders import load_catalogue
 
 class Command(BaseCommand):
     help = 'Populate MBTI personality types and dimensions'
     
     def handle(self, *args, **options):
-        self.populate_dimensions()
-        self.populate_personality_types()
+        results = load_catalogue({
+            'mbti_dimensions': self.dimensions(),
+            'personality_types': self.personality_types(),
+        })
+        self.stdout.write(f"MBTI dimensions: {results['mbti_dimensions']}")
+        self.stdout.write(f"Personality types: {results['personality_types']}")
         self.stdout.write(self.style.SUCCESS('Successfully populated MBTI data'))
     
-    def populate_dimensions(self):
-        """Create MBTI dimensions"""
-        dimensions = [
+    def dimensions(self):
+        """MBTI dimensions"""
+        return [
             {'code': 'EI', 'dimension_a': 'Extraversion', 'dimension_b': 'Introversion', 'description': 'How you interact with others and where you get energy'},
             {'code': 'SN', 'dimension_a': 'Sensing', 'dimension_b': 'Intuition', 'description': 'How you process information and perceive the world'},
             {'code': 'TF', 'dimension_a': 'Thinking', 'dimension_b': 'Feeling', 'description': 'How you make decisions and evaluate information'},
             {'code': 'JP', 'dimension_a': 'Judging', 'dimension_b': 'Perceiving', 'description': 'How you approach life and structure your world'},
         ]
-        
-        for dim_data in dimensions:
-            MBTIDimension.objects.get_or_create(
-                code=dim_data['code'],
-                defaults=dim_data
-            )
-        self.stdout.write("Created MBTI dimensions")
     
-    def populate_personality_types(self):
-        """Create personality types"""
-        personality_types = [
+    def personality_types(self):
+        """Personality types"""
+        return [
             {
                 'mbti_type': 'INTJ',
                 'name': 'The Architect',
@@ -93,10 +90,3 @@ class Command(BaseCommand):
                 'career_recommendations': 'Actors, journalists, consultants, entrepreneurs'
             },
         ]
-        
-        for type_data in personality_types:
-            PersonalityType.objects.get_or_create(
-                mbti_type=type_data['mbti_type'],
-                defaults=type_data
-            )
-        self.stdout.write("Created personality types")
\ No newline at end of file
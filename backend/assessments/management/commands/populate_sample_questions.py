@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from assessments.models import Question, AnswerChoice
+from recommendations.loaders import load_catalogue
 
 class Command(BaseCommand):
     help = 'Populate sample assessment questions'
@@ -59,20 +59,8 @@ class Command(BaseCommand):
         ]
         
         for q_data in questions_data:
-            question, created = Question.objects.get_or_create(
-                text=q_data['text'],
-                category=q_data['category'],
-                defaults={
-                    'dimension_a_weight': 1,
-                    'dimension_b_weight': 1
-                }
-            )
-            
-            for choice_data in q_data['choices']:
-                AnswerChoice.objects.get_or_create(
-                    question=question,
-                    text=choice_data['text'],
-                    defaults={'value': choice_data['value']}
-                )
+            q_data.update({'dimension_a_weight': 1, 'dimension_b_weight': 1})
+        results = load_catalogue({'questions': questions_data})
+        self.stdout.write(f"Questions and choices: {results['questions']}")
         
-        self.stdout.write(self.style.SUCCESS(f'Successfully created {len(questions_data)} sample questions'))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS(f'Successfully created {len(questions_data)} sample questions'))
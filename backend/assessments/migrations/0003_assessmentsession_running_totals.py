@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-17 16:16
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_running_totals(apps, schema_editor):
+    AssessmentSession = apps.get_model('assessments', 'AssessmentSession')
+    QuestionResponse = apps.get_model('assessments', 'QuestionResponse')
+    fields = {'EI': 'ei_total', 'SN': 'sn_total', 'TF': 'tf_total', 'JP': 'jp_total'}
+
+    totals = {}
+    for row in QuestionResponse.objects.values('session_id', 'question__category').annotate(
+        answered=Count('id'), total=Sum('answer__value')
+    ):
+        session_totals = totals.setdefault(row['session_id'], {'answered_count': 0})
+        session_totals['answered_count'] += row['answered']
+        field = fields.get(row['question__category'])
+        if field:
+            session_totals[field] = row['total'] or 0
+
+    for session_id, values in totals.items():
+        AssessmentSession.objects.filter(pk=session_id).update(**values)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessmentsession',
+            name='answered_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='assessmentsession',
+            name='ei_total',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='assessmentsession',
+            name='jp_total',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='assessmentsession',
+            name='sn_total',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='assessmentsession',
+            name='tf_total',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_running_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 16:18
+
+from django.db import migrations, models
+
+
+def order_open_sessions(apps, schema_editor):
+    """Give in-progress sessions an order: answered questions first, cursor after them"""
+    AssessmentSession = apps.get_model('assessments', 'AssessmentSession')
+    Question = apps.get_model('assessments', 'Question')
+    QuestionResponse = apps.get_model('assessments', 'QuestionResponse')
+    question_ids = list(Question.objects.order_by('id').values_list('id', flat=True))
+
+    for session in AssessmentSession.objects.filter(is_completed=False):
+        answered = set(
+            QuestionResponse.objects.filter(session=session).values_list('question_id', flat=True)
+        )
+        session.question_order = (
+            [qid for qid in question_ids if qid in answered]
+            + [qid for qid in question_ids if qid not in answered]
+        )
+        session.cursor = len(answered)
+        session.save(update_fields=['question_order', 'cursor'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0003_assessmentsession_running_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessmentsession',
+            name='cursor',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='assessmentsession',
+            name='question_order',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(order_open_sessions, migrations.RunPython.noop),
+    ]
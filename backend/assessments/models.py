@@ -42,10 +42,35 @@ class AnswerChoice(models.Model):
         return f"{self.text} (Value: {self.value})"
 
 class AssessmentSession(models.Model):
+    DIMENSION_TOTAL_FIELDS = {
+        'EI': 'ei_total',
+        'SN': 'sn_total',
+        'TF': 'tf_total',
+        'JP': 'jp_total',
+    }
+    
     student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE)
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    # Bumped whenever responses are recorded; analytics rollups watch it
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     is_completed = models.BooleanField(default=False)
+    # Running totals kept in step with the session's responses
+    answered_count = models.PositiveIntegerField(default=0)
+    ei_total = models.IntegerField(default=0)
+    sn_total = models.IntegerField(default=0)
+    tf_total = models.IntegerField(default=0)
+    jp_total = models.IntegerField(default=0)
+    # Question ids in the order this session asks them, fixed at creation
+    question_order = models.JSONField(default=list, blank=True)
+    cursor = models.PositiveIntegerField(default=0)  # Index into question_order
+    
+    def get_dimension_totals(self):
+        """Return the running answer-value sum per MBTI dimension"""
+        return {
+            dimension: getattr(self, field)
+            for dimension, field in self.DIMENSION_TOTAL_FIELDS.items()
+        }
     
     def __str__(self):
         return f"Assessment for {self.student.user.username}"
@@ -79,6 +104,7 @@ class AssessmentResult(models.Model):
     jp_score = models.DecimalField(max_digits=5, decimal_places=2)  # Judging-Perceiving
     confidence = models.DecimalField(max_digits=3, decimal_places=2)  # 0.00-1.00
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     def get_dimension_scores(self):
         """Return dimension scores in a structured way"""
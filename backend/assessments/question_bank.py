@@ -0,0 +1,70 @@
+import gzip
+import hashlib
+import re
+from types import MappingProxyType
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from recommendations.catalogue import VersionedSnapshot
+
+QUESTION_BANK = 'question_bank'
+
+accepts_gzip = re.compile(r"\bgzip\b")
+
+class QuestionBankSnapshot:
+    """
+    Serialized question bank, pre-rendered to JSON and gzip once per version.
+    
+    `questions` holds the QuestionSerializer payload; treat it as read-only,
+    it is shared by every request in the worker.
+    """
+    
+    def __init__(self, version, updated_at, questions):
+        self.version = version
+        self.updated_at = updated_at
+        self.questions = tuple(questions)
+        self.questions_by_id = MappingProxyType({question['id']: question for question in self.questions})
+        self.body = JSONRenderer().render(list(self.questions))
+        self.gzipped_body = gzip.compress(self.body)
+        digest = hashlib.sha1(self.body).hexdigest()[:12]
+        # Weak: the plain and gzipped bodies are the same representation.
+        # The version changes with every edit; the digest guards against a
+        # version counter that was reset.
+        self.etag = f'W/"{version}-{digest}"'
+        # Informational only: two edits in the same second share it, so
+        # conditional GETs are answered from the ETag alone
+        self.last_modified = int(updated_at.timestamp()) if updated_at else None
+    
+    @classmethod
+    def build(cls, version, updated_at):
+        from .models import Question
+        from .serializers import QuestionSerializer
+        
+        questions = Question.objects.prefetch_related('choices').order_by('id')
+        return cls(version, updated_at, QuestionSerializer(questions, many=True).data)
+    
+    def as_response(self, request):
+        """Full or 304 response for a (possibly conditional) GET of the bank"""
+        response = get_conditional_response(request, etag=self.etag)
+        if response is None:
+            if accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+                response = HttpResponse(self.gzipped_body, content_type='application/json')
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(self.body, content_type='application/json')
+        
+        response['ETag'] = self.etag
+        if self.last_modified is not None:
+            response['Last-Modified'] = http_date(self.last_modified)
+        # Per-user endpoint: let browsers keep it but always revalidate
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+question_bank = VersionedSnapshot(QUESTION_BANK, QuestionBankSnapshot.build)
+
+def get_question_bank():
+    """Current question bank snapshot for this worker"""
+    return question_bank.get()
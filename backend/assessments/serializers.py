@@ -3,6 +3,8 @@ from .models import (
     MBTIDimension, Question, AnswerChoice, AssessmentSession,
     QuestionResponse, PersonalityType, AssessmentResult
 )
+from .question_bank import get_question_bank
+from .services import MBTICalculator
 
 class MBTIDimensionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -32,18 +34,27 @@ class QuestionResponseSerializer(serializers.ModelSerializer):
 class AssessmentSessionSerializer(serializers.ModelSerializer):
     responses = QuestionResponseSerializer(many=True, read_only=True)
     progress = serializers.SerializerMethodField()
+    partial_type = serializers.SerializerMethodField()
     
     class Meta:
         model = AssessmentSession
-        fields = ['id', 'student', 'started_at', 'completed_at', 'is_completed', 'responses', 'progress']
-        read_only_fields = ['started_at', 'completed_at', 'is_completed']
+        fields = [
+            'id', 'student', 'started_at', 'completed_at', 'is_completed', 'responses',
+            'progress', 'answered_count', 'partial_type'
+        ]
+        read_only_fields = ['started_at', 'completed_at', 'is_completed', 'answered_count']
     
     def get_progress(self, obj):
-        total_questions = Question.objects.count()
+        total_questions = len(get_question_bank().questions)
         if total_questions == 0:
             return 0
-        responses_count = obj.responses.count()
-        return min(100, int((responses_count / total_questions) * 100))
+        return min(100, int((obj.answered_count / total_questions) * 100))
+    
+    def get_partial_type(self, obj):
+        """MBTI type implied by the answers so far"""
+        if obj.answered_count == 0:
+            return None
+        return MBTICalculator(obj).determine_personality_type(obj.get_dimension_totals())
 
 class PersonalityTypeSerializer(serializers.ModelSerializer):
     class Meta:
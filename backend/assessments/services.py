@@ -1,5 +1,178 @@
+import random
+from collections import defaultdict
+from itertools import zip_longest
+from django.conf import settings
 from django.db import transaction
-from .models import AssessmentSession, AssessmentResult, PersonalityType
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import AnswerChoice, AssessmentSession, AssessmentResult, PersonalityType, QuestionResponse
+from .question_bank import get_question_bank
+from analytics.events import track_event
+from analytics.models import Event
+
+def build_question_order(mode=None):
+    """
+    Question ids for a new session, from the cached question bank.
+    
+    ASSESSMENT_QUESTION_ORDER picks the mode: 'sequential' (bank order, the
+    default), 'shuffled', or 'stratified' (shuffled within each dimension,
+    then interleaved EI, SN, TF, JP, EI, ... so dimensions stay balanced).
+    """
+    mode = mode or getattr(settings, 'ASSESSMENT_QUESTION_ORDER', 'sequential')
+    questions = get_question_bank().questions
+    question_ids = [question['id'] for question in questions]
+    
+    if mode == 'shuffled':
+        random.shuffle(question_ids)
+    elif mode == 'stratified':
+        by_dimension = defaultdict(list)
+        for question in questions:
+            by_dimension[question['category']].append(question['id'])
+        for ids in by_dimension.values():
+            random.shuffle(ids)
+        question_ids = [
+            question_id
+            for group in zip_longest(*(by_dimension[code] for code in AssessmentSession.DIMENSION_TOTAL_FIELDS))
+            for question_id in group if question_id is not None
+        ]
+    return question_ids
+
+@transaction.atomic
+def record_responses(session, responses):
+    """
+    Save (question_id, answer_id, response_time) answers for a session and
+    keep its running dimension totals in step.
+    
+    All pairs are validated with one AnswerChoice query and written with one
+    bulk upsert, so the query count does not grow with the batch. New
+    answers add their value; a changed answer adds the difference to the
+    value it replaces.
+    
+    Returns one report dict per input item, in input order, with a
+    'status' of 'accepted' or 'rejected' (plus an 'error' when rejected).
+    """
+    # Serialise writers per session so the deltas below stay exact
+    cursor, question_order = AssessmentSession.objects.select_for_update().filter(
+        pk=session.pk
+    ).values_list('cursor', 'question_order').get()
+    
+    responses = list(responses)
+    choices = {
+        answer_id: (question_id, category, value)
+        for answer_id, question_id, category, value in AnswerChoice.objects.filter(
+            id__in={answer_id for _, answer_id, _ in responses}
+        ).values_list('id', 'question_id', 'question__category', 'value')
+    }
+    
+    report = []
+    latest = {}  # question_id -> index of the last valid answer in the batch
+    for index, (question_id, answer_id, response_time) in enumerate(responses):
+        item = {'question_id': question_id, 'answer_id': answer_id, 'status': 'accepted'}
+        choice = choices.get(answer_id)
+        if choice is None or choice[0] != question_id:
+            item.update(status='rejected', error='Invalid question or answer')
+        elif question_id in latest:
+            # Only the last answer to a question in one batch is kept
+            report[latest[question_id]].update(status='rejected', error='Superseded later in the batch')
+        if item['status'] == 'accepted':
+            latest[question_id] = index
+        report.append(item)
+    
+    previous_values = dict(
+        QuestionResponse.objects.filter(
+            session=session, question_id__in=list(latest)
+        ).values_list('question_id', 'answer__value')
+    )
+    
+    answered = 0
+    deltas = defaultdict(int)
+    rows = []
+    for question_id, index in latest.items():
+        _, answer_id, response_time = responses[index]
+        _, category, value = choices[answer_id]
+        if question_id in previous_values:
+            value -= previous_values[question_id]
+        else:
+            answered += 1
+        deltas[category] += value
+        rows.append(QuestionResponse(
+            session=session,
+            question_id=question_id,
+            answer_id=answer_id,
+            response_time=response_time,
+        ))
+    
+    QuestionResponse.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['session', 'question'],
+        update_fields=['answer', 'response_time'],
+    )
+    
+    updates = {
+        AssessmentSession.DIMENSION_TOTAL_FIELDS[category]: F(AssessmentSession.DIMENSION_TOTAL_FIELDS[category]) + delta
+        for category, delta in deltas.items() if delta
+    }
+    if answered:
+        updates['answered_count'] = F('answered_count') + answered
+    
+    # Move the cursor to the first unanswered question in session order.
+    # Answering the question at the cursor may also expose questions
+    # answered out of order earlier, so look those up too. Questions deleted
+    # from the bank since the session started are stepped over.
+    new_cursor = cursor
+    live_ids = get_question_bank().questions_by_id
+    if cursor < len(question_order) and (
+        question_order[cursor] in latest or question_order[cursor] not in live_ids
+    ):
+        answered_ids = set(latest) | set(QuestionResponse.objects.filter(
+            session=session, question_id__in=question_order[cursor:]
+        ).values_list('question_id', flat=True))
+        while new_cursor < len(question_order) and (
+            question_order[new_cursor] in answered_ids or question_order[new_cursor] not in live_ids
+        ):
+            new_cursor += 1
+    if new_cursor != cursor:
+        updates['cursor'] = new_cursor
+    if rows:
+        updates['updated_at'] = timezone.now()
+    
+    if updates:
+        AssessmentSession.objects.filter(pk=session.pk).update(**updates)
+        session.refresh_from_db(fields=[
+            'answered_count', 'cursor', *AssessmentSession.DIMENSION_TOTAL_FIELDS.values()
+        ])
+    
+    def track_answers():
+        for row in rows:
+            track_event(Event.QUESTION_ANSWERED, session.student_id, row.response_time,
+                        session_id=session.pk, question_id=row.question_id)
+    transaction.on_commit(track_answers)
+    return report
+
+def recompute_session_totals(sessions):
+    """
+    Rebuild the running totals of `sessions` (an AssessmentSession queryset)
+    from their stored responses, with one UPDATE.
+    
+    record_responses only applies the value of each answer as it is given,
+    so totals go stale when an answer choice's value or a question's
+    category changes afterwards. Saves and deletes through the ORM recompute
+    the affected sessions (see assessments.signals); call this after bulk
+    edits such as QuerySet.update() or bulk_update().
+    """
+    responses = QuestionResponse.objects.filter(session=OuterRef('pk')).order_by().values('session')
+    
+    def aggregate(responses, expression):
+        return Coalesce(Subquery(responses.annotate(result=expression).values('result')), 0)
+    
+    updates = {
+        field: aggregate(responses.filter(question__category=category), Sum('answer__value'))
+        for category, field in AssessmentSession.DIMENSION_TOTAL_FIELDS.items()
+    }
+    updates['answered_count'] = aggregate(responses, Count('pk'))
+    return AssessmentSession.objects.filter(pk__in=sessions.values('pk')).update(**updates)
 
 class MBTICalculator:
     def __init__(self, assessment_session):
@@ -13,13 +186,8 @@ class MBTICalculator:
     
     def calculate_scores(self):
         """Calculate raw scores for each dimension"""
-        responses = self.session.responses.select_related('question', 'answer').all()
-        
-        for response in responses:
-            category = response.question.category
-            value = response.answer.value
-            self.scores[category] += value
-        
+        # Totals are maintained as responses are recorded; no re-scan needed
+        self.scores.update(self.session.get_dimension_totals())
         return self.scores
     
     def determine_personality_type(self, scores):
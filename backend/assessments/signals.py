@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from recommendations.catalogue import bump_catalogue_version
+from .models import AnswerChoice, AssessmentSession, Question, QuestionResponse
+from .question_bank import QUESTION_BANK
+from .services import recompute_session_totals
+
+@receiver([post_save, post_delete], sender=Question)
+@receiver([post_save, post_delete], sender=AnswerChoice)
+def question_bank_changed(sender, **kwargs):
+    """Bump the question bank version whenever a question or choice changes"""
+    bump_catalogue_version(QUESTION_BANK)
+
+def sessions_answering(sender, instance):
+    field = 'question_id' if sender is Question else 'answer_id'
+    return AssessmentSession.objects.filter(
+        pk__in=QuestionResponse.objects.filter(**{field: instance.pk}).values('session_id')
+    )
+
+@receiver(post_save, sender=Question)
+@receiver(post_save, sender=AnswerChoice)
+def answer_values_changed(sender, instance, created, **kwargs):
+    """A choice's value or a question's category feeds the running totals of sessions that used it"""
+    if not created:
+        recompute_session_totals(sessions_answering(sender, instance))
+
+@receiver(pre_delete, sender=Question)
+@receiver(pre_delete, sender=AnswerChoice)
+def answers_deleted(sender, instance, **kwargs):
+    """Deleting a question or choice deletes its responses; recompute their sessions afterwards"""
+    session_ids = list(sessions_answering(sender, instance).values_list('pk', flat=True))
+    if session_ids:
+        transaction.on_commit(
+            lambda: recompute_session_totals(AssessmentSession.objects.filter(pk__in=session_ids))
+        )
@@ -1,3 +1,336 @@
-from django.test import TestCase
+import gzip
+import importlib
+import json
+import random
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+
+from recommendations.catalogue import get_catalogue_version
+from recommendations.loaders import load_catalogue
+from users.models import CustomUser
+from .models import AnswerChoice, AssessmentSession, Question, QuestionResponse
+from .question_bank import QUESTION_BANK, get_question_bank, question_bank
+from .services import build_question_order, record_responses, recompute_session_totals
+
+class AssessmentTestMixin:
+    def create_question(self, text, category='EI', values=(3, -3)):
+        question = Question.objects.create(text=text, category=category)
+        AnswerChoice.objects.bulk_create([
+            AnswerChoice(question=question, text=f'{text} {value}', value=value) for value in values
+        ])
+        return question
+
+    def choice(self, question, value):
+        return question.choices.get(value=value)
+
+    def create_student(self, username='student'):
+        user = CustomUser.objects.create_user(username=username, password='password123')
+        return user, user.studentprofile
+
+class QuestionOrderTests(AssessmentTestMixin, TestCase):
+    def setUp(self):
+        question_bank.invalidate()
+        self.questions = [self.create_question(name) for name in 'ABC']
+        self.user, self.student = self.create_student()
+        self.session = AssessmentSession.objects.create(
+            student=self.student, question_order=[question.id for question in self.questions]
+        )
+        self.client.force_login(self.user)
+
+    def answer(self, question):
+        record_responses(self.session, [(question.id, self.choice(question, 3).id, 5)])
+
+    def next_question(self):
+        return self.client.get(f'/assessments/api/get_next_question/{self.session.id}/').json()
+
+    def test_out_of_order_answers_move_the_cursor_past_every_answered_question(self):
+        a, b, c = self.questions
+        self.answer(b)
+        self.assertEqual(self.session.cursor, 0)
+        self.assertEqual(self.next_question()['id'], a.id)
+
+        self.answer(a)
+        self.assertEqual(self.session.cursor, 2)
+        self.assertEqual(self.next_question()['id'], c.id)
+
+        self.answer(c)
+        self.assertEqual(self.next_question(), {'message': 'All questions answered'})
+
+    def test_deleted_questions_do_not_stall_the_cursor(self):
+        a, b, c = self.questions
+        a.delete()
+        self.assertEqual(self.next_question()['id'], b.id)
+
+        self.answer(b)
+        self.assertEqual(self.session.cursor, 2)
+        self.assertEqual(self.next_question()['id'], c.id)
+
+    def test_questions_answered_ahead_of_the_cursor_are_not_served(self):
+        a, b, c = self.questions
+        self.answer(b)
+        self.answer(c)
+        a.delete()
+
+        self.assertEqual(self.session.cursor, 0)
+        self.assertEqual(self.next_question(), {'message': 'All questions answered'})
+
+class BuildQuestionOrderTests(AssessmentTestMixin, TestCase):
+    def setUp(self):
+        question_bank.invalidate()
+        self.questions = [
+            self.create_question(f'{category} {i}', category=category)
+            for category, count in (('EI', 3), ('SN', 2), ('TF', 1), ('JP', 3))
+            for i in range(count)
+        ]
+        self.ids = [question.id for question in self.questions]
+        self.categories = {question.id: question.category for question in self.questions}
+
+    def test_sequential_is_bank_order(self):
+        self.assertEqual(build_question_order('sequential'), self.ids)
+        with self.settings(ASSESSMENT_QUESTION_ORDER='sequential'):
+            self.assertEqual(build_question_order(), self.ids)
+
+    def test_shuffled_is_a_permutation(self):
+        random.seed(3)
+        orders = [build_question_order('shuffled') for _ in range(5)]
+
+        for order in orders:
+            self.assertCountEqual(order, self.ids)
+        self.assertTrue(any(order != self.ids for order in orders))
+
+    def test_stratified_interleaves_the_dimensions(self):
+        random.seed(3)
+        with self.settings(ASSESSMENT_QUESTION_ORDER='stratified'):
+            order = build_question_order()
+
+        self.assertCountEqual(order, self.ids)
+        self.assertEqual(
+            [self.categories[question_id] for question_id in order],
+            ['EI', 'SN', 'TF', 'JP', 'EI', 'SN', 'JP', 'EI', 'JP'],
+        )
+
+    @override_settings(ANALYTICS_EVENTS_ASYNC=False)
+    def test_new_sessions_store_their_order(self):
+        user, student = self.create_student()
+        self.client.force_login(user)
+
+        with self.settings(ASSESSMENT_QUESTION_ORDER='stratified'):
+            response = self.client.post('/assessments/api/sessions/')
+
+        session = AssessmentSession.objects.get(student=student)
+        self.assertEqual(response.status_code, 201)
+        self.assertCountEqual(session.question_order, self.ids)
+        self.assertEqual(self.categories[session.question_order[1]], 'SN')
+        self.assertEqual(session.cursor, 0)
+
+class QuestionOrderBackfillTests(AssessmentTestMixin, TestCase):
+    migration = importlib.import_module('assessments.migrations.0004_assessmentsession_question_order')
+
+    def test_open_sessions_get_answered_questions_first(self):
+        a, b, c, d = [self.create_question(name) for name in 'ABCD']
+        _, student = self.create_student()
+        open_session = AssessmentSession.objects.create(student=student)
+        done_session = AssessmentSession.objects.create(student=student, is_completed=True)
+        for session, question in ((open_session, c), (open_session, a), (done_session, b)):
+            QuestionResponse.objects.create(session=session, question=question, answer=self.choice(question, 3))
+
+        self.migration.order_open_sessions(apps, connection.schema_editor())
+
+        open_session.refresh_from_db()
+        done_session.refresh_from_db()
+        self.assertEqual(open_session.question_order, [a.id, c.id, b.id, d.id])
+        self.assertEqual(open_session.cursor, 2)
+        self.assertEqual((done_session.question_order, done_session.cursor), ([], 0))
+
+@override_settings(ANALYTICS_EVENTS_ASYNC=False)
+class BulkResponseTests(AssessmentTestMixin, TestCase):
+    url = '/assessments/api/submit_bulk_responses/'
+
+    def setUp(self):
+        question_bank.invalidate()
+        self.questions = [self.create_question(f'Question {i}') for i in range(12)]
+        self.user, self.student = self.create_student()
+        self.session = AssessmentSession.objects.create(
+            student=self.student, question_order=[question.id for question in self.questions]
+        )
+        self.client.force_login(self.user)
+
+    def submit(self, items):
+        return self.client.post(self.url, {'session_id': self.session.id, 'responses': [
+            {'question_id': question_id, 'answer_id': answer_id, 'response_time': 4}
+            for question_id, answer_id in items
+        ]}, content_type='application/json')
+
+    def test_each_item_is_reported(self):
+        a, b = self.questions[:2]
+        response = self.submit([
+            (a.id, self.choice(a, 3).id),
+            (b.id, self.choice(a, 3).id),  # choice of another question
+            (a.id, self.choice(a, -3).id),
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['accepted'], response.data['rejected']), (1, 2))
+        self.assertEqual([item['status'] for item in response.data['results']], ['rejected', 'rejected', 'accepted'])
+        self.assertEqual(response.data['results'][0]['error'], 'Superseded later in the batch')
+        self.assertEqual(QuestionResponse.objects.get(session=self.session).answer, self.choice(a, -3))
+
+    def test_queries_do_not_grow_with_the_batch(self):
+        def queries(questions):
+            items = [(question.id, self.choice(question, 3).id) for question in questions]
+            with CaptureQueriesContext(connection) as captured:
+                self.submit(items)
+            return len(captured)
+
+        # The first request also refreshes the login session
+        queries(self.questions[:1])
+        self.assertEqual(queries(self.questions[1:3]), queries(self.questions[3:]))
+        self.assertEqual(self.session.responses.count(), 12)
+
+class QuestionBankTests(AssessmentTestMixin, TestCase):
+    url = '/assessments/api/questions/'
+
+    def setUp(self):
+        # Snapshots outlive each test's rolled back rows
+        question_bank.invalidate()
+        self.question = self.create_question('I enjoy parties')
+        self.user, _ = self.create_student()
+        self.client.force_login(self.user)
+
+    def test_bank_is_built_once_per_version(self):
+        bank = get_question_bank()
+        with self.assertNumQueries(0):
+            self.assertIs(get_question_bank(), bank)
+        self.assertEqual([question['id'] for question in bank.questions], [self.question.id])
+        self.assertEqual(len(bank.questions_by_id[self.question.id]['choices']), 2)
+
+    def test_question_and_choice_saves_invalidate_the_bank(self):
+        version = get_catalogue_version(QUESTION_BANK)[0]
+        bank = get_question_bank()
+
+        other = self.create_question('I plan ahead', category='JP')
+        self.assertGreater(get_catalogue_version(QUESTION_BANK)[0], version)
+        self.assertEqual([question['id'] for question in get_question_bank().questions], [self.question.id, other.id])
+
+        choice = self.choice(self.question, 3)
+        choice.text = 'Very much'
+        choice.save()
+        texts = [c['text'] for c in get_question_bank().questions_by_id[self.question.id]['choices']]
+        self.assertIn('Very much', texts)
+        self.assertIsNot(get_question_bank(), bank)
+
+    def test_conditional_get_returns_304_until_the_bank_changes(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), list(get_question_bank().questions))
+        etag = response['ETag']
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.create_question('I plan ahead', category='JP')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(json.loads(response.content)), 2)
+
+    def test_edits_in_the_same_second_are_not_hidden_by_last_modified(self):
+        now = datetime(2026, 1, 5, 8, 0, 0, 100000, tzinfo=dt_timezone.utc)
+        with mock.patch('recommendations.catalogue.timezone.now', return_value=now):
+            self.create_question('I plan ahead', category='JP')
+            first = self.client.get(self.url)
+            self.create_question('I like routines', category='JP')
+        second = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+
+        self.assertEqual(first['Last-Modified'], http_date(now.timestamp()))
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(len(json.loads(second.content)), 3)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+
+    def test_gzip_body_is_served_when_accepted(self):
+        plain = self.client.get(self.url)
+        compressed = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertEqual(compressed['ETag'], plain['ETag'])
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+
+class RunningTotalsTests(AssessmentTestMixin, TestCase):
+    def setUp(self):
+        self.ei = self.create_question('I enjoy parties', 'EI', values=(3, 1, -3))
+        self.jp = self.create_question('I plan ahead', 'JP', values=(2, -2))
+        _, self.student = self.create_student()
+        self.session = AssessmentSession.objects.create(student=self.student)
+
+    def answer(self, session, *answers):
+        return record_responses(session, [(question.id, self.choice(question, value).id, 5) for question, value in answers])
+
+    def totals(self):
+        self.session.refresh_from_db()
+        return self.session.answered_count, self.session.get_dimension_totals()
+
+    def test_new_answers_add_their_values(self):
+        self.answer(self.session, (self.ei, 3), (self.jp, -2))
+
+        self.assertEqual(self.totals(), (2, {'EI': 3, 'SN': 0, 'TF': 0, 'JP': -2}))
+
+    def test_changed_answers_apply_the_difference(self):
+        self.answer(self.session, (self.ei, 3))
+        self.answer(self.session, (self.ei, -3), (self.jp, 2))
+        # Only the last answer to a question in one batch counts
+        self.answer(self.session, (self.jp, -2), (self.jp, 2))
+
+        self.assertEqual(self.totals(), (2, {'EI': -3, 'SN': 0, 'TF': 0, 'JP': 2}))
+
+    def test_concurrent_writers_do_not_lose_updates(self):
+        # Two requests holding the same, now stale, session row
+        first = AssessmentSession.objects.get(pk=self.session.pk)
+        second = AssessmentSession.objects.get(pk=self.session.pk)
+        self.answer(first, (self.ei, 1))
+        self.answer(second, (self.jp, 2))
+        self.answer(first, (self.ei, 3))
+
+        self.assertEqual(self.totals(), (2, {'EI': 3, 'SN': 0, 'TF': 0, 'JP': 2}))
+        self.assertEqual((second.answered_count, second.jp_total, second.ei_total), (2, 2, 1))
+
+    def test_choice_and_question_edits_recompute_the_totals(self):
+        self.answer(self.session, (self.ei, 3), (self.jp, 2))
+
+        choice = self.choice(self.ei, 3)
+        choice.value = 2
+        choice.save()
+        self.assertEqual(self.totals(), (2, {'EI': 2, 'SN': 0, 'TF': 0, 'JP': 2}))
+
+        self.jp.category = 'TF'
+        self.jp.save()
+        self.assertEqual(self.totals(), (2, {'EI': 2, 'SN': 0, 'TF': 2, 'JP': 0}))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            choice.delete()
+        self.assertEqual(self.totals(), (1, {'EI': 0, 'SN': 0, 'TF': 2, 'JP': 0}))
+
+    def test_loaded_choice_values_recompute_the_totals(self):
+        self.answer(self.session, (self.ei, 3))
+
+        load_catalogue({'questions': [{
+            'text': self.ei.text, 'category': 'EI',
+            'choices': [{'text': choice.text, 'value': -choice.value} for choice in self.ei.choices.all()],
+        }]})
+
+        self.assertEqual(self.totals(), (1, {'EI': -3, 'SN': 0, 'TF': 0, 'JP': 0}))
+
+    def test_recompute_matches_the_running_totals(self):
+        self.answer(self.session, (self.ei, 1), (self.jp, -2))
+        expected = self.totals()
+        AssessmentSession.objects.filter(pk=self.session.pk).update(answered_count=0, ei_total=9, jp_total=9)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(recompute_session_totals(AssessmentSession.objects.filter(pk=self.session.pk)), 1)
+        self.assertEqual(self.totals(), expected)
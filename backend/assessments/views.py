@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from django.shortcuts import render, get_object_or_404
 from django.db import transaction
+from django.utils import timezone
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView, DetailView
 
@@ -17,7 +18,10 @@ from .serializers import (
     QuestionResponseSerializer, AssessmentResultSerializer,
     AssessmentSubmissionSerializer, PersonalityTypeSerializer
 )
-from .services import MBTICalculator
+from .services import MBTICalculator, build_question_order, record_responses
+from .question_bank import get_question_bank
+from analytics.events import track_event
+from analytics.models import Event
 
 class QuestionViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated]
@@ -26,6 +30,10 @@ class QuestionViewSet(viewsets.ReadOnlyModelViewSet):
     
     def get_queryset(self):
         return Question.objects.prefetch_related('choices').all()
+    
+    def list(self, request, *args, **kwargs):
+        # Pre-rendered, pre-compressed bank; answers conditional GETs with 304
+        return get_question_bank().as_response(request)
 
 class AssessmentSessionViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
@@ -55,7 +63,11 @@ class AssessmentSessionViewSet(viewsets.ModelViewSet):
             return Response(serializer.data)
         
         # Create new session
-        session = AssessmentSession.objects.create(student=student_profile)
+        session = AssessmentSession.objects.create(
+            student=student_profile,
+            question_order=build_question_order()
+        )
+        track_event(Event.ASSESSMENT_STARTED, student_profile, session_id=session.id)
         serializer = self.get_serializer(session)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
@@ -71,29 +83,27 @@ class AssessmentSessionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
             
-        question_id = request.data.get('question_id')
-        answer_id = request.data.get('answer_id')
-        response_time = request.data.get('response_time', 0)
-        
         try:
-            question = Question.objects.get(id=question_id)
-            answer = AnswerChoice.objects.get(id=answer_id, question=question)
-        except (Question.DoesNotExist, AnswerChoice.DoesNotExist):
+            question_id = int(request.data.get('question_id'))
+            answer_id = int(request.data.get('answer_id'))
+            response_time = int(request.data.get('response_time', 0))
+        except (TypeError, ValueError):
             return Response(
                 {'error': 'Invalid question or answer'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Save or update response
-        response, created = QuestionResponse.objects.update_or_create(
-            session=session,
-            question=question,
-            defaults={
-                'answer': answer,
-                'response_time': response_time
-            }
-        )
+        # Save or update response, keeping the session's running totals in step
+        report = record_responses(session, [(question_id, answer_id, response_time)])
+        if report[0]['status'] == 'rejected':
+            return Response(
+                {'error': 'Invalid question or answer'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
+        response = QuestionResponse.objects.select_related('question', 'answer').get(
+            session=session, question_id=question_id
+        )
         serializer = QuestionResponseSerializer(response)
         return Response(serializer.data)
     
@@ -110,9 +120,9 @@ class AssessmentSessionViewSet(viewsets.ModelViewSet):
             )
         
         # FIX: Reduced minimum questions for testing
-        if session.responses.count() < 5:  # Reduced from 20 for testing
+        if session.answered_count < 5:  # Reduced from 20 for testing
             return Response(
-                {'error': f'Complete more questions before finishing. You have answered {session.responses.count()} questions.'},
+                {'error': f'Complete more questions before finishing. You have answered {session.answered_count} questions.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
@@ -123,7 +133,13 @@ class AssessmentSessionViewSet(viewsets.ModelViewSet):
             
             # Mark session as completed
             session.is_completed = True
-            session.save()
+            session.completed_at = timezone.now()
+            session.save(update_fields=['is_completed', 'completed_at', 'updated_at'])
+            track_event(
+                Event.ASSESSMENT_COMPLETED, session.student_id,
+                (session.completed_at - session.started_at).total_seconds(),
+                session_id=session.id, mbti_type=result.personality_type.mbti_type,
+            )
             
             # Return results
             result_serializer = AssessmentResultSerializer(result)
@@ -172,10 +188,13 @@ class AssessmentQuestionView(LoginRequiredMixin, TemplateView):
         # Get or create assessment session
         session, created = AssessmentSession.objects.get_or_create(
             student=self.request.user.studentprofile,
-            is_completed=False
+            is_completed=False,
+            defaults={'question_order': build_question_order()}
         )
+        if created:
+            track_event(Event.ASSESSMENT_STARTED, session.student_id, session_id=session.id)
         context['session'] = session
-        context['questions'] = Question.objects.prefetch_related('choices').all()
+        context['questions'] = get_question_bank().questions
         return context
 
 class AssessmentResultsView(LoginRequiredMixin, DetailView):
@@ -195,8 +214,9 @@ class AssessmentResultsView(LoginRequiredMixin, DetailView):
         try:
             from recommendations.services import RecommendationEngine
             engine = RecommendationEngine(self.object.student)
-            recommendations = engine.generate_career_recommendations(top_n=5)
-            context['career_recommendations'] = recommendations
+            # Persist the full top 10 (saving replaces the stored set) but show 5
+            recommendations = engine.generate_career_recommendations(top_n=10)
+            context['career_recommendations'] = recommendations[:5]
         except Exception as e:
             print(f"Error getting recommendations: {e}")
             context['career_recommendations'] = []
@@ -225,28 +245,23 @@ def submit_bulk_responses(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        with transaction.atomic():
-            for response_data in responses_data:
-                question_id = response_data['question_id']
-                answer_id = response_data['answer_id']
-                response_time = response_data.get('response_time', 0)
-                
-                try:
-                    question = Question.objects.get(id=question_id)
-                    answer = AnswerChoice.objects.get(id=answer_id, question=question)
-                    
-                    QuestionResponse.objects.update_or_create(
-                        session=session,
-                        question=question,
-                        defaults={
-                            'answer': answer,
-                            'response_time': response_time
-                        }
-                    )
-                except (Question.DoesNotExist, AnswerChoice.DoesNotExist):
-                    continue  # Skip invalid responses
+        # Invalid responses are skipped and reported back per item
+        report = record_responses(session, [
+            (
+                response_data['question_id'],
+                response_data['answer_id'],
+                response_data.get('response_time', 0),
+            )
+            for response_data in responses_data
+        ])
+        accepted = sum(1 for item in report if item['status'] == 'accepted')
         
-        return Response({'status': 'Responses saved successfully'})
+        return Response({
+            'status': 'Responses saved successfully',
+            'accepted': accepted,
+            'rejected': len(report) - accepted,
+            'results': report,
+        })
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -265,16 +280,22 @@ def get_next_question(request, session_id):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Get answered question IDs
-    answered_question_ids = session.responses.values_list('question_id', flat=True)
+    # Sessions created before any questions existed have no order yet
+    if not session.question_order:
+        session.question_order = build_question_order()
+        session.save(update_fields=['question_order'])
     
-    # Get next unanswered question
-    next_question = Question.objects.exclude(
-        id__in=answered_question_ids
-    ).prefetch_related('choices').first()
+    # Walk the session's fixed order from the cursor, skipping questions
+    # removed from the bank since the session started and questions
+    # answered out of order ahead of the cursor
+    questions_by_id = get_question_bank().questions_by_id
+    remaining = session.question_order[session.cursor:]
+    answered_ids = set(QuestionResponse.objects.filter(
+        session=session, question_id__in=remaining
+    ).values_list('question_id', flat=True))
+    for question_id in remaining:
+        next_question = questions_by_id.get(question_id)
+        if next_question and question_id not in answered_ids:
+            return Response(next_question)
     
-    if next_question:
-        serializer = QuestionSerializer(next_question)
-        return Response(serializer.data)
-    else:
-        return Response({'message': 'All questions answered'})
\ No newline at end of file
+    return Response({'message': 'All questions answered'})
@@ -1,6 +1,8 @@
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 
 load_dotenv()
 
@@ -65,9 +67,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings and query counts include every other middleware
+    # (sessions, authentication, ...)
+    'analytics.profiling.ProfilerMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'users.sessions.SessionRefreshMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -150,5 +156,70 @@ AUTHENTICATION_BACKENDS = [
 
 # Session settings
 SESSION_COOKIE_AGE = 1209600  # 2 weeks in seconds
-SESSION_SAVE_EVERY_REQUEST = True
-
+# Sessions are saved when they change, and otherwise re-saved (extending
+# their expiry) once older than this fraction of SESSION_COOKIE_AGE; see
+# users.sessions.SessionRefreshMiddleware
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_FRACTION = float(os.getenv('SESSION_REFRESH_FRACTION', '0.1'))
+# Session store: 'cached_db' (reads from the session cache, writes through
+# to the database), 'signed_cookies' (no server-side storage) or 'db'
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.getenv('SESSION_STORE', 'cached_db')
+# The session cache is Redis when SESSION_CACHE_URL is set. Otherwise it
+# falls back to files shared by the workers of one host (SESSION_CACHE_DIR),
+# or to per-process memory with SESSION_CACHE_DIR=locmem, which is only safe
+# with a single worker: a logout would not reach other processes' memory.
+# Neither fallback is shared between hosts, so with DEBUG off SESSION_CACHE_URL
+# is required unless SESSION_CACHE_SINGLE_HOST=True declares that every
+# worker runs on one host.
+SESSION_CACHE_ALIAS = 'sessions'
+if os.getenv('SESSION_CACHE_URL'):
+    _session_cache = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': os.getenv('SESSION_CACHE_URL')}
+elif not DEBUG and os.getenv('SESSION_CACHE_SINGLE_HOST') != 'True':
+    raise ImproperlyConfigured(
+        'Set SESSION_CACHE_URL to a Redis server, or SESSION_CACHE_SINGLE_HOST=True '
+        'if every worker runs on one host: the file-based session cache is not shared between hosts'
+    )
+elif os.getenv('SESSION_CACHE_DIR') == 'locmem':
+    _session_cache = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'sessions'}
+else:
+    _session_cache = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('SESSION_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'careeratlas-sessions')),
+    }
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    SESSION_CACHE_ALIAS: _session_cache,
+}
+# Cached dashboard summaries (users.summary) are invalidated from whichever
+# worker saves the change, so they need a cache every worker shares
+USERS_SUMMARY_CACHE_ALIAS = SESSION_CACHE_ALIAS
+# Rows with a password the admin student import accepts; each is hashed in
+# the web request, so larger files go through the import_students command
+USERS_ADMIN_IMPORT_MAX_PASSWORDS = int(os.getenv('USERS_ADMIN_IMPORT_MAX_PASSWORDS', '50'))
+
+# Related careers (recommendations.neighbours): neighbours stored per career,
+# refreshed after each catalogue change unless CAREER_NEIGHBOURS_AUTO_REFRESH
+# is False, in which case run the refresh_career_neighbours command
+CAREER_NEIGHBOURS = int(os.getenv('CAREER_NEIGHBOURS', '10'))
+CAREER_NEIGHBOURS_AUTO_REFRESH = os.getenv('CAREER_NEIGHBOURS_AUTO_REFRESH', 'True') == 'True'
+
+# AI coach settings
+AI_COACH_INFERENCE_URL = os.getenv(
+    'AI_COACH_INFERENCE_URL',
+    'https://api-inference.huggingface.co/models/microsoft/DialoGPT-medium'
+)
+AI_COACH_INFERENCE_TIMEOUT = float(os.getenv('AI_COACH_INFERENCE_TIMEOUT', '20'))
+# Generate replies on a background worker pool; False generates them inline
+AI_COACH_ASYNC_REPLIES = os.getenv('AI_COACH_ASYNC_REPLIES', 'True') == 'True'
+AI_COACH_REPLY_WORKERS = int(os.getenv('AI_COACH_REPLY_WORKERS', '4'))
+# Recent messages quoted in AI coach prompts; older turns are summarized
+AI_COACH_CONTEXT_MESSAGES = int(os.getenv('AI_COACH_CONTEXT_MESSAGES', '6'))
+AI_COACH_PROMPT_CHAR_BUDGET = int(os.getenv('AI_COACH_PROMPT_CHAR_BUDGET', '3000'))
+
+# Request profiler (analytics.profiling); see the report_hot_paths command
+ANALYTICS_PROFILER_ENABLED = os.getenv('ANALYTICS_PROFILER_ENABLED', 'True') == 'True'
+ANALYTICS_PROFILER_FLUSH_INTERVAL = int(os.getenv('ANALYTICS_PROFILER_FLUSH_INTERVAL', '60'))
+ANALYTICS_SLOW_REQUEST_MS = int(os.getenv('ANALYTICS_SLOW_REQUEST_MS', '500'))
+# Usage events (analytics.events); False writes each event inline
+ANALYTICS_EVENTS_ASYNC = os.getenv('ANALYTICS_EVENTS_ASYNC', 'True') == 'True'
+ANALYTICS_EVENT_BATCH_SIZE = int(os.getenv('ANALYTICS_EVENT_BATCH_SIZE', '1000'))
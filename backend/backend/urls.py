@@ -11,6 +11,7 @@ urlpatterns = [
     path('assessments/', include('assessments.urls')),
     path('recommendations/', include('recommendations.urls')),
     path('ai-coach/', include('ai_coach.urls')),
+    path('analytics/', include('analytics.urls')),
 ]
 
 # Serve static and media files during development
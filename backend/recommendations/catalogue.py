@@ -0,0 +1,216 @@
+import threading
+import time
+from contextlib import contextmanager
+from types import MappingProxyType
+
+from django.conf import settings
+from django.db.models import F
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import CatalogueVersion
+
+CAREER_CATALOGUE = 'careers'
+
+# Seconds a worker trusts its snapshot before re-reading the version row.
+# Bumps made in the same process invalidate immediately.
+DEFAULT_VERSION_CHECK_INTERVAL = 5
+
+_snapshots = {}
+# Sent with the catalogue's `name` after its version is bumped
+catalogue_bumped = Signal()
+# Names bumped inside defer_catalogue_bumps(), per thread
+_deferred = threading.local()
+
+def get_catalogue_version(name=CAREER_CATALOGUE):
+    """Return (version, updated_at) for a catalogue; (0, None) if never bumped"""
+    row = CatalogueVersion.objects.filter(name=name).values_list('version', 'updated_at').first()
+    return row or (0, None)
+
+def bump_catalogue_version(name=CAREER_CATALOGUE):
+    """Mark a catalogue as changed so every worker rebuilds its snapshot"""
+    pending = getattr(_deferred, 'names', None)
+    if pending is not None:
+        pending.add(name)
+        return
+
+    updated = CatalogueVersion.objects.filter(name=name).update(
+        version=F('version') + 1,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        CatalogueVersion.objects.get_or_create(name=name, defaults={'version': 1})
+
+    for snapshot in _snapshots.get(name, []):
+        snapshot.invalidate()
+    catalogue_bumped.send(sender=None, name=name)
+
+@contextmanager
+def defer_catalogue_bumps():
+    """
+    Collapse the bumps made inside the block (e.g. by post_delete signals
+    of a bulk delete) into one bump per catalogue when it exits. A block
+    that raises bumps nothing; its changes are being rolled back.
+    """
+    if getattr(_deferred, 'names', None) is not None:
+        yield
+        return
+    names = _deferred.names = set()
+    try:
+        yield
+    finally:
+        _deferred.names = None
+    for name in sorted(names):
+        bump_catalogue_version(name)
+
+class VersionedSnapshot:
+    """
+    Process-wide, lazily rebuilt snapshot of a catalogue.
+
+    `builder(version, updated_at)` is called to build a fresh snapshot
+    whenever the catalogue version in the database differs from the one the
+    current snapshot was built for. The version row is read at most once per
+    CATALOGUE_VERSION_CHECK_INTERVAL seconds, so steady-state requests do not
+    touch the database at all.
+    """
+
+    def __init__(self, name, builder):
+        self.name = name
+        self.builder = builder
+        self._snapshot = None
+        self._version = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+        _snapshots.setdefault(name, []).append(self)
+
+    def get(self):
+        interval = getattr(settings, 'CATALOGUE_VERSION_CHECK_INTERVAL', DEFAULT_VERSION_CHECK_INTERVAL)
+        checked_at = self._checked_at
+        if self._snapshot is not None and checked_at is not None and time.monotonic() - checked_at < interval:
+            return self._snapshot
+
+        with self._lock:
+            version, updated_at = get_catalogue_version(self.name)
+            if self._snapshot is None or self._version != version:
+                # Read the version before building: a bump that lands while
+                # we build leaves us one version behind and we rebuild again.
+                self._snapshot = self.builder(version, updated_at)
+                self._version = version
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    def invalidate(self):
+        """Force the next get() to rebuild the snapshot"""
+        self._checked_at = None
+        self._version = None
+
+class CatalogueSnapshot:
+    """
+    Immutable in-memory copy of the career catalogue.
+
+    Careers carry prefetched required/recommended subjects, so templates and
+    serializers can walk them without issuing queries. Treat every object
+    here as read-only: instances are shared by all requests in the worker.
+    """
+
+    def __init__(self, version, updated_at, careers, subjects, personality_types, compatibility):
+        self.version = version
+        self.updated_at = updated_at
+        self.careers = tuple(careers)
+        self.subjects = tuple(subjects)
+        self.personality_types = tuple(personality_types)
+        self.careers_by_id = MappingProxyType({career.id: career for career in self.careers})
+        self.subjects_by_id = MappingProxyType({subject.id: subject for subject in self.subjects})
+        self.required_subject_ids = MappingProxyType({
+            career.id: tuple(subject.id for subject in career.required_subjects.all())
+            for career in self.careers
+        })
+        self.recommended_subject_ids = MappingProxyType({
+            career.id: tuple(subject.id for subject in career.recommended_subjects.all())
+            for career in self.careers
+        })
+        # {(career_id, personality_type_id): compatibility_score}
+        self.compatibility = MappingProxyType(dict(compatibility))
+        self.categories = tuple(sorted({career.category for career in self.careers}))
+        self._scoring = None
+        self._search_index = None
+
+    @classmethod
+    def build(cls, version, updated_at):
+        from assessments.models import PersonalityType
+        from .models import Career, CareerPersonalityMatch, Subject
+
+        return cls(
+            version=version,
+            updated_at=updated_at,
+            careers=Career.objects.prefetch_related(
+                'required_subjects', 'recommended_subjects'
+            ).order_by('id'),
+            subjects=Subject.objects.order_by('id'),
+            personality_types=PersonalityType.objects.order_by('id'),
+            compatibility=(
+                ((career_id, type_id), score)
+                for career_id, type_id, score in CareerPersonalityMatch.objects.values_list(
+                    'career_id', 'personality_type_id', 'compatibility_score'
+                )
+            ),
+        )
+
+    @property
+    def scoring(self):
+        """CareerScoringMatrix for this snapshot, built on first use"""
+        if self._scoring is None:
+            from .scoring import CareerScoringMatrix
+
+            self._scoring = CareerScoringMatrix(
+                career_ids=[career.id for career in self.careers],
+                subject_ids=[subject.id for subject in self.subjects],
+                personality_type_ids=[personality_type.id for personality_type in self.personality_types],
+                required_links=[
+                    (career_id, subject_id)
+                    for career_id, subject_ids in self.required_subject_ids.items()
+                    for subject_id in subject_ids
+                ],
+                recommended_links=[
+                    (career_id, subject_id)
+                    for career_id, subject_ids in self.recommended_subject_ids.items()
+                    for subject_id in subject_ids
+                ],
+                compatibility_scores=[
+                    (career_id, type_id, score)
+                    for (career_id, type_id), score in self.compatibility.items()
+                ],
+            )
+        return self._scoring
+
+    @property
+    def search_index(self):
+        """CareerSearchIndex for this snapshot, built on first use"""
+        if self._search_index is None:
+            from .search import CareerSearchIndex
+
+            self._search_index = CareerSearchIndex.from_catalogue(self)
+        return self._search_index
+
+    def search_careers(self, query):
+        """Careers matching a free-text query, best match first"""
+        return [self.careers_by_id[career_id] for career_id in self.search_index.search(query)]
+
+    def related_careers(self, career, limit=5):
+        """Careers sharing the category or a required subject, in catalogue order"""
+        required = set(self.required_subject_ids.get(career.id, ()))
+        related = []
+        for other in self.careers:
+            if other.id == career.id:
+                continue
+            if other.category == career.category or required.intersection(self.required_subject_ids[other.id]):
+                related.append(other)
+                if len(related) == limit:
+                    break
+        return related
+
+career_catalogue = VersionedSnapshot(CAREER_CATALOGUE, CatalogueSnapshot.build)
+
+def get_catalogue():
+    """Current career catalogue snapshot for this worker"""
+    return career_catalogue.get()
@@ -0,0 +1,272 @@
+import csv
+import json
+import os
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from assessments.models import AnswerChoice, AssessmentSession, MBTIDimension, PersonalityType, Question
+from assessments.question_bank import QUESTION_BANK
+from assessments.services import recompute_session_totals
+from users.summary import invalidate_all_student_summaries
+from .catalogue import CAREER_CATALOGUE, bump_catalogue_version, defer_catalogue_bumps
+from .models import Career, CareerPersonalityMatch, LearningStyle, Subject
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Kinds of catalogue rows a fixture can hold, in the order they are loaded:
+# (model, natural key fields, other fields, catalogue to bump)
+KINDS = {
+    'mbti_dimensions': (MBTIDimension, ('code',), ('dimension_a', 'dimension_b', 'description'), None),
+    'personality_types': (
+        PersonalityType, ('mbti_type',),
+        ('name', 'description', 'strengths', 'weaknesses', 'career_recommendations'), CAREER_CATALOGUE,
+    ),
+    'learning_styles': (LearningStyle, ('name',), ('description', 'study_recommendations'), None),
+    'subjects': (Subject, ('code',), ('name', 'category', 'difficulty_level'), CAREER_CATALOGUE),
+    'careers': (
+        Career, ('name',),
+        ('description', 'category', 'job_outlook', 'kenyan_market_demand', 'average_salary'), CAREER_CATALOGUE,
+    ),
+    'questions': (Question, ('text', 'category'), ('dimension_a_weight', 'dimension_b_weight'), QUESTION_BANK),
+}
+
+# CSV columns holding ';'-separated lists; 'name:value' items become pairs
+LIST_COLUMNS = {'required_subjects', 'recommended_subjects', 'personality_matches', 'choices'}
+
+class LoadStats:
+    """Rows created, updated, deleted and left alone by a load, plus skipped references"""
+
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.deleted = 0
+        self.unchanged = 0
+        self.missing = []
+
+    def add(self, other):
+        self.created += other.created
+        self.updated += other.updated
+        self.deleted += other.deleted
+        self.unchanged += other.unchanged
+        self.missing += other.missing
+
+    @property
+    def changed(self):
+        return bool(self.created or self.updated or self.deleted)
+
+    def __str__(self):
+        return f'{self.created} created, {self.updated} updated, {self.deleted} deleted, {self.unchanged} unchanged'
+
+def read_fixture(path, kind=None):
+    """
+    Read a YAML, JSON or CSV fixture into {kind: [record, ...]}.
+
+    YAML and JSON files hold either a mapping of kinds to lists of records
+    or, with `kind`, a single list. A CSV file holds one kind, taken from
+    `kind` or the file name (e.g. careers.csv).
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline='', encoding='utf-8-sig') as fixture:
+        if extension == '.csv':
+            kind = kind or os.path.splitext(os.path.basename(path))[0]
+            records = [
+                {column: split_list(value) if column in LIST_COLUMNS else value for column, value in row.items()}
+                for row in csv.DictReader(fixture)
+            ]
+            data = {kind: records}
+        elif extension in ('.yaml', '.yml'):
+            # PyYAML is only needed for YAML fixtures
+            import yaml
+            data = yaml.safe_load(fixture)
+        elif extension == '.json':
+            data = json.load(fixture)
+        else:
+            raise ValueError(f'Unsupported fixture format: {path}')
+
+    if isinstance(data, list):
+        if not kind:
+            raise ValueError(f'{path} holds a list of records; say which kind they are')
+        data = {kind: data}
+    unknown = set(data) - set(KINDS)
+    if unknown:
+        raise ValueError(f"Unknown catalogue kind(s) in {path}: {', '.join(sorted(unknown))}")
+    return data
+
+def split_list(value):
+    items = [item.strip() for item in (value or '').split(';') if item.strip()]
+    return [item.rsplit(':', 1) if ':' in item else item for item in items]
+
+def clean(model, record, fields, label):
+    """Model values for `fields` of a record; absent fields get the model default"""
+    values = {}
+    for name in fields:
+        field = model._meta.get_field(name)
+        value = record.get(name)
+        if value is None or (value == '' and field.null):
+            value = None if field.null else field.get_default()
+        try:
+            values[name] = field.to_python(value)
+        except ValidationError as e:
+            raise ValueError(f'{label}: invalid {name} {value!r} ({"; ".join(e.messages)})')
+    return values
+
+def sync_rows(model, key_fields, fields, records, queryset=None, prune=False, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Make the rows of `queryset` (all rows of `model` by default) match
+    `records`, {natural key: {field: value}}, with one read and a bulk
+    insert, update and delete. Rows missing from `records` are only deleted
+    with `prune`. Returns ({natural key: row}, LoadStats).
+    """
+    stats = LoadStats()
+    existing = {}
+    for row in (model.objects.all() if queryset is None else queryset).order_by('pk'):
+        # Duplicate keys (possible where the key isn't unique): the oldest row wins
+        existing.setdefault(tuple(getattr(row, name) for name in key_fields), row)
+
+    to_create, to_update = [], []
+    rows = {}
+    for key, values in records.items():
+        row = existing.pop(key, None)
+        if row is None:
+            row = model(**dict(zip(key_fields, key)), **values)
+            to_create.append(row)
+        elif any(getattr(row, name) != value for name, value in values.items()):
+            for name, value in values.items():
+                setattr(row, name, value)
+            to_update.append(row)
+        else:
+            stats.unchanged += 1
+        rows[key] = row
+
+    model.objects.bulk_create(to_create, batch_size=batch_size)
+    if to_update and fields:
+        model.objects.bulk_update(to_update, fields, batch_size=batch_size)
+    stats.created = len(to_create)
+    stats.updated = len(to_update)
+    if prune and existing:
+        stats.deleted = len(existing)
+        for start in range(0, len(existing), batch_size):
+            ids = [row.pk for row in list(existing.values())[start:start + batch_size]]
+            model.objects.filter(pk__in=ids).delete()
+    return rows, stats
+
+def keyed_records(kind, records):
+    model, key_fields, fields, _ = KINDS[kind]
+    keyed = {}
+    for record in records:
+        key = tuple(clean(model, record, key_fields, kind).values())
+        if not all(key):
+            raise ValueError(f'{kind}: every record needs {", ".join(key_fields)}')
+        keyed[key] = clean(model, record, fields, f'{kind} {key[0]!r}')
+    return keyed
+
+def load_catalogue(data, prune=False, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Load {kind: [record, ...]} (see read_fixture) in one transaction and bump
+    the versions of the catalogues that changed. Rows are matched on their
+    natural key, and a career's subjects and personality matches are
+    replaced by those in its record. With `prune`, rows of a loaded kind
+    (and choices of a loaded question) missing from the fixture are deleted.
+    Returns {kind: LoadStats}.
+    """
+    results = {}
+    with transaction.atomic(), defer_catalogue_bumps():
+        for kind, (model, key_fields, fields, catalogue) in KINDS.items():
+            if kind not in data:
+                continue
+            records = data[kind] or []
+            rows, stats = sync_rows(
+                model, key_fields, fields, keyed_records(kind, records), prune=prune, batch_size=batch_size
+            )
+            if kind == 'careers':
+                stats.add(load_career_links(records, rows, batch_size))
+            elif kind == 'questions':
+                stats.add(load_question_choices(records, rows, prune, batch_size))
+            if stats.changed and catalogue:
+                bump_catalogue_version(catalogue)
+            elif stats.changed and kind == 'learning_styles':
+                # bulk writes send no signals; dashboard summaries copy these descriptions
+                invalidate_all_student_summaries()
+            results[kind] = stats
+    return results
+
+def load_career_links(records, careers, batch_size):
+    """
+    Replace the subject links and personality matches of the loaded careers.
+    A career whose record leaves out a relation keeps its current rows.
+    """
+    stats = LoadStats()
+    subject_ids = {}
+    for subject_id, code, name in Subject.objects.values_list('id', 'code', 'name'):
+        subject_ids.setdefault(name, subject_id)
+        subject_ids[code] = subject_id
+    type_ids = dict(PersonalityType.objects.values_list('mbti_type', 'id'))
+
+    relations = ('required_subjects', 'recommended_subjects', 'personality_matches')
+    owners = {relation: [] for relation in relations}
+    links = {relation: {} for relation in relations}
+    for record in records:
+        career_id = careers[(record['name'],)].id
+        for relation in relations:
+            if relation in record:
+                owners[relation].append(career_id)
+        for relation in ('required_subjects', 'recommended_subjects'):
+            for subject in record.get(relation) or []:
+                if subject in subject_ids:
+                    links[relation][(career_id, subject_ids[subject])] = {}
+                else:
+                    stats.missing.append(f"{record['name']}: unknown subject {subject!r}")
+        for match in record.get('personality_matches') or []:
+            if not isinstance(match, dict):
+                match = {'type': match[0], 'score': match[1]}
+            if match['type'] not in type_ids:
+                stats.missing.append(f"{record['name']}: unknown personality type {match['type']!r}")
+                continue
+            links['personality_matches'][(career_id, type_ids[match['type']])] = clean(
+                CareerPersonalityMatch, match | {'compatibility_score': match['score']},
+                ('compatibility_score', 'reasoning'), f"{record['name']} {match['type']}",
+            )
+
+    for relation in ('required_subjects', 'recommended_subjects'):
+        through = getattr(Career, relation).through
+        _, link_stats = sync_rows(
+            through, ('career_id', 'subject_id'), (), links[relation],
+            queryset=through.objects.filter(career_id__in=owners[relation]), prune=True, batch_size=batch_size,
+        )
+        stats.add(link_stats)
+    _, match_stats = sync_rows(
+        CareerPersonalityMatch, ('career_id', 'personality_type_id'), ('compatibility_score', 'reasoning'),
+        links['personality_matches'],
+        queryset=CareerPersonalityMatch.objects.filter(career_id__in=owners['personality_matches']),
+        prune=True, batch_size=batch_size,
+    )
+    stats.add(match_stats)
+    return stats
+
+def load_question_choices(records, questions, prune, batch_size):
+    """
+    Add and update the answer choices of the loaded questions. Choices
+    missing from a record are only deleted with `prune`, since deleting a
+    choice deletes the responses that chose it.
+    """
+    choices = {}
+    for record in records:
+        question = questions[tuple(clean(Question, record, ('text', 'category'), 'questions').values())]
+        for choice in record.get('choices') or []:
+            if not isinstance(choice, dict):
+                choice = {'text': choice[0], 'value': choice[1]}
+            choices[(question.id, choice['text'])] = clean(
+                AnswerChoice, choice, ('value',), f"choice {choice['text']!r}"
+            )
+
+    question_ids = [question.id for question in questions.values()]
+    _, stats = sync_rows(
+        AnswerChoice, ('question_id', 'text'), ('value',), choices,
+        queryset=AnswerChoice.objects.filter(question_id__in=question_ids),
+        prune=prune, batch_size=batch_size,
+    )
+    if stats.updated or stats.deleted:
+        # bulk_update sends no signals; bring the sessions' running totals in line
+        recompute_session_totals(AssessmentSession.objects.filter(responses__question_id__in=question_ids))
+    return stats
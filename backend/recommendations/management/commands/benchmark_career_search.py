@@ -0,0 +1,113 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recommendations.catalogue import CatalogueSnapshot
+from recommendations.models import Career, Subject
+
+ROLES = [
+    'Engineer', 'Technician', 'Doctor', 'Nurse', 'Teacher', 'Lawyer', 'Accountant', 'Analyst',
+    'Designer', 'Pilot', 'Farmer', 'Chef', 'Journalist', 'Developer', 'Scientist', 'Manager',
+]
+FIELDS = [
+    'Civil', 'Electrical', 'Software', 'Agricultural', 'Medical', 'Financial', 'Marine', 'Mining',
+    'Environmental', 'Clinical', 'Graphic', 'Data', 'Aviation', 'Hospitality', 'Media', 'Energy',
+]
+WORDS = [
+    'design', 'build', 'care', 'patients', 'systems', 'communities', 'research', 'teach', 'manage',
+    'analyse', 'reports', 'projects', 'county', 'Nairobi', 'clients', 'safety', 'quality', 'field',
+]
+SUBJECTS = [
+    'Mathematics', 'English', 'Kiswahili', 'Biology', 'Chemistry', 'Physics', 'Geography', 'History',
+    'Business Studies', 'Computer Studies', 'Agriculture', 'Art and Design', 'Home Science', 'French',
+]
+QUERIES = ['engineer', 'software developer', 'daktari', 'mwalimu', 'civil eng', 'bio', 'nairobi clinical', 'te']
+
+class Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = 'Benchmark career search (substring scan vs. inverted index) on a synthetic catalogue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--careers', type=int, default=10000,
+                            help='Number of synthetic careers')
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='Timed runs per query')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            # The synthetic catalogue is rolled back afterwards
+            with transaction.atomic():
+                catalogue = self.create_catalogue(options['careers'], random.Random(options['seed']))
+                raise Rollback
+        except Rollback:
+            pass
+
+        started = time.perf_counter()
+        catalogue.search_index
+        build_ms = (time.perf_counter() - started) * 1000
+        self.stdout.write(
+            f"{len(catalogue.careers)} careers, {len(catalogue.search_index.vocabulary)} terms, "
+            f"index built in {build_ms:.1f} ms"
+        )
+
+        self.stdout.write(f"{'query':<20} {'scan ms':>9} {'scan hits':>10} {'index p50':>10} {'index p95':>10} {'hits':>6}")
+        for query in QUERIES:
+            scan_ms, scan_hits = self.measure(lambda: self.scan(catalogue, query), options['repeat'])
+            index_ms, hits = self.measure(lambda: catalogue.search_careers(query), options['repeat'])
+            self.stdout.write(
+                f'{query:<20} {statistics.median(scan_ms):>9.2f} {len(scan_hits):>10} '
+                f'{statistics.median(index_ms):>10.2f} {self.p95(index_ms):>10.2f} {len(hits):>6}'
+            )
+
+    def measure(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings, result
+
+    def p95(self, timings):
+        return sorted(timings)[min(len(timings) - 1, int(len(timings) * 0.95))]
+
+    def scan(self, catalogue, query):
+        """The previous search: unranked substring match on name and description"""
+        query = query.lower()
+        careers = [
+            career for career in catalogue.careers
+            if query in career.name.lower() or query in career.description.lower()
+        ]
+        return sorted(careers, key=lambda career: career.name)
+
+    def create_catalogue(self, size, rng):
+        subjects = Subject.objects.bulk_create([
+            Subject(name=name, code=f'bench-{i}', category='sciences', difficulty_level='medium')
+            for i, name in enumerate(SUBJECTS)
+        ])
+        categories = [value for value, _ in Career._meta.get_field('category').choices]
+
+        # Start from an empty catalogue so the numbers only reflect synthetic rows
+        Career.objects.all().delete()
+        careers = Career.objects.bulk_create([
+            Career(
+                name=f'{rng.choice(FIELDS)} {rng.choice(ROLES)} {i}',
+                description=' '.join(rng.choices(WORDS, k=25)),
+                category=rng.choice(categories), job_outlook='medium', kenyan_market_demand='stable',
+            )
+            for i in range(size)
+        ])
+        required_through = Career.required_subjects.through
+        recommended_through = Career.recommended_subjects.through
+        required_links, recommended_links = [], []
+        for career in careers:
+            picked = rng.sample(subjects, 5)
+            required_links.extend(required_through(career_id=career.id, subject_id=s.id) for s in picked[:2])
+            recommended_links.extend(recommended_through(career_id=career.id, subject_id=s.id) for s in picked[2:])
+        required_through.objects.bulk_create(required_links)
+        recommended_through.objects.bulk_create(recommended_links)
+        return CatalogueSnapshot.build(version=0, updated_at=None)
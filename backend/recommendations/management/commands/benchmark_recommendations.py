@@ -0,0 +1,148 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from assessments.models import AssessmentResult, PersonalityType
+from recommendations.models import Career, CareerPersonalityMatch, Subject
+from recommendations.scoring import CareerScoringMatrix
+from recommendations.services import RecommendationEngine
+from users.models import CustomUser, StudentProfile
+
+MBTI_TYPES = [
+    'INTJ', 'INTP', 'ENTJ', 'ENTP', 'INFJ', 'INFP', 'ENFJ', 'ENFP',
+    'ISTJ', 'ISFJ', 'ESTJ', 'ESFJ', 'ISTP', 'ISFP', 'ESTP', 'ESFP',
+]
+
+class Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = 'Benchmark career scoring (per-career loop vs. matrix engine) on a synthetic catalogue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[100, 1000, 10000],
+                            help='Catalogue sizes (number of careers) to benchmark')
+        parser.add_argument('--legacy-limit', type=int, default=1000,
+                            help='Skip the per-career loop above this many careers')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Timed runs per engine and size')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'careers':>8} {'engine':>8} {'queries':>8} {'ms/run':>10} {'same ranking':>13}")
+        for size in options['sizes']:
+            try:
+                # Everything below is synthetic and rolled back afterwards
+                with transaction.atomic():
+                    self.benchmark_size(size, options)
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def benchmark_size(self, size, options):
+        rng = random.Random(options['seed'])
+        student = self.create_catalogue(size, rng)
+        engine = RecommendationEngine(student)
+
+        matrix_result, matrix_queries, matrix_ms = self.measure(
+            lambda: self.run_matrix(engine), options['repeat']
+        )
+
+        same = '-'
+        if size <= options['legacy_limit']:
+            legacy_result, legacy_queries, legacy_ms = self.measure(
+                lambda: self.run_legacy(engine), options['repeat']
+            )
+            same = 'yes' if legacy_result == matrix_result else 'NO'
+            self.stdout.write(f"{size:>8} {'loop':>8} {legacy_queries:>8} {legacy_ms:>10.2f} {'':>13}")
+        else:
+            self.stdout.write(f"{size:>8} {'loop':>8} {'skipped':>8}")
+
+        self.stdout.write(f"{size:>8} {'matrix':>8} {matrix_queries:>8} {matrix_ms:>10.2f} {same:>13}")
+
+    def measure(self, func, repeat):
+        # The query log is a bounded deque; start empty so counts stay exact
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as queries:
+            result = func()
+        query_count = len(queries)
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        elapsed_ms = (time.perf_counter() - started) * 1000 / repeat
+        return result, query_count, elapsed_ms
+
+    def run_matrix(self, engine):
+        """Catalogue load plus scoring, without persisting recommendations"""
+        matrix = CareerScoringMatrix.from_database()
+        scored = matrix.recommend(
+            engine.assessment_result.personality_type_id,
+            engine.student.subjects.values_list('id', flat=True),
+            top_n=10,
+        )
+        return [(career_id, round(overall, 10)) for career_id, _, _, overall in scored]
+
+    def run_legacy(self, engine):
+        """The original per-career loop: 4N+1 queries"""
+        scored = []
+        for career in Career.objects.order_by('id'):
+            personality_score = float(engine.calculate_personality_match(career))
+            academic_score = float(engine.calculate_academic_match(career))
+            overall_score = (personality_score * 0.6) + (academic_score * 0.4)
+            scored.append((career.id, overall_score))
+        scored.sort(key=lambda x: x[1], reverse=True)
+        return [(career_id, round(overall, 10)) for career_id, overall in scored[:10]]
+
+    def create_catalogue(self, size, rng):
+        subjects = Subject.objects.bulk_create([
+            Subject(name=f'Bench Subject {i}', code=f'bench-{i}', category='sciences', difficulty_level='medium')
+            for i in range(30)
+        ])
+        personality_types = []
+        for mbti_type in MBTI_TYPES:
+            personality_type, _ = PersonalityType.objects.get_or_create(
+                mbti_type=mbti_type,
+                defaults={'name': mbti_type, 'description': '', 'strengths': '',
+                          'weaknesses': '', 'career_recommendations': ''}
+            )
+            personality_types.append(personality_type)
+
+        # Start from an empty catalogue so the numbers only reflect synthetic rows
+        Career.objects.all().delete()
+        careers = Career.objects.bulk_create([
+            Career(name=f'Bench Career {i}', description='', category='stem',
+                   job_outlook='medium', kenyan_market_demand='stable')
+            for i in range(size)
+        ])
+
+        required_through = Career.required_subjects.through
+        recommended_through = Career.recommended_subjects.through
+        required_links, recommended_links, matches = [], [], []
+        for career in careers:
+            picked = rng.sample(subjects, 5)
+            required_links.extend(
+                required_through(career_id=career.id, subject_id=s.id) for s in picked[:rng.randint(0, 2)]
+            )
+            recommended_links.extend(
+                recommended_through(career_id=career.id, subject_id=s.id) for s in picked[2:]
+            )
+            matches.extend(
+                CareerPersonalityMatch(career=career, personality_type=p,
+                                       compatibility_score=round(rng.random(), 2), reasoning='')
+                for p in rng.sample(personality_types, 4)
+            )
+        required_through.objects.bulk_create(required_links)
+        recommended_through.objects.bulk_create(recommended_links)
+        CareerPersonalityMatch.objects.bulk_create(matches)
+
+        user = CustomUser.objects.create_user(username='benchmark-student', password=None)
+        student, _ = StudentProfile.objects.get_or_create(user=user)
+        student.subjects.set(rng.sample(subjects, 8))
+        AssessmentResult.objects.create(
+            student=student, personality_type=personality_types[0],
+            ei_score=0, sn_score=0, tf_score=0, jp_score=0, confidence=0,
+        )
+        return student
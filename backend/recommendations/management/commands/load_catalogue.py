@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from recommendations.loaders import DEFAULT_BATCH_SIZE, KINDS, load_catalogue, read_fixture
+
+class Command(BaseCommand):
+    help = 'Load careers, subjects, personality types and other catalogue rows from YAML, JSON or CSV fixtures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixtures', nargs='+', help='Fixture files, loaded together in one transaction')
+        parser.add_argument('--kind', choices=sorted(KINDS),
+                            help='Kind of the records in a list or CSV fixture (CSV default: the file name)')
+        parser.add_argument('--prune', action='store_true',
+                            help='Delete rows of the loaded kinds that are not in the fixtures')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        data = {}
+        try:
+            for path in options['fixtures']:
+                for kind, records in read_fixture(path, options['kind']).items():
+                    data.setdefault(kind, []).extend(records or [])
+            started = time.perf_counter()
+            results = load_catalogue(data, prune=options['prune'], batch_size=options['batch_size'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        for kind, stats in results.items():
+            self.stdout.write(f'{kind}: {stats}')
+            for message in stats.missing:
+                self.stderr.write(f'  skipped {message}')
+        self.stdout.write(self.style.SUCCESS(f'Loaded catalogue in {elapsed:.1f}s'))
@@ -1,18 +1,19 @@
 from django.core.management.base import BaseCommand
-from recommendations.models import Career, Subject, CareerPersonalityMatch
-from assessments.models import PersonalityType
+from recommendations.loaders import load_catalogue
 
 class Command(BaseCommand):
     help = 'Populate Kenyan career data with local context'
     
     def handle(self, *args, **options):
-        self.populate_subjects()
-        self.populate_careers()
+        # Loaded together: one transaction and one catalogue version bump
+        results = load_catalogue({'subjects': self.subjects(), 'careers': self.careers()})
+        self.stdout.write(f"Subjects: {results['subjects']}")
+        self.stdout.write(f"Careers: {results['careers']}")
         self.stdout.write(self.style.SUCCESS('Successfully populated Kenyan career data'))
     
-    def populate_subjects(self):
-        """Create common Kenyan high school subjects"""
-        kenyan_subjects = [
+    def subjects(self):
+        """Common Kenyan high school subjects"""
+        return [
             {'name': 'Mathematics', 'code': '121', 'category': 'sciences', 'difficulty_level': 'hard'},
             {'name': 'English', 'code': '101', 'category': 'languages', 'difficulty_level': 'medium'},
             {'name': 'Kiswahili', 'code': '102', 'category': 'languages', 'difficulty_level': 'medium'},
@@ -24,17 +25,10 @@ class Command(BaseCommand):
             {'name': 'Business Studies', 'code': '565', 'category': 'business', 'difficulty_level': 'medium'},
             {'name': 'Computer Studies', 'code': '451', 'category': 'technical', 'difficulty_level': 'medium'},
         ]
-        
-        for subject_data in kenyan_subjects:
-            Subject.objects.get_or_create(
-                code=subject_data['code'],
-                defaults=subject_data
-            )
-        self.stdout.write("Created Kenyan subjects")
     
-    def populate_careers(self):
-        """Create Kenyan career paths"""
-        kenyan_careers = [
+    def careers(self):
+        """Kenyan career paths"""
+        return [
             {
                 'name': 'Software Developer',
                 'description': 'Design and develop software applications and systems for various industries.',
@@ -81,36 +75,3 @@ class Command(BaseCommand):
                 ]
             },
         ]
-        
-        for career_data in kenyan_careers:
-            career, created = Career.objects.get_or_create(
-                name=career_data['name'],
-                defaults={
-                    'description': career_data['description'],
-                    'category': career_data['category'],
-                    'job_outlook': career_data['job_outlook'],
-                    'kenyan_market_demand': career_data['kenyan_market_demand'],
-                    'average_salary': career_data['average_salary'],
-                }
-            )
-            
-            # Add subjects
-            required_subjects = Subject.objects.filter(name__in=career_data['required_subjects'])
-            recommended_subjects = Subject.objects.filter(name__in=career_data['recommended_subjects'])
-            
-            career.required_subjects.set(required_subjects)
-            career.recommended_subjects.set(recommended_subjects)
-            
-            # Add personality matches
-            for match in career_data['personality_matches']:
-                try:
-                    personality_type = PersonalityType.objects.get(mbti_type=match['type'])
-                    CareerPersonalityMatch.objects.get_or_create(
-                        career=career,
-                        personality_type=personality_type,
-                        defaults={'compatibility_score': match['score']}
-                    )
-                except PersonalityType.DoesNotExist:
-                    continue
-        
-        self.stdout.write("Created Kenyan careers")
\ No newline at end of file
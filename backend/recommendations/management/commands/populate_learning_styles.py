@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from recommendations.models import LearningStyle
+from recommendations.loaders import load_catalogue
 
 class Command(BaseCommand):
     help = 'Populate learning styles data'
@@ -28,12 +28,8 @@ class Command(BaseCommand):
             },
         ]
         
-        for style_data in learning_styles:
-            LearningStyle.objects.get_or_create(
-                name=style_data['name'],
-                defaults=style_data
-            )
-        
+        results = load_catalogue({'learning_styles': learning_styles})
+        self.stdout.write(f"Learning styles: {results['learning_styles']}")
         self.stdout.write(
             self.style.SUCCESS('Successfully created learning styles')
         )
\ No newline at end of file
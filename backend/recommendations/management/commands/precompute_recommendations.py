@@ -0,0 +1,153 @@
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from recommendations.catalogue import get_catalogue
+from recommendations.scoring import init_scoring_worker, score_students
+from recommendations.services import RecommendationEngine, persist_recommendations
+from users.models import School, StudentProfile
+
+class Command(BaseCommand):
+    help = 'Precompute and store career recommendations for every assessed student of a school'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', required=True, help='KNEC code of the school')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Scoring processes; 0 scores in this process')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Students fetched, scored and written per chunk')
+        parser.add_argument('--top-n', type=int, default=10)
+        parser.add_argument('--checkpoint',
+                            help='File recording the last processed student id; '
+                                 'an existing checkpoint is resumed from')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore an existing checkpoint and start from the first student')
+
+    def handle(self, *args, **options):
+        try:
+            school = School.objects.get(code=options['school'])
+        except School.DoesNotExist:
+            raise CommandError(f"No school with code {options['school']}")
+
+        self.checkpoint = options['checkpoint']
+        last_id = 0 if options['restart'] else self.read_checkpoint()
+        if last_id:
+            self.stdout.write(f'Resuming after student id {last_id}')
+
+        catalogue = get_catalogue()
+        chunks = self.iter_chunks(school, last_id, options['chunk_size'])
+        top_n = options['top_n']
+
+        started = time.perf_counter()
+        processed = 0
+        if options['workers'] > 0:
+            # Workers only do NumPy work; spawning (rather than forking) keeps
+            # them from inheriting this process's database connections
+            with ProcessPoolExecutor(
+                max_workers=options['workers'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_scoring_worker,
+                initargs=(catalogue.scoring,),
+            ) as executor:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(executor.submit(score_students, chunk, top_n))
+                    # Keep a bounded number of chunks in flight so memory stays flat
+                    if len(pending) >= options['workers'] * 2:
+                        processed += self.write_chunk(pending.popleft().result(), catalogue)
+                        self.report_progress(processed, started)
+                while pending:
+                    processed += self.write_chunk(pending.popleft().result(), catalogue)
+                    self.report_progress(processed, started)
+        else:
+            init_scoring_worker(catalogue.scoring)
+            for chunk in chunks:
+                processed += self.write_chunk(score_students(chunk, top_n), catalogue)
+                self.report_progress(processed, started)
+
+        # A complete run leaves nothing to resume; the next run starts over
+        self.clear_checkpoint()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Precomputed recommendations for {processed} students of {school.name} '
+            f'in {elapsed:.1f}s ({self.rate(processed, elapsed):.1f} students/sec)'
+        ))
+
+    def iter_chunks(self, school, last_id, chunk_size):
+        """Yield [(student_id, personality_type_id, subject_ids), ...] in id order"""
+        students = StudentProfile.objects.filter(
+            school=school, assessmentresult__isnull=False
+        ).order_by('id')
+        subject_links = StudentProfile.subjects.through.objects
+
+        while True:
+            rows = list(
+                students.filter(id__gt=last_id)
+                .values_list('id', 'assessmentresult__personality_type_id')[:chunk_size]
+            )
+            if not rows:
+                return
+
+            subjects = {}
+            for student_id, subject_id in subject_links.filter(
+                studentprofile_id__in=[student_id for student_id, _ in rows]
+            ).values_list('studentprofile_id', 'subject_id'):
+                subjects.setdefault(student_id, []).append(subject_id)
+
+            yield [
+                (student_id, personality_type_id, subjects.get(student_id, []))
+                for student_id, personality_type_id in rows
+            ]
+            last_id = rows[-1][0]
+
+    def write_chunk(self, scored_chunk, catalogue):
+        recommendations_by_student = {
+            student_id: [
+                {
+                    'career': catalogue.careers_by_id[career_id],
+                    'personality_match_score': personality_score,
+                    'academic_match_score': academic_score,
+                    'overall_score': overall_score,
+                    'reasoning': RecommendationEngine.generate_reasoning(
+                        catalogue.careers_by_id[career_id], personality_score, academic_score
+                    ),
+                }
+                for career_id, personality_score, academic_score, overall_score in scored
+            ]
+            for student_id, scored in scored_chunk
+        }
+        persist_recommendations(recommendations_by_student, batch_size=1000)
+
+        # Chunks are written in id order, so the last id is a safe resume point
+        self.write_checkpoint(scored_chunk[-1][0])
+        return len(scored_chunk)
+
+    def read_checkpoint(self):
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return 0
+        with open(self.checkpoint) as f:
+            return json.load(f)['last_student_id']
+
+    def write_checkpoint(self, last_student_id):
+        if not self.checkpoint:
+            return
+        tmp_path = f'{self.checkpoint}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'last_student_id': last_student_id}, f)
+        os.replace(tmp_path, self.checkpoint)
+
+    def clear_checkpoint(self):
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+
+    def report_progress(self, processed, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'{processed} students ({self.rate(processed, elapsed):.1f} students/sec)')
+
+    @staticmethod
+    def rate(processed, elapsed):
+        return processed / elapsed if elapsed else 0.0
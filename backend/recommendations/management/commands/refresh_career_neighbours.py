@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+from recommendations.neighbours import refresh_career_neighbours
+
+class Command(BaseCommand):
+    help = "Recompute the stored most-similar careers of careers whose subjects or personality matches changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--neighbours', type=int,
+                            help='Neighbours kept per career (default: CAREER_NEIGHBOURS); '
+                                 'changing it recomputes every career')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        updated = refresh_career_neighbours(k=options['neighbours'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated the neighbours of {updated} careers in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0005_studentrecommendation_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CareerNeighbour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('similarity', models.FloatField()),
+                ('fingerprint', models.CharField(max_length=40)),
+                ('career', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbour_links', to='recommendations.career')),
+                ('neighbour', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='recommendations.career')),
+            ],
+            options={
+                'unique_together': {('career', 'rank')},
+            },
+        ),
+    ]
@@ -83,6 +83,36 @@ class StudentRecommendation(models.Model):
     reasoning = models.TextField()
     recommended_subjects = models.ManyToManyField(Subject)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
-        unique_together = ['student', 'career']
\ No newline at end of file
+        unique_together = ['student', 'career']
+
+
+class CatalogueVersion(models.Model):
+    """Version counter for slow-changing reference data cached in every worker"""
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+class CareerNeighbour(models.Model):
+    """
+    A career's most similar careers, ranked from 1. Maintained by
+    recommendations.neighbours.refresh_career_neighbours.
+    """
+    career = models.ForeignKey(Career, on_delete=models.CASCADE, related_name='neighbour_links')
+    # Nulled when the neighbour is deleted, so the next refresh sees the gap
+    neighbour = models.ForeignKey(Career, on_delete=models.SET_NULL, null=True, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    similarity = models.FloatField()
+    # Hash of the career's features the row was computed from, to spot changes
+    fingerprint = models.CharField(max_length=40)
+    
+    class Meta:
+        unique_together = ['career', 'rank']
+    
+    def __str__(self):
+        return f"{self.career_id} #{self.rank}: {self.neighbour_id}"
@@ -0,0 +1,176 @@
+import hashlib
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .catalogue import get_catalogue
+from .models import CareerNeighbour, CatalogueVersion
+from .scoring import DEFAULT_COMPATIBILITY, CareerScoringMatrix
+
+DEFAULT_NEIGHBOURS = 10
+# Careers compared per matrix product; bounds memory at BLOCK_SIZE x careers floats
+BLOCK_SIZE = 256
+# Share of the similarity taken from each feature block
+SUBJECT_SIMILARITY_WEIGHT = 0.5
+PERSONALITY_SIMILARITY_WEIGHT = 0.5
+# Similarities are rounded so full and incremental refreshes rank ties alike
+SIMILARITY_DECIMALS = 9
+# CatalogueVersion row locked while neighbours are refreshed
+NEIGHBOURS_LOCK = 'career_neighbours'
+
+def similarity_features(matrix):
+    """
+    One row per career: its required and recommended subjects and its
+    compatibility with each personality type (centred on the default
+    score, so unknown combinations count for nothing). Each block is scaled
+    to unit length times the square root of its weight, so the dot product
+    of two rows is the weighted sum of the blocks' cosine similarities.
+    """
+    blocks = [
+        (np.hstack([matrix.required, matrix.recommended]), SUBJECT_SIMILARITY_WEIGHT),
+        (matrix.compatibility - DEFAULT_COMPATIBILITY, PERSONALITY_SIMILARITY_WEIGHT),
+    ]
+    scaled = []
+    for block, weight in blocks:
+        norms = np.linalg.norm(block, axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scaled.append(np.where(norms > 0, block / norms, 0.0) * np.sqrt(weight))
+    return np.hstack(scaled)
+
+def career_fingerprints(matrix):
+    """Hash of each career's features, in catalogue order"""
+    subject_ids = sorted(matrix.subject_index, key=matrix.subject_index.get)
+    type_ids = sorted(matrix.personality_index, key=matrix.personality_index.get)
+    fingerprints = []
+    for row in range(len(matrix)):
+        features = (
+            [subject_ids[i] for i in np.flatnonzero(matrix.required[row])],
+            [subject_ids[i] for i in np.flatnonzero(matrix.recommended[row])],
+            [
+                (type_ids[i], round(float(matrix.compatibility[row, i]), 6))
+                for i in np.flatnonzero(matrix.compatibility[row] != DEFAULT_COMPATIBILITY)
+            ],
+        )
+        fingerprints.append(hashlib.sha1(repr(features).encode()).hexdigest())
+    return fingerprints
+
+def top_neighbours(career_ids, similarities, k):
+    """[(career id, similarity), ...] of the k most similar careers with a positive similarity"""
+    candidates = np.flatnonzero(similarities > 0)
+    if len(candidates) > k:
+        threshold = np.partition(similarities[candidates], -k)[-k]
+        candidates = candidates[similarities[candidates] >= threshold]
+    ranked = sorted(
+        ((int(career_ids[i]), float(similarities[i])) for i in candidates),
+        key=lambda item: (-item[1], item[0]),
+    )
+    return ranked[:k]
+
+def refresh_career_neighbours(k=None):
+    """
+    Bring the CareerNeighbour table in line with the catalogue.
+
+    Only careers whose features changed since their rows were written are
+    compared against the whole catalogue. Every other career keeps its
+    stored neighbours, merged with its similarity to the changed careers;
+    its row is recomputed in full only when a neighbour it stored changed
+    or disappeared and something unseen might take its place. Returns the
+    number of careers whose neighbours were rewritten.
+    """
+    k = k or getattr(settings, 'CAREER_NEIGHBOURS', DEFAULT_NEIGHBOURS)
+    with transaction.atomic():
+        # Serialise refreshes; the loser recomputes from the winner's rows.
+        # The row's version records the k the stored lists were built with.
+        CatalogueVersion.objects.get_or_create(name=NEIGHBOURS_LOCK)
+        lock = CatalogueVersion.objects.select_for_update().get(name=NEIGHBOURS_LOCK)
+
+        matrix = CareerScoringMatrix.from_database()
+        career_ids = matrix.career_ids
+        position = {int(career_id): i for i, career_id in enumerate(career_ids)}
+        features = similarity_features(matrix)
+        fingerprints = career_fingerprints(matrix)
+
+        stored = {}
+        for career_id, fingerprint, neighbour_id, similarity in CareerNeighbour.objects.order_by(
+            'career_id', 'rank'
+        ).values_list('career_id', 'fingerprint', 'neighbour_id', 'similarity'):
+            stored.setdefault(career_id, (fingerprint, []))[1].append((neighbour_id, similarity))
+
+        dirty = [
+            i for i, career_id in enumerate(career_ids)
+            if stored.get(int(career_id), (None,))[0] != fingerprints[i]
+        ]
+        neighbours = {}
+        if len(dirty) * 2 >= len(career_ids) or lock.version != k:
+            recompute = range(len(career_ids))
+        else:
+            recompute = set(dirty)
+            dirty_ids = {int(career_ids[i]) for i in dirty}
+            if dirty:
+                dirty_similarities = np.round(features[dirty] @ features.T, SIMILARITY_DECIMALS)
+            for i, career_id in enumerate(career_ids):
+                career_id = int(career_id)
+                if i in recompute:
+                    continue
+                old = stored[career_id][1]
+                kept = [(n, s) for n, s in old if n in position and n not in dirty_ids]
+                if len(kept) < len(old) and len(old) == k:
+                    # A dropped neighbour may be replaced by a career we never stored
+                    recompute.add(i)
+                    continue
+                if not dirty:
+                    continue
+                column = dirty_similarities[:, i]
+                entering = column > 0
+                if len(old) == k:
+                    entering &= column >= old[-1][1]
+                if len(kept) == len(old) and not entering.any():
+                    continue
+                merged = dict(kept)
+                for row, similarity in zip(dirty, column):
+                    if row != i and similarity > 0:
+                        merged[int(career_ids[row])] = float(similarity)
+                neighbours[career_id] = sorted(merged.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+        recompute = sorted(recompute)
+        for start in range(0, len(recompute), BLOCK_SIZE):
+            rows = recompute[start:start + BLOCK_SIZE]
+            similarities = np.round(features[rows] @ features.T, SIMILARITY_DECIMALS)
+            for offset, i in enumerate(rows):
+                similarities[offset, i] = 0.0
+                neighbours[int(career_ids[i])] = top_neighbours(career_ids, similarities[offset], k)
+
+        changed = []
+        for career_id, ranked in neighbours.items():
+            fingerprint = fingerprints[position[career_id]]
+            # A career without neighbours has no rows to compare
+            if stored.get(career_id, (fingerprint, [])) != (fingerprint, ranked):
+                changed.append(career_id)
+        for start in range(0, len(changed), BLOCK_SIZE):
+            CareerNeighbour.objects.filter(career_id__in=changed[start:start + BLOCK_SIZE]).delete()
+        CareerNeighbour.objects.bulk_create([
+            CareerNeighbour(
+                career_id=career_id, neighbour_id=neighbour_id, rank=rank, similarity=similarity,
+                fingerprint=fingerprints[position[career_id]],
+            )
+            for career_id in changed
+            for rank, (neighbour_id, similarity) in enumerate(neighbours[career_id], start=1)
+        ], batch_size=1000)
+        if lock.version != k:
+            lock.version = k
+            lock.save(update_fields=['version', 'updated_at'])
+        return len(changed)
+
+def get_related_careers(career, limit=5, catalogue=None):
+    """
+    The careers most similar to `career`, with one indexed query. Falls back
+    to careers sharing its category or a required subject while no
+    neighbours are stored for it.
+    """
+    catalogue = catalogue or get_catalogue()
+    neighbour_ids = CareerNeighbour.objects.filter(
+        career_id=career.id, neighbour__isnull=False
+    ).order_by('rank').values_list('neighbour_id', flat=True)[:limit]
+    related = [catalogue.careers_by_id[i] for i in neighbour_ids if i in catalogue.careers_by_id]
+    return related or catalogue.related_careers(career, limit=limit)
@@ -0,0 +1,150 @@
+import numpy as np
+
+PERSONALITY_WEIGHT = 0.6
+ACADEMIC_WEIGHT = 0.4
+DEFAULT_COMPATIBILITY = 0.5
+
+class CareerScoringMatrix:
+    """
+    Dense NumPy view of the career catalogue.
+
+    Holds a career x subject incidence matrix for required and recommended
+    subjects plus a career x personality type compatibility matrix, so a
+    student is scored against every career with a handful of array ops.
+    Only ids and arrays are kept here, which keeps the object cheap to pickle
+    into worker processes.
+    """
+
+    def __init__(self, career_ids, subject_ids, personality_type_ids,
+                 required_links, recommended_links, compatibility_scores):
+        self.career_ids = np.asarray(career_ids, dtype=np.int64)
+        self.subject_index = {subject_id: i for i, subject_id in enumerate(subject_ids)}
+        self.personality_index = {type_id: i for i, type_id in enumerate(personality_type_ids)}
+        career_index = {career_id: i for i, career_id in enumerate(career_ids)}
+
+        n_careers = len(career_ids)
+        n_subjects = len(subject_ids)
+
+        self.required = np.zeros((n_careers, n_subjects), dtype=np.float64)
+        self.recommended = np.zeros((n_careers, n_subjects), dtype=np.float64)
+        for matrix, links in ((self.required, required_links), (self.recommended, recommended_links)):
+            for career_id, subject_id in links:
+                row, column = career_index.get(career_id), self.subject_index.get(subject_id)
+                if row is not None and column is not None:
+                    matrix[row, column] = 1.0
+
+        self.required_counts = self.required.sum(axis=1)
+        self.recommended_counts = self.recommended.sum(axis=1)
+
+        # Unknown career/personality combinations default to 0.5, as before
+        self.compatibility = np.full(
+            (n_careers, len(personality_type_ids)), DEFAULT_COMPATIBILITY, dtype=np.float64
+        )
+        for career_id, type_id, score in compatibility_scores:
+            row, column = career_index.get(career_id), self.personality_index.get(type_id)
+            if row is not None and column is not None:
+                self.compatibility[row, column] = float(score)
+
+    def __len__(self):
+        return len(self.career_ids)
+
+    @classmethod
+    def from_database(cls):
+        """Load the whole catalogue with a fixed number of queries"""
+        from assessments.models import PersonalityType
+        from .models import Career, CareerPersonalityMatch, Subject
+
+        return cls(
+            career_ids=list(Career.objects.order_by('id').values_list('id', flat=True)),
+            subject_ids=list(Subject.objects.order_by('id').values_list('id', flat=True)),
+            personality_type_ids=list(PersonalityType.objects.order_by('id').values_list('id', flat=True)),
+            required_links=Career.required_subjects.through.objects.values_list(
+                'career_id', 'subject_id'
+            ),
+            recommended_links=Career.recommended_subjects.through.objects.values_list(
+                'career_id', 'subject_id'
+            ),
+            compatibility_scores=CareerPersonalityMatch.objects.values_list(
+                'career_id', 'personality_type_id', 'compatibility_score'
+            ),
+        )
+
+    def subject_vector(self, subject_ids):
+        """Binary vector of the subjects a student takes"""
+        vector = np.zeros(len(self.subject_index), dtype=np.float64)
+        for subject_id in subject_ids:
+            index = self.subject_index.get(subject_id)
+            if index is not None:
+                vector[index] = 1.0
+        return vector
+
+    def personality_scores(self, personality_type_id):
+        index = self.personality_index.get(personality_type_id)
+        if index is None:
+            return np.full(len(self), DEFAULT_COMPATIBILITY, dtype=np.float64)
+        return self.compatibility[:, index]
+
+    def academic_scores(self, subject_ids):
+        """
+        Vectorised equivalent of RecommendationEngine.calculate_academic_match:
+        0 when a required subject is missing, 1 when the career has no
+        recommended subjects, otherwise the share of recommended subjects taken.
+        """
+        student = self.subject_vector(subject_ids)
+        meets_required = (self.required @ student) == self.required_counts
+        overlap = self.recommended @ student
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(self.recommended_counts > 0, overlap / self.recommended_counts, 1.0)
+        return np.where(meets_required, ratio, 0.0)
+
+    def score(self, personality_type_id, subject_ids):
+        """Return (personality, academic, overall) score arrays for all careers"""
+        personality = self.personality_scores(personality_type_id)
+        academic = self.academic_scores(subject_ids)
+        overall = (personality * PERSONALITY_WEIGHT) + (academic * ACADEMIC_WEIGHT)
+        return personality, academic, overall
+
+    def top_n(self, overall, top_n):
+        """
+        Indices of the top_n careers by overall score.
+
+        Ties are broken by catalogue position so the ranking matches the
+        stable sort the per-career loop used to do.
+        """
+        n_careers = len(overall)
+        if top_n <= 0 or n_careers == 0:
+            return np.empty(0, dtype=np.int64)
+        if top_n < n_careers:
+            partition = np.argpartition(-overall, top_n - 1)[:top_n]
+            threshold = overall[partition].min()
+            candidates = np.flatnonzero(overall >= threshold)
+        else:
+            candidates = np.arange(n_careers)
+        order = np.lexsort((candidates, -overall[candidates]))
+        return candidates[order][:top_n]
+
+    def recommend(self, personality_type_id, subject_ids, top_n=10):
+        """Return [(career_id, personality, academic, overall), ...] best first"""
+        personality, academic, overall = self.score(personality_type_id, subject_ids)
+        return [
+            (int(self.career_ids[i]), float(personality[i]), float(academic[i]), float(overall[i]))
+            for i in self.top_n(overall, top_n)
+        ]
+
+# Scoring matrix of a worker process, set once by init_scoring_worker
+_worker_matrix = None
+
+def init_scoring_worker(scoring_matrix):
+    """ProcessPoolExecutor initializer: keep one copy of the matrix per worker"""
+    global _worker_matrix
+    _worker_matrix = scoring_matrix
+
+def score_students(students, top_n=10):
+    """
+    Score [(student_id, personality_type_id, subject_ids), ...] with the
+    worker's matrix. Needs no Django setup, so it runs in spawned processes.
+    """
+    return [
+        (student_id, _worker_matrix.recommend(personality_type_id, subject_ids, top_n=top_n))
+        for student_id, personality_type_id, subject_ids in students
+    ]
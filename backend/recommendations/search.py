@@ -0,0 +1,153 @@
+import bisect
+import re
+import unicodedata
+from collections import defaultdict
+
+# Weight of a term by the field it appears in
+FIELD_WEIGHTS = {'name': 4.0, 'category': 2.0, 'subjects': 1.5, 'description': 1.0}
+# A term matched only as a prefix (typeahead) scores this fraction of an exact match
+PREFIX_FACTOR = 0.5
+# Indexed terms one query prefix may expand to; keeps one-letter queries cheap
+MAX_PREFIX_EXPANSIONS = 200
+
+STOPWORDS = frozenset({
+    'a', 'an', 'and', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'with',
+    # Swahili
+    'kwa', 'la', 'na', 'ni', 'wa', 'ya', 'za',
+})
+
+# Words treated as the same term, so a search for one finds the others
+SYNONYMS = [
+    ('doctor', 'daktari', 'physician', 'medic'),
+    ('medicine', 'medical', 'dawa', 'tiba'),
+    ('teacher', 'mwalimu', 'educator', 'tutor'),
+    ('education', 'elimu', 'teaching'),
+    ('nurse', 'muuguzi', 'nursing', 'uuguzi'),
+    ('engineer', 'mhandisi', 'engineering', 'uhandisi'),
+    ('lawyer', 'wakili', 'mwanasheria', 'advocate', 'attorney'),
+    ('law', 'sheria', 'legal'),
+    ('accountant', 'mhasibu', 'accounting', 'uhasibu'),
+    ('farmer', 'mkulima', 'agriculture', 'kilimo', 'agricultural'),
+    ('pilot', 'rubani', 'aviation'),
+    ('police', 'polisi', 'askari'),
+    ('chef', 'mpishi', 'cook', 'culinary'),
+    ('technician', 'fundi', 'mechanic'),
+    ('software', 'programu', 'programmer', 'developer', 'coding'),
+    ('computer', 'kompyuta', 'ict'),
+    ('business', 'biashara', 'commerce', 'entrepreneur'),
+    ('health', 'afya', 'healthcare'),
+    ('science', 'sayansi', 'sciences'),
+    ('mathematics', 'hisabati', 'hesabu', 'maths', 'math'),
+    ('journalist', 'mwandishi', 'reporter', 'journalism'),
+    ('artist', 'msanii', 'arts'),
+]
+
+_word_re = re.compile(r'\w+')
+
+def normalize(text):
+    """Fold case and strip accents"""
+    text = unicodedata.normalize('NFKD', text or '').casefold()
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+def stem(word):
+    """Light plural stripping, identical for indexed and query terms"""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+def _build_synonyms():
+    groups = {}
+    for group in SYNONYMS:
+        terms = frozenset(stem(normalize(word)) for word in group)
+        for term in terms:
+            groups[term] = groups.get(term, frozenset()) | terms
+    return groups
+
+_synonyms = _build_synonyms()
+
+def tokenize(text):
+    return [stem(word) for word in _word_re.findall(normalize(text)) if word not in STOPWORDS]
+
+class CareerSearchIndex:
+    """
+    In-memory inverted index over career name, category, subject names and
+    description.
+
+    Every query word has to match (AND). A word matches an indexed term
+    exactly, through a synonym (Swahili or English), or as a prefix, so
+    partial words work for typeahead; prefix matches score less. Terms are
+    weighted by field (FIELD_WEIGHTS) and results are ranked by the summed
+    score, then name.
+    """
+
+    def __init__(self, documents):
+        # documents: iterable of (career_id, {field: text})
+        postings = defaultdict(dict)
+        self.names = {}
+        for career_id, fields in documents:
+            self.names[career_id] = normalize(fields.get('name', ''))
+            for field, text in fields.items():
+                weight = FIELD_WEIGHTS[field]
+                for term in tokenize(text):
+                    current = postings[term].get(career_id, 0.0)
+                    # Count a term once per field, at its best field's weight
+                    if weight > current:
+                        postings[term][career_id] = weight
+        self.postings = dict(postings)
+        self.vocabulary = sorted(self.postings)
+
+    @classmethod
+    def from_catalogue(cls, catalogue):
+        return cls(
+            (career.id, {
+                'name': career.name,
+                'category': f'{career.category} {career.get_category_display()}',
+                'subjects': ' '.join(
+                    catalogue.subjects_by_id[subject_id].name
+                    for subject_id in (
+                        catalogue.required_subject_ids[career.id] + catalogue.recommended_subject_ids[career.id]
+                    )
+                ),
+                'description': career.description,
+            })
+            for career in catalogue.careers
+        )
+
+    def expand(self, term):
+        """{indexed term: factor} matching one query term"""
+        matches = {}
+        for alternative in _synonyms.get(term, (term,)):
+            start = bisect.bisect_left(self.vocabulary, alternative)
+            for indexed in self.vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+                if not indexed.startswith(alternative):
+                    break
+                factor = 1.0 if indexed == alternative else PREFIX_FACTOR
+                matches[indexed] = max(matches.get(indexed, 0.0), factor)
+        return matches
+
+    def score(self, query):
+        """{career_id: score} of the careers matching every word of `query`"""
+        scores = None
+        for term in dict.fromkeys(tokenize(query)):
+            term_scores = {}
+            for indexed, factor in self.expand(term).items():
+                for career_id, weight in self.postings[indexed].items():
+                    term_scores[career_id] = max(term_scores.get(career_id, 0.0), weight * factor)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    career_id: score + term_scores[career_id]
+                    for career_id, score in scores.items() if career_id in term_scores
+                }
+            if not scores:
+                return {}
+        return scores or {}
+
+    def search(self, query, limit=None):
+        """Career ids matching `query`, best first"""
+        scores = self.score(query)
+        ranked = sorted(scores, key=lambda career_id: (-scores[career_id], self.names[career_id]))
+        return ranked[:limit] if limit else ranked
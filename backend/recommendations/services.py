@@ -1,13 +1,17 @@
 import pandas as pd
 from sklearn.metrics.pairwise import cosine_similarity
+from django.db import transaction
 from django.db.models import Q
 from assessments.models import AssessmentResult
+from users.summary import invalidate_student_summaries
 from .models import Career, CareerPersonalityMatch, StudentRecommendation, Subject
+from .catalogue import get_catalogue
 
 class RecommendationEngine:
-    def __init__(self, student):
+    def __init__(self, student, catalogue=None):
         self.student = student
         self.assessment_result = AssessmentResult.objects.get(student=student)
+        self.catalogue = catalogue
     
     def calculate_personality_match(self, career):
         """Calculate personality compatibility with career"""
@@ -40,19 +44,22 @@ class RecommendationEngine:
         
         return overlap / total_recommended
     
-    def generate_career_recommendations(self, top_n=10):
+    def generate_career_recommendations(self, top_n=10, save=True):
         """Generate personalized career recommendations"""
-        all_careers = Career.objects.all()
-        recommendations = []
-        
-        for career in all_careers:
-            personality_score = float(self.calculate_personality_match(career))
-            academic_score = float(self.calculate_academic_match(career))
-            
-            # Weighted overall score (personality: 60%, academic: 40%)
-            overall_score = (personality_score * 0.6) + (academic_score * 0.4)
-            
-            recommendations.append({
+        if self.catalogue is None:
+            self.catalogue = get_catalogue()
+        
+        # Score every career at once (personality: 60%, academic: 40%)
+        scored = self.catalogue.scoring.recommend(
+            self.assessment_result.personality_type_id,
+            self.student.subjects.values_list('id', flat=True),
+            top_n=top_n,
+        )
+        
+        top_recommendations = []
+        for career_id, personality_score, academic_score, overall_score in scored:
+            career = self.catalogue.careers_by_id[career_id]
+            top_recommendations.append({
                 'career': career,
                 'personality_match_score': personality_score,
                 'academic_match_score': academic_score,
@@ -60,16 +67,14 @@ class RecommendationEngine:
                 'reasoning': self.generate_reasoning(career, personality_score, academic_score)
             })
         
-        # Sort by overall score and get top N
-        recommendations.sort(key=lambda x: x['overall_score'], reverse=True)
-        top_recommendations = recommendations[:top_n]
-        
         # Save to database
-        self.save_recommendations(top_recommendations)
+        if save:
+            self.save_recommendations(top_recommendations)
         
         return top_recommendations
     
-    def generate_reasoning(self, career, personality_score, academic_score):
+    @staticmethod
+    def generate_reasoning(career, personality_score, academic_score):
         """Generate explanation for recommendation"""
         reasoning_parts = []
         
@@ -97,19 +102,71 @@ class RecommendationEngine:
     
     def save_recommendations(self, recommendations):
         """Save recommendations to database"""
+        persist_recommendations({self.student.id: recommendations})
+
+def persist_recommendations(recommendations_by_student, batch_size=None):
+    """
+    Replace the stored recommendations of one or more students.
+    
+    `recommendations_by_student` maps a StudentProfile id to the
+    recommendation dicts produced by RecommendationEngine. Rows are upserted
+    with a single bulk_create, recommendations the students no longer get are
+    deleted, and recommended subjects are rewritten with one bulk insert into
+    the through table, all in one transaction. The number of queries does not
+    depend on how many recommendations are saved.
+    """
+    student_ids = list(recommendations_by_student)
+    if not student_ids:
+        return
+    
+    rows = []
+    careers_by_id = {}
+    keep = Q()
+    for student_id, recommendations in recommendations_by_student.items():
         for rec in recommendations:
-            student_rec, created = StudentRecommendation.objects.update_or_create(
-                student=self.student,
+            careers_by_id[rec['career'].id] = rec['career']
+            rows.append(StudentRecommendation(
+                student_id=student_id,
                 career=rec['career'],
-                defaults={
-                    'personality_match_score': rec['personality_match_score'],
-                    'academic_match_score': rec['academic_match_score'],
-                    'overall_score': rec['overall_score'],
-                    'reasoning': rec['reasoning'],
-                }
-            )
-            # Add recommended subjects
-            student_rec.recommended_subjects.set(rec['career'].recommended_subjects.all())
+                personality_match_score=rec['personality_match_score'],
+                academic_match_score=rec['academic_match_score'],
+                overall_score=rec['overall_score'],
+                reasoning=rec['reasoning'],
+            ))
+        keep |= Q(student_id=student_id, career_id__in=[rec['career'].id for rec in recommendations])
+    
+    through = StudentRecommendation.recommended_subjects.through
+    with transaction.atomic():
+        StudentRecommendation.objects.bulk_create(
+            rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['student', 'career'],
+            update_fields=[
+                'personality_match_score', 'academic_match_score',
+                'overall_score', 'reasoning', 'updated_at',
+            ],
+        )
+        
+        # Drop recommendations that are no longer in the students' top N
+        StudentRecommendation.objects.filter(student_id__in=student_ids).exclude(keep).delete()
+        
+        # bulk_create does not return ids for upserted rows on every backend
+        saved = StudentRecommendation.objects.filter(
+            student_id__in=student_ids
+        ).values_list('id', 'career_id')
+        
+        through.objects.filter(studentrecommendation__student_id__in=student_ids).delete()
+        through.objects.bulk_create(
+            [
+                through(studentrecommendation_id=rec_id, subject_id=subject.id)
+                for rec_id, career_id in saved
+                for subject in careers_by_id[career_id].recommended_subjects.all()
+            ],
+            batch_size=batch_size,
+        )
+        # Bulk writes skip the post_save handler that drops dashboard summaries
+        invalidate_student_summaries(student_ids)
 
 class SubjectRecommender:
     def __init__(self, student):
@@ -144,12 +201,12 @@ class SubjectRecommender:
         
         # Add career-aligned subjects
         engine = RecommendationEngine(self.student)
-        career_recs = engine.generate_career_recommendations(top_n=3)
+        career_recs = engine.generate_career_recommendations(top_n=3, save=False)
         
         career_subjects = set()
         for rec in career_recs:
             career_subjects.update(
-                rec['career'].recommended_subjects.values_list('name', flat=True)
+                subject.name for subject in rec['career'].recommended_subjects.all()
             )
         
         # Combine and prioritize
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from assessments.models import PersonalityType
+from .catalogue import CAREER_CATALOGUE, bump_catalogue_version, catalogue_bumped
+from .models import Career, CareerPersonalityMatch, Subject
+from .neighbours import refresh_career_neighbours
+
+@receiver([post_save, post_delete], sender=Career)
+@receiver([post_save, post_delete], sender=Subject)
+@receiver([post_save, post_delete], sender=CareerPersonalityMatch)
+@receiver([post_save, post_delete], sender=PersonalityType)
+def catalogue_row_changed(sender, **kwargs):
+    """Bump the catalogue version whenever a catalogue row is saved or deleted"""
+    bump_catalogue_version()
+
+@receiver(m2m_changed, sender=Career.required_subjects.through)
+@receiver(m2m_changed, sender=Career.recommended_subjects.through)
+def career_subjects_changed(sender, action, **kwargs):
+    """Bump the catalogue version when a career's subject links change"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_catalogue_version()
+
+def refresh_neighbours():
+    refresh_career_neighbours()
+
+@receiver(catalogue_bumped)
+def refresh_neighbours_after_commit(sender, name, **kwargs):
+    """
+    Recompute the neighbours of changed careers once the change is committed.
+    An edit bumps the catalogue once per saved row and subject link, so the
+    refresh is queued at most once per transaction.
+    """
+    if name != CAREER_CATALOGUE or not getattr(settings, 'CAREER_NEIGHBOURS_AUTO_REFRESH', True):
+        return
+    # Callbacks of a rolled back transaction or savepoint are discarded, so
+    # the pending list is the source of truth for "already queued"
+    if any(callback[1] is refresh_neighbours for callback in connection.run_on_commit):
+        return
+    transaction.on_commit(refresh_neighbours)
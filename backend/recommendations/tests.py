@@ -1,3 +1,494 @@
-from django.test import TestCase
+import json
+import os
+import random
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+
+from assessments.models import AnswerChoice, AssessmentResult, PersonalityType, Question
+from users.models import CustomUser, School
+from .catalogue import (
+    CAREER_CATALOGUE, career_catalogue, catalogue_bumped, defer_catalogue_bumps, get_catalogue,
+    get_catalogue_version,
+)
+from .loaders import load_catalogue, read_fixture
+from .models import Career, CareerNeighbour, CareerPersonalityMatch, StudentRecommendation, Subject
+from .neighbours import get_related_careers, refresh_career_neighbours
+from .scoring import CareerScoringMatrix
+from .services import RecommendationEngine
+
+class RecommendationPersistenceTests(TestCase):
+    def setUp(self):
+        self.subjects = [
+            Subject.objects.create(name=f'Subject {i}', code=f'S{i}', category='sciences', difficulty_level='medium')
+            for i in range(4)
+        ]
+        self.personality_type = PersonalityType.objects.create(
+            mbti_type='INTJ', name='The Architect', description='', strengths='',
+            weaknesses='', career_recommendations=''
+        )
+        for i in range(12):
+            career = Career.objects.create(
+                name=f'Career {i}', description='', category='stem',
+                job_outlook='high', kenyan_market_demand='growing'
+            )
+            career.recommended_subjects.set(self.subjects[:1 + i % 4])
+            CareerPersonalityMatch.objects.create(
+                career=career, personality_type=self.personality_type,
+                compatibility_score=round(0.3 + i * 0.05, 2), reasoning=''
+            )
+
+        user = CustomUser.objects.create_user(username='student', password='password123')
+        self.student = user.studentprofile
+        self.student.subjects.set(self.subjects[:2])
+        AssessmentResult.objects.create(
+            student=self.student, personality_type=self.personality_type,
+            ei_score=0, sn_score=0, tf_score=0, jp_score=0, confidence=0
+        )
+        # Warm the worker's catalogue snapshot so only per-student queries are counted
+        get_catalogue().scoring
+
+    def generate(self, top_n):
+        engine = RecommendationEngine(self.student)
+        return engine.generate_career_recommendations(top_n=top_n)
+
+    def test_generate_and_save_uses_constant_queries(self):
+        # assessment result, student subjects, then the bulk write:
+        # savepoint, upsert, stale lookup, through-table delete,
+        # id lookup, through-table insert, release savepoint
+        for top_n in (3, 10):
+            StudentRecommendation.objects.filter(student=self.student).delete()
+            with self.assertNumQueries(9):
+                self.generate(top_n)
+
+    def test_regenerating_replaces_stale_recommendations(self):
+        self.generate(10)
+        recommendations = self.generate(3)
+
+        saved = StudentRecommendation.objects.filter(student=self.student)
+        self.assertEqual(
+            sorted(saved.values_list('career_id', flat=True)),
+            sorted(rec['career'].id for rec in recommendations)
+        )
+        for saved_rec in saved:
+            self.assertEqual(
+                set(saved_rec.recommended_subjects.values_list('id', flat=True)),
+                set(get_catalogue().recommended_subject_ids[saved_rec.career_id])
+            )
+
+class CareerScoringTests(TestCase):
+    def loop_ranking(self, overall, top_n):
+        """The old ranking: a stable sort of every career by overall score"""
+        return sorted(range(len(overall)), key=lambda i: -overall[i])[:top_n]
+
+    def test_top_n_matches_a_stable_sort(self):
+        matrix = CareerScoringMatrix([], [], [], [], [], [])
+        rng = np.random.default_rng(1)
+        for size in (0, 1, 5, 40):
+            # Few distinct values, so most careers tie with another
+            overall = rng.choice([0.2, 0.5, 0.5, 0.8, 1.0], size=size)
+            for top_n in (0, 1, 3, size, size + 5):
+                self.assertEqual(
+                    list(matrix.top_n(overall, top_n)), self.loop_ranking(list(overall), top_n),
+                    f'{size} careers, top {top_n}',
+                )
+
+    def test_recommendations_match_the_per_career_loop(self):
+        subjects = [
+            Subject.objects.create(name=f'Subject {i}', code=f'S{i}', category='sciences', difficulty_level='medium')
+            for i in range(4)
+        ]
+        personality_type = PersonalityType.objects.create(
+            mbti_type='INTJ', name='The Architect', description='', strengths='',
+            weaknesses='', career_recommendations=''
+        )
+        for i in range(9):
+            career = Career.objects.create(
+                name=f'Career {i}', description='', category='stem', job_outlook='high', kenyan_market_demand='growing'
+            )
+            career.required_subjects.set(subjects[3:] if i % 3 == 0 else [])
+            career.recommended_subjects.set(subjects[:1 + i % 2])
+            if i % 4:
+                CareerPersonalityMatch.objects.create(
+                    career=career, personality_type=personality_type,
+                    compatibility_score=0.5 + (i % 2) * 0.25, reasoning=''
+                )
+        user = CustomUser.objects.create_user(username='student', password='password123')
+        student = user.studentprofile
+        student.subjects.set(subjects[:1])
+        AssessmentResult.objects.create(
+            student=student, personality_type=personality_type,
+            ei_score=0, sn_score=0, tf_score=0, jp_score=0, confidence=0
+        )
+
+        engine = RecommendationEngine(student)
+        looped = []
+        for career in Career.objects.order_by('id'):
+            personality = float(engine.calculate_personality_match(career))
+            academic = float(engine.calculate_academic_match(career))
+            looped.append((career.id, personality, academic, personality * 0.6 + academic * 0.4))
+        looped.sort(key=lambda row: -row[3])
+
+        matrix = CareerScoringMatrix.from_database()
+        for top_n in (1, 4, 9, 20):
+            scored = matrix.recommend(personality_type.id, [subjects[0].id], top_n=top_n)
+            self.assertEqual([row[0] for row in scored], [row[0] for row in looped[:top_n]])
+            for row, expected in zip(scored, looped):
+                self.assertAlmostEqual(row[3], expected[3])
+
+class CatalogueSnapshotTests(TestCase):
+    def setUp(self):
+        # Snapshots outlive each test's rolled back rows
+        career_catalogue.invalidate()
+        self.subject = Subject.objects.create(name='Biology', code='BIO', category='sciences', difficulty_level='medium')
+        self.personality_type = PersonalityType.objects.create(
+            mbti_type='INTJ', name='The Architect', description='', strengths='',
+            weaknesses='', career_recommendations=''
+        )
+        self.career = Career.objects.create(
+            name='Nurse', description='', category='health', job_outlook='high', kenyan_market_demand='growing'
+        )
+
+    def assert_bumps(self, change):
+        version = get_catalogue_version(CAREER_CATALOGUE)[0]
+        snapshot = get_catalogue()
+        with self.assertNumQueries(0):
+            self.assertIs(get_catalogue(), snapshot)
+
+        change()
+
+        self.assertEqual(get_catalogue_version(CAREER_CATALOGUE)[0], version + 1)
+        self.assertIsNot(get_catalogue(), snapshot)
+        return get_catalogue()
+
+    def test_career_save_bumps_the_version(self):
+        self.career.name = 'Registered Nurse'
+        catalogue = self.assert_bumps(self.career.save)
+        self.assertEqual(catalogue.careers_by_id[self.career.id].name, 'Registered Nurse')
+
+    def test_subject_save_bumps_the_version(self):
+        self.subject.name = 'Biological Sciences'
+        catalogue = self.assert_bumps(self.subject.save)
+        self.assertIn('Biological Sciences', [subject.name for subject in catalogue.subjects])
+
+    def test_personality_match_save_bumps_the_version(self):
+        catalogue = self.assert_bumps(lambda: CareerPersonalityMatch.objects.create(
+            career=self.career, personality_type=self.personality_type, compatibility_score=0.9, reasoning=''
+        ))
+        self.assertEqual(catalogue.scoring.recommend(self.personality_type.id, [], top_n=1)[0][1], 0.9)
+
+    def test_deferred_bumps_only_land_when_the_block_succeeds(self):
+        def edit():
+            with defer_catalogue_bumps():
+                self.career.save()
+                self.subject.save()
+        self.assert_bumps(edit)
+
+        version = get_catalogue_version(CAREER_CATALOGUE)[0]
+        snapshot = get_catalogue()
+        receiver = mock.Mock()
+        catalogue_bumped.connect(receiver)
+        self.addCleanup(catalogue_bumped.disconnect, receiver)
+        with self.assertRaises(ValueError):
+            with transaction.atomic(), defer_catalogue_bumps():
+                self.career.save()
+                raise ValueError
+
+        self.assertEqual(get_catalogue_version(CAREER_CATALOGUE)[0], version)
+        self.assertIs(get_catalogue(), snapshot)
+        receiver.assert_not_called()
+
+class PrecomputeRecommendationsTests(TestCase):
+    def setUp(self):
+        career_catalogue.invalidate()
+        personality_type = PersonalityType.objects.create(
+            mbti_type='INTJ', name='The Architect', description='', strengths='',
+            weaknesses='', career_recommendations=''
+        )
+        for i in range(3):
+            Career.objects.create(
+                name=f'Career {i}', description='', category='stem', job_outlook='high', kenyan_market_demand='growing'
+            )
+        self.school = School.objects.create(name='Alliance High School', code='10200001', county='Kiambu', type='national')
+        self.students = []
+        for i in range(5):
+            student = CustomUser.objects.create_user(username=f'student{i}', password='password123').studentprofile
+            student.school = self.school
+            student.save()
+            AssessmentResult.objects.create(
+                student=student, personality_type=personality_type,
+                ei_score=0, sn_score=0, tf_score=0, jp_score=0, confidence=0
+            )
+            self.students.append(student)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint = os.path.join(directory.name, 'checkpoint.json')
+
+    def precompute(self):
+        out = StringIO()
+        call_command(
+            'precompute_recommendations', school=self.school.code, workers=0, chunk_size=2,
+            checkpoint=self.checkpoint, stdout=out,
+        )
+        return out.getvalue()
+
+    def test_complete_run_removes_its_checkpoint(self):
+        self.assertIn('for 5 students', self.precompute())
+        self.assertFalse(os.path.exists(self.checkpoint))
+        self.assertEqual(StudentRecommendation.objects.values('student').distinct().count(), 5)
+
+        # A second run starts over instead of resuming after the last student
+        output = self.precompute()
+        self.assertNotIn('Resuming', output)
+        self.assertIn('for 5 students', output)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_interrupted_run_is_resumed(self):
+        with open(self.checkpoint, 'w') as f:
+            json.dump({'last_student_id': self.students[2].id}, f)
+
+        output = self.precompute()
+
+        self.assertIn(f'Resuming after student id {self.students[2].id}', output)
+        self.assertIn('for 2 students', output)
+        self.assertEqual(
+            set(StudentRecommendation.objects.values_list('student_id', flat=True)),
+            {self.students[3].id, self.students[4].id},
+        )
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+class CatalogueLoaderTests(TestCase):
+    def setUp(self):
+        call_command('populate_mbti_data', stdout=StringIO())
+        self.subjects = [
+            {'code': f'S{i}', 'name': f'Subject {i}', 'category': 'sciences', 'difficulty_level': 'medium'}
+            for i in range(4)
+        ]
+        self.careers = [
+            {
+                'name': f'Career {i}', 'description': 'Works', 'category': 'stem',
+                'job_outlook': 'high', 'kenyan_market_demand': 'growing', 'average_salary': 1000 * i,
+                'required_subjects': ['S0'], 'recommended_subjects': ['Subject 1', 'S2'],
+                'personality_matches': [{'type': 'INTJ', 'score': 0.9}, {'type': 'ENFP', 'score': 0.5}],
+            }
+            for i in range(50)
+        ]
+
+    def test_load_is_bulk_and_idempotent(self):
+        # One read and one bulk insert per table, the reference maps and a single version bump
+        with self.assertNumQueries(15):
+            results = load_catalogue({'subjects': self.subjects, 'careers': self.careers})
+        self.assertEqual(results['careers'].created, 50 + 50 + 100 + 100)
+        self.assertEqual(Career.objects.count(), 50)
+        self.assertEqual(CareerPersonalityMatch.objects.count(), 100)
+        version = get_catalogue_version()[0]
+
+        results = load_catalogue({'subjects': self.subjects, 'careers': self.careers})
+        self.assertFalse(results['careers'].changed)
+        self.assertEqual(get_catalogue_version()[0], version)
+
+    def test_changes_are_diffed(self):
+        load_catalogue({'subjects': self.subjects, 'careers': self.careers})
+        version = get_catalogue_version()[0]
+        self.careers[0]['average_salary'] = 99999
+        self.careers[1]['personality_matches'] = [{'type': 'INTJ', 'score': 0.4}]
+        self.careers[2]['required_subjects'] = ['S3', 'NOPE']
+
+        results = load_catalogue({'careers': self.careers[:10]}, prune=True)
+
+        stats = results['careers']
+        # Career 0, the INTJ match of career 1 and career 2's required subject changed;
+        # the ENFP match of career 1 and 40 careers left out of the fixture were deleted
+        self.assertEqual((stats.created, stats.updated, stats.deleted), (1, 2, 1 + 1 + 40))
+        self.assertEqual(stats.missing, ["Career 2: unknown subject 'NOPE'"])
+        self.assertEqual(Career.objects.get(name='Career 0').average_salary, 99999)
+        self.assertEqual(
+            list(CareerPersonalityMatch.objects.filter(career__name='Career 1').values_list('compatibility_score', flat=True)),
+            [Decimal('0.40')],
+        )
+        self.assertEqual(list(Career.objects.get(name='Career 2').required_subjects.values_list('code', flat=True)), ['S3'])
+        self.assertEqual(Career.objects.count(), 10)
+        self.assertEqual(get_catalogue_version()[0], version + 1)
+
+    def test_csv_fixture(self):
+        load_catalogue({'subjects': self.subjects})
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'careers.csv')
+            with open(path, 'w') as fixture:
+                fixture.write(
+                    'name,description,category,job_outlook,kenyan_market_demand,average_salary,'
+                    'required_subjects,personality_matches\n'
+                    'Nurse,Cares,health,high,growing,,S0;S1,INTJ:0.7;ENFP:0.8\n'
+                )
+            results = load_catalogue(read_fixture(path))
+
+        nurse = Career.objects.get(name='Nurse')
+        self.assertIsNone(nurse.average_salary)
+        self.assertEqual(set(nurse.required_subjects.values_list('code', flat=True)), {'S0', 'S1'})
+        self.assertEqual(results['careers'].created, 1 + 2 + 2)
+
+    def test_load_catalogue_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as fixture:
+            json.dump({'subjects': self.subjects, 'careers': self.careers[:3]}, fixture)
+        out = StringIO()
+        call_command('load_catalogue', fixture.name, stdout=out, stderr=StringIO())
+        os.unlink(fixture.name)
+
+        self.assertIn('careers: 18 created', out.getvalue())
+        self.assertEqual(Career.objects.count(), 3)
+
+    def test_populate_commands_are_rerunnable(self):
+        for _ in range(2):
+            call_command('load_initial_data', stdout=StringIO())
+        self.assertEqual(Career.objects.count(), 3)
+        self.assertEqual(Subject.objects.count(), 10)
+        self.assertEqual(Question.objects.count(), 5)
+        self.assertEqual(AnswerChoice.objects.count(), 20)
+
+class CareerSearchTests(TestCase):
+    def setUp(self):
+        biology = Subject.objects.create(name='Biology', code='BIO', category='sciences', difficulty_level='medium')
+        careers = [
+            ('Medical Doctor', 'Diagnoses and treats patients', 'health'),
+            ('Software Engineer', 'Builds applications for clients', 'stem'),
+            ('Civil Engineer', 'Designs roads and bridges', 'stem'),
+            ('Project Manager', 'Leads engineering teams', 'business'),
+            ('Secondary School Teacher', 'Teaches students', 'education'),
+        ]
+        self.careers = {}
+        for name, description, category in careers:
+            self.careers[name] = Career.objects.create(
+                name=name, description=description, category=category,
+                job_outlook='high', kenyan_market_demand='growing'
+            )
+        self.careers['Medical Doctor'].required_subjects.add(biology)
+        self.user = CustomUser.objects.create_user(username='student', password='password123')
+
+    def search(self, query):
+        return [career.name for career in get_catalogue().search_careers(query)]
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(self.search('engineer'), ['Civil Engineer', 'Software Engineer', 'Project Manager'])
+
+    def test_prefixes_match_for_typeahead(self):
+        self.assertEqual(self.search('soft eng'), ['Software Engineer'])
+        self.assertEqual(self.search('teac'), ['Secondary School Teacher'])
+
+    def test_swahili_synonyms_subjects_and_categories(self):
+        self.assertEqual(self.search('daktari'), ['Medical Doctor'])
+        self.assertEqual(self.search('mwalimu'), ['Secondary School Teacher'])
+        self.assertEqual(self.search('biology'), ['Medical Doctor'])
+        self.assertEqual(self.search('STEM'), ['Civil Engineer', 'Software Engineer'])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.search('civil doctor'), [])
+        self.assertEqual(self.search('the'), [])
+
+    def test_api_search_is_ranked(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/recommendations/api/careers/', {'search': 'engineer'})
+        results = response.json()
+        results = results['results'] if isinstance(results, dict) else results
+        self.assertEqual([career['name'] for career in results], ['Civil Engineer', 'Software Engineer', 'Project Manager'])
+
+class CareerNeighbourMixin:
+    def setUp(self):
+        call_command('populate_mbti_data', stdout=StringIO())
+        self.types = list(PersonalityType.objects.order_by('id'))
+        self.subjects = [
+            Subject.objects.create(name=f'Subject {i}', code=f'S{i}', category='sciences', difficulty_level='medium')
+            for i in range(10)
+        ]
+
+    def create_career(self, name, required=(), recommended=(), matches=()):
+        career = Career.objects.create(
+            name=name, description='', category='stem', job_outlook='high', kenyan_market_demand='growing'
+        )
+        career.required_subjects.set([self.subjects[i] for i in required])
+        career.recommended_subjects.set([self.subjects[i] for i in recommended])
+        CareerPersonalityMatch.objects.bulk_create([
+            CareerPersonalityMatch(career=career, personality_type=self.types[i], compatibility_score=score, reasoning='')
+            for i, score in matches
+        ])
+        return career
+
+    def stored_neighbours(self):
+        return list(CareerNeighbour.objects.order_by('career_id', 'rank').values_list(
+            'career_id', 'neighbour_id', 'similarity'
+        ))
+
+class CareerNeighbourTests(CareerNeighbourMixin, TestCase):
+    def test_related_careers_are_the_closest_in_one_query(self):
+        surgeon = self.create_career('Surgeon', required=[0, 1], recommended=[2], matches=[(0, 0.9)])
+        self.create_career('Physician', required=[0, 1], recommended=[2], matches=[(0, 0.8)])
+        self.create_career('Pharmacist', required=[0], recommended=[2, 3], matches=[(1, 0.9)])
+        self.create_career('Painter', recommended=[7], matches=[(0, 0.1)])
+        # The painter shares nothing with the others and gets no rows
+        self.assertEqual(refresh_career_neighbours(k=3), 3)
+
+        catalogue = get_catalogue()
+        with self.assertNumQueries(1):
+            related = get_related_careers(surgeon, limit=5, catalogue=catalogue)
+        self.assertEqual([career.name for career in related], ['Physician', 'Pharmacist'])
+        self.assertEqual(refresh_career_neighbours(k=3), 0)
+
+    def test_incremental_refresh_matches_a_full_recompute(self):
+        rng = random.Random(7)
+
+        def random_career(name):
+            return self.create_career(
+                name, required=rng.sample(range(10), 2), recommended=rng.sample(range(10), 3),
+                matches=[(i, round(rng.random(), 2)) for i in rng.sample(range(len(self.types)), 3)],
+            )
+
+        careers = [random_career(f'Career {i}') for i in range(60)]
+        refresh_career_neighbours(k=5)
+
+        for career in careers[:3]:
+            career.recommended_subjects.set(rng.sample(self.subjects, 3))
+        CareerPersonalityMatch.objects.filter(career=careers[3]).update(compatibility_score=0.95)
+        Career.objects.filter(id__in=[career.id for career in careers[4:6]]).delete()
+        random_career('New career')
+        refresh_career_neighbours(k=5)
+        incremental = self.stored_neighbours()
+
+        CareerNeighbour.objects.all().delete()
+        refresh_career_neighbours(k=5)
+        self.assertEqual(incremental, self.stored_neighbours())
+
+class NeighbourRefreshTests(CareerNeighbourMixin, TransactionTestCase):
+    """Refreshes run on commit, so these tests commit for real"""
+
+    def test_catalogue_changes_refresh_neighbours_after_commit(self):
+        first = self.create_career('First', required=[0])
+        second = self.create_career('Second', required=[0])
+        self.assertEqual(list(first.neighbour_links.values_list('neighbour_id', flat=True)), [second.id])
+
+    def test_an_admin_edit_queues_one_refresh(self):
+        with mock.patch('recommendations.signals.refresh_career_neighbours') as refresh:
+            # As the admin saves it: the career, then each subject link
+            with transaction.atomic():
+                career = Career.objects.create(
+                    name='Nurse', description='', category='health', job_outlook='high', kenyan_market_demand='growing'
+                )
+                career.required_subjects.add(self.subjects[0])
+                career.recommended_subjects.add(self.subjects[1])
+            self.assertEqual(refresh.call_count, 1)
+
+            # A rolled back edit does not stop the next one from queueing its refresh
+            with transaction.atomic():
+                try:
+                    with transaction.atomic():
+                        career.required_subjects.add(self.subjects[2])
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+                career.recommended_subjects.add(self.subjects[3])
+            self.assertEqual(refresh.call_count, 2)
@@ -6,7 +6,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView, ListView, DetailView
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404
 
 from .models import Career, Subject, StudentRecommendation, LearningStyle
 from .serializers import (
@@ -14,28 +14,52 @@ from .serializers import (
     LearningStyleSerializer, CareerRecommendationSerializer
 )
 from .services import RecommendationEngine, SubjectRecommender
+from .catalogue import get_catalogue
+from .neighbours import get_related_careers
 from users.models import StudentProfile
+from analytics.events import track_event
+from analytics.models import Event
 
-class CareerViewSet(viewsets.ReadOnlyModelViewSet):
+class CatalogueSnapshotMixin:
+    """Serve read-only catalogue endpoints from the worker's in-memory snapshot"""
+    catalogue_collection = None
+    
+    def get_queryset(self):
+        return list(getattr(get_catalogue(), self.catalogue_collection))
+    
+    def get_object(self):
+        objects_by_id = getattr(get_catalogue(), f'{self.catalogue_collection}_by_id')
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = objects_by_id[int(self.kwargs[lookup_url_kwarg])]
+        except (KeyError, ValueError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+class CareerViewSet(CatalogueSnapshotMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = CareerSerializer
-    queryset = Career.objects.prefetch_related(
-        'required_subjects', 'recommended_subjects'
-    ).all()
+    catalogue_collection = 'careers'
+    
+    def get_queryset(self):
+        search = self.request.query_params.get('search', '').strip()
+        if search and self.action == 'list':
+            return get_catalogue().search_careers(search)
+        return super().get_queryset()
     
     @action(detail=False, methods=['get'])
     def by_category(self, request):
         category = request.query_params.get('category')
+        careers = self.get_queryset()
         if category:
-            careers = self.get_queryset().filter(category=category)
-        else:
-            careers = self.get_queryset()
+            careers = [career for career in careers if career.category == category]
         
         serializer = self.get_serializer(careers, many=True)
         return Response(serializer.data)
 
-class SubjectViewSet(viewsets.ReadOnlyModelViewSet):
+class SubjectViewSet(CatalogueSnapshotMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = SubjectSerializer
-    queryset = Subject.objects.all()
+    catalogue_collection = 'subjects'
     pagination_class = None
 
 class StudentRecommendationViewSet(viewsets.ReadOnlyModelViewSet):
@@ -107,6 +131,7 @@ class CareerRecommendationsView(LoginRequiredMixin, TemplateView):
         except:
             recommended_subjects = []
         
+        track_event(Event.RECOMMENDATIONS_VIEWED, student_profile, len(recommendations))
         context.update({
             'recommendations': recommendations,
             'recommended_subjects': recommended_subjects,
@@ -120,6 +145,12 @@ class CareerDetailView(LoginRequiredMixin, DetailView):
     template_name = 'recommendations/career_detail.html'
     context_object_name = 'career'
     
+    def get_object(self, queryset=None):
+        try:
+            return get_catalogue().careers_by_id[self.kwargs['pk']]
+        except KeyError:
+            raise Http404("No career found matching the query")
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         student = self.request.user.studentprofile
@@ -134,13 +165,10 @@ class CareerDetailView(LoginRequiredMixin, DetailView):
         except StudentRecommendation.DoesNotExist:
             context['recommendation'] = None
         
-        # Get related careers
-        related_careers = Career.objects.filter(
-            Q(category=self.object.category) | 
-            Q(required_subjects__in=self.object.required_subjects.all())
-        ).distinct().exclude(id=self.object.id)[:5]
+        track_event(Event.CAREER_VIEWED, student, career_id=self.object.id)
         
-        context['related_careers'] = related_careers
+        # Closest careers by subjects and personality fit (recommendations.neighbours)
+        context['related_careers'] = get_related_careers(self.object, limit=5)
         context['student'] = student
         return context
 
@@ -152,29 +180,28 @@ class CareerListView(LoginRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
-        queryset = super().get_queryset().prefetch_related('required_subjects', 'recommended_subjects')
+        catalogue = get_catalogue()
+        search = self.request.GET.get('search', '').strip()
+        if search:
+            # Ranked best match first
+            careers = catalogue.search_careers(search)
+        else:
+            careers = sorted(catalogue.careers, key=lambda career: career.name)
         
         # Apply filters
         category = self.request.GET.get('category')
         if category:
-            queryset = queryset.filter(category=category)
+            careers = [career for career in careers if career.category == category]
         
         demand = self.request.GET.get('demand')
         if demand:
-            queryset = queryset.filter(kenyan_market_demand=demand)
-        
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | 
-                Q(description__icontains=search)
-            )
+            careers = [career for career in careers if career.kenyan_market_demand == demand]
         
-        return queryset.order_by('name')
+        return careers
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Career.objects.values_list('category', flat=True).distinct()
+        context['categories'] = get_catalogue().categories
         return context
 
 class SubjectListView(LoginRequiredMixin, ListView):
@@ -184,4 +211,4 @@ class SubjectListView(LoginRequiredMixin, ListView):
     context_object_name = 'subjects'
     
     def get_queryset(self):
-        return Subject.objects.all().order_by('name')
\ No newline at end of file
+        return sorted(get_catalogue().subjects, key=lambda subject: subject.name)
\ No newline at end of file
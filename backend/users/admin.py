@@ -1,5 +1,13 @@
-from django.contrib import admin
+import io
+
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from .forms import StudentImportForm
+from .importer import StudentImporter
 from .models import CustomUser, StudentProfile, School
 
 @admin.register(CustomUser)
@@ -7,7 +15,7 @@ class CustomUserAdmin(UserAdmin):
     list_display = ['username', 'email', 'user_type', 'date_joined']
     list_filter = ['user_type', 'is_staff', 'is_active']
     fieldsets = UserAdmin.fieldsets + (
-        ('Additional Info', {'fields': ('user_type', 'phone_number', 'date_of_birth')}),
+        ('Additional Info', {'fields': ('user_type', 'school', 'phone_number', 'date_of_birth')}),
     )
 
 @admin.register(StudentProfile)
@@ -16,6 +24,35 @@ class StudentProfileAdmin(admin.ModelAdmin):
     list_filter = ['grade_level', 'school']
     search_fields = ['user__username', 'user__email', 'school__name']
 
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='users_studentprofile_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        """Upload a CSV of students; rejected rows are listed on the same page"""
+        if not self.has_add_permission(request):
+            return redirect('admin:users_studentprofile_changelist')
+
+        report = None
+        form = StudentImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            csv_file = io.TextIOWrapper(form.cleaned_data['csv_file'].file, encoding='utf-8-sig', newline='')
+            # Hash in this process: a web worker must not start a process pool
+            report = StudentImporter(form.cleaned_data['school'], workers=0).run(csv_file)
+            if report.created:
+                messages.success(request, f"Imported {report.created} students into {form.cleaned_data['school']}.")
+            if not report.errors:
+                return redirect('admin:users_studentprofile_changelist')
+
+        return TemplateResponse(request, 'admin/users/studentprofile/import.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import students',
+            'form': form,
+            'report': report,
+        })
+
 @admin.register(School)
 class SchoolAdmin(admin.ModelAdmin):
     list_display = ['name', 'code', 'county', 'type']
@@ -1,6 +1,14 @@
+import csv
+import io
+
 from django import forms
+from django.conf import settings
 from django.contrib.auth.forms import UserCreationForm
-from .models import CustomUser
+from .models import CustomUser, School
+
+# Each password costs a full PBKDF2 run inside the request; bigger uploads
+# go through the import_students command, which hashes on a process pool
+DEFAULT_ADMIN_IMPORT_MAX_PASSWORDS = 50
 
 class CustomUserCreationForm(UserCreationForm):
     email = forms.EmailField(required=True)
@@ -18,4 +26,36 @@ class CustomUserCreationForm(UserCreationForm):
         user.last_name = self.cleaned_data['last_name']
         if commit:
             user.save()
-        return user
\ No newline at end of file
+        return user
+
+
+class StudentImportForm(forms.Form):
+    school = forms.ModelChoiceField(queryset=School.objects.order_by('name'))
+    csv_file = forms.FileField(
+        label='CSV file',
+        help_text="Header row required. Columns: username (required), email, first_name, last_name, "
+                  "password, phone_number, grade_level, kcpe_score, kcse_score, "
+                  "subjects (codes separated by ';'), career_aspirations. "
+                  "Files setting many passwords must be loaded with the import_students command."
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        upload, school = cleaned_data.get('csv_file'), cleaned_data.get('school')
+        if upload is None:
+            return cleaned_data
+
+        limit = getattr(settings, 'USERS_ADMIN_IMPORT_MAX_PASSWORDS', DEFAULT_ADMIN_IMPORT_MAX_PASSWORDS)
+        text = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            passwords = sum(1 for row in csv.DictReader(text) if row.get('password'))
+        finally:
+            text.detach()
+            upload.file.seek(0)
+        if passwords > limit:
+            code = school.code if school else '<school code>'
+            self.add_error('csv_file', (
+                f'{passwords} rows set a password; the admin hashes at most {limit}. '
+                f'Import this file with: python manage.py import_students --school {code} {upload.name}'
+            ))
+        return cleaned_data
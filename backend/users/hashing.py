@@ -0,0 +1,16 @@
+"""
+Password hashing for spawned worker processes. Nothing here touches the
+app registry, so this module can be imported before Django is set up.
+"""
+
+# Password hasher of a worker process, set once by init_hashing_worker
+_worker_hasher = None
+
+def init_hashing_worker(hasher):
+    """ProcessPoolExecutor initializer: keep the parent's configured hasher"""
+    global _worker_hasher
+    _worker_hasher = hasher
+
+def hash_passwords(passwords):
+    """Encode each password with the worker's hasher and a fresh salt"""
+    return [_worker_hasher.encode(password, _worker_hasher.salt()) for password in passwords]
@@ -0,0 +1,197 @@
+import csv
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.db import DatabaseError, transaction
+
+from recommendations.models import Subject
+from .hashing import hash_passwords, init_hashing_worker
+from .models import CustomUser, StudentProfile
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Other recognised columns: email, first_name, last_name, password, phone_number,
+# grade_level, kcpe_score, kcse_score, subjects (codes split by ';'), career_aspirations
+REQUIRED_COLUMNS = {'username'}
+KCSE_GRADES = {'A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'C-', 'D+', 'D', 'D-', 'E'}
+
+class ImportReport:
+    """Outcome of an import: rows created and (line, username, message) per rejected row"""
+
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+    def add_error(self, line, username, message):
+        self.errors.append((line, username, message))
+
+def parse_row(row, subjects_by_code):
+    """Validate one CSV row; returns (user fields, profile fields, subject ids) or raises ValueError"""
+    username = (row.get('username') or '').strip()
+    if not username:
+        raise ValueError('username is required')
+    if len(username) > 150:
+        raise ValueError('username is longer than 150 characters')
+
+    kcpe_score = (row.get('kcpe_score') or '').strip()
+    if kcpe_score:
+        try:
+            kcpe_score = Decimal(kcpe_score)
+        except InvalidOperation:
+            raise ValueError(f'kcpe_score {kcpe_score!r} is not a number')
+        if not 0 <= kcpe_score <= 500:
+            raise ValueError('kcpe_score must be between 0 and 500')
+
+    kcse_score = (row.get('kcse_score') or '').strip().upper()
+    if kcse_score and kcse_score not in KCSE_GRADES:
+        raise ValueError(f'kcse_score {kcse_score!r} is not a KCSE grade')
+
+    subject_ids = []
+    for code in (row.get('subjects') or '').replace(',', ';').split(';'):
+        code = code.strip()
+        if not code:
+            continue
+        if code not in subjects_by_code:
+            raise ValueError(f'unknown subject code {code!r}')
+        subject_ids.append(subjects_by_code[code])
+
+    user = {
+        'username': username,
+        'email': (row.get('email') or '').strip(),
+        'first_name': (row.get('first_name') or '').strip()[:150],
+        'last_name': (row.get('last_name') or '').strip()[:150],
+        'phone_number': (row.get('phone_number') or '').strip()[:15],
+        'password': row.get('password') or None,
+    }
+    profile = {
+        'grade_level': (row.get('grade_level') or '').strip()[:50],
+        'kcpe_score': kcpe_score or None,
+        'kcse_score': kcse_score,
+        'career_aspirations': (row.get('career_aspirations') or '').strip(),
+    }
+    return user, profile, list(dict.fromkeys(subject_ids))
+
+class StudentImporter:
+    """
+    Create students of one school from a CSV file.
+
+    Rows are read and written `batch_size` at a time, so memory stays flat.
+    Each batch costs one username lookup, one user insert, one profile
+    insert and one subject-link insert. Passwords are hashed across a
+    process pool; rows without one get an unusable password and no hashing
+    cost. A row that fails validation is reported and skipped; the rest of
+    its batch is still imported.
+    """
+
+    def __init__(self, school, workers=None, batch_size=DEFAULT_BATCH_SIZE):
+        self.school = school
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.batch_size = batch_size
+        self.subjects_by_code = dict(Subject.objects.values_list('code', 'id'))
+        self.executor = None
+
+    def run(self, csv_file):
+        """Import every row of a text file object; returns an ImportReport"""
+        report = ImportReport()
+        reader = csv.DictReader(csv_file)
+        missing = REQUIRED_COLUMNS - set(reader.fieldnames or [])
+        if missing:
+            report.add_error(1, '', f"missing column(s): {', '.join(sorted(missing))}")
+            return report
+
+        seen = set()
+        try:
+            while True:
+                # DictReader.line_num is the physical line of the last row read
+                batch = [(reader.line_num, row) for row in islice(reader, self.batch_size)]
+                if not batch:
+                    break
+                self.import_batch(batch, seen, report)
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+        return report
+
+    def import_batch(self, batch, seen, report):
+        parsed = []
+        for line, row in batch:
+            try:
+                user, profile, subject_ids = parse_row(row, self.subjects_by_code)
+            except ValueError as e:
+                report.add_error(line, (row.get('username') or '').strip(), str(e))
+                continue
+            if user['username'] in seen:
+                report.add_error(line, user['username'], 'username appears earlier in the file')
+                continue
+            seen.add(user['username'])
+            parsed.append((line, user, profile, subject_ids))
+
+        taken = set(CustomUser.objects.filter(
+            username__in=[user['username'] for _, user, _, _ in parsed]
+        ).values_list('username', flat=True))
+        for line, user, _, _ in parsed:
+            if user['username'] in taken:
+                report.add_error(line, user['username'], 'username already exists')
+        parsed = [item for item in parsed if item[1]['username'] not in taken]
+        if not parsed:
+            return
+
+        passwords = self.hash_passwords([user.pop('password') for _, user, _, _ in parsed])
+        users = [
+            CustomUser(user_type='student', password=password, **user)
+            for (_, user, _, _), password in zip(parsed, passwords)
+        ]
+
+        try:
+            with transaction.atomic():
+                CustomUser.objects.bulk_create(users)
+                profiles = StudentProfile.objects.bulk_create([
+                    StudentProfile(user=user, school=self.school, **profile)
+                    for user, (_, _, profile, _) in zip(users, parsed)
+                ])
+                StudentProfile.subjects.through.objects.bulk_create([
+                    StudentProfile.subjects.through(studentprofile_id=profile.id, subject_id=subject_id)
+                    for profile, (_, _, _, subject_ids) in zip(profiles, parsed)
+                    for subject_id in subject_ids
+                ])
+        except DatabaseError as e:
+            # e.g. a username registered since the lookup above; nothing in the batch was kept
+            for line, user, _, _ in parsed:
+                report.add_error(line, user['username'], f'not saved: {e}')
+            return
+        report.created += len(users)
+
+    def hash_passwords(self, passwords):
+        """Hash the given passwords in order; None becomes an unusable password"""
+        hashed = [make_password(None) if password is None else None for password in passwords]
+        to_hash = [password for password in passwords if password is not None]
+        if not to_hash:
+            return hashed
+
+        if self.workers > 0:
+            if self.executor is None:
+                # Spawned (not forked) so workers don't inherit database connections
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=init_hashing_worker,
+                    initargs=(get_hasher(),),
+                )
+            chunk = max(1, len(to_hash) // (self.workers * 4))
+            results = [
+                password
+                for chunk_result in self.executor.map(
+                    hash_passwords, [to_hash[i:i + chunk] for i in range(0, len(to_hash), chunk)]
+                )
+                for password in chunk_result
+            ]
+        else:
+            init_hashing_worker(get_hasher())
+            results = hash_passwords(to_hash)
+
+        results = iter(results)
+        return [next(results) if password is None else password for password in hashed]
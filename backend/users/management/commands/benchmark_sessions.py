@@ -0,0 +1,100 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from assessments.models import AnswerChoice, PersonalityType, Question
+from users.models import CustomUser
+
+MBTI_TYPES = [
+    'INTJ', 'INTP', 'ENTJ', 'ENTP', 'INFJ', 'INFP', 'ENFJ', 'ENFP',
+    'ISTJ', 'ISFJ', 'ESTJ', 'ESFJ', 'ISTP', 'ISFP', 'ESTP', 'ESFP',
+]
+
+CATEGORIES = ['EI', 'SN', 'TF', 'JP']
+
+# (label, SESSION_ENGINE, SESSION_SAVE_EVERY_REQUEST)
+CONFIGURATIONS = [
+    ('db, save every request', 'django.contrib.sessions.backends.db', True),
+    ('db, refresh', 'django.contrib.sessions.backends.db', False),
+    ('cached_db, refresh', 'django.contrib.sessions.backends.cached_db', False),
+    ('signed_cookies, refresh', 'django.contrib.sessions.backends.signed_cookies', False),
+]
+
+class Rollback(Exception):
+    pass
+
+class SessionQueryCounter:
+    """connection.execute_wrapper hook counting reads and writes of django_session"""
+
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if 'django_session' in sql:
+            if sql.lstrip().upper().startswith('SELECT'):
+                self.reads += 1
+            else:
+                self.writes += 1
+        return execute(sql, params, many, context)
+
+class Command(BaseCommand):
+    help = 'Count session table reads and writes while a student takes an assessment, per session configuration'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=40,
+                            help='Questions answered, one request each')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'configuration':<26} {'requests':>9} {'reads':>7} {'writes':>7} {'writes/request':>15}")
+        for label, engine, save_every_request in CONFIGURATIONS:
+            try:
+                # The synthetic student and question bank are rolled back afterwards
+                with transaction.atomic():
+                    requests, counter = self.take_assessment(engine, save_every_request, options['questions'])
+                    raise Rollback
+            except Rollback:
+                pass
+            self.stdout.write(
+                f'{label:<26} {requests:>9} {counter.reads:>7} {counter.writes:>7} '
+                f'{counter.writes / requests:>15.2f}'
+            )
+
+    def take_assessment(self, engine, save_every_request, question_count):
+        for mbti_type in MBTI_TYPES:
+            PersonalityType.objects.get_or_create(mbti_type=mbti_type, defaults={
+                'name': mbti_type, 'description': '', 'strengths': '',
+                'weaknesses': '', 'career_recommendations': '',
+            })
+        questions = Question.objects.bulk_create([
+            Question(text=f'Benchmark question {i}', category=CATEGORIES[i % 4])
+            for i in range(question_count)
+        ])
+        AnswerChoice.objects.bulk_create([
+            AnswerChoice(question=question, text=f'Answer {value}', value=value)
+            for question in questions for value in (3, -3)
+        ])
+        answers = dict(AnswerChoice.objects.filter(question__in=questions, value=3).values_list('question_id', 'id'))
+        user = CustomUser.objects.create_user(username='session-benchmark', password='password123')
+
+        counter = SessionQueryCounter()
+        with override_settings(
+            SESSION_ENGINE=engine, SESSION_SAVE_EVERY_REQUEST=save_every_request,
+            ALLOWED_HOSTS=['testserver'], ANALYTICS_PROFILER_ENABLED=False, ANALYTICS_EVENTS_ASYNC=False,
+        ):
+            client = Client()
+            # Logging in writes the session in every configuration; not counted
+            client.force_login(user)
+            with connection.execute_wrapper(counter):
+                requests = self.answer_all(client, questions, answers)
+        return requests, counter
+
+    def answer_all(self, client, questions, answers):
+        """Start, answer and complete an assessment; returns the number of requests"""
+        session = client.post('/assessments/api/sessions/').json()
+        for question in questions:
+            client.post(f"/assessments/api/sessions/{session['id']}/submit_response/", {
+                'question_id': question.id, 'answer_id': answers[question.id], 'response_time': 5,
+            })
+        client.post(f"/assessments/api/sessions/{session['id']}/complete_assessment/")
+        return len(questions) + 2
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from users.importer import DEFAULT_BATCH_SIZE, StudentImporter
+from users.models import School
+
+class Command(BaseCommand):
+    help = 'Create students, their subjects and KCPE/KCSE scores from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='CSV with a header row; only username is required')
+        parser.add_argument('--school', required=True, help='KNEC code of the school')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Password hashing processes (default: CPU count); 0 hashes in this process')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Rows validated and inserted per transaction')
+
+    def handle(self, *args, **options):
+        try:
+            school = School.objects.get(code=options['school'])
+        except School.DoesNotExist:
+            raise CommandError(f"No school with code {options['school']}")
+
+        importer = StudentImporter(school, workers=options['workers'], batch_size=options['batch_size'])
+        started = time.perf_counter()
+        try:
+            with open(options['csv_file'], newline='', encoding='utf-8-sig') as csv_file:
+                report = importer.run(csv_file)
+        except OSError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        for line, username, message in report.errors:
+            self.stderr.write(f'line {line} ({username or "-"}): {message}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {report.created} students into {school.name} in {elapsed:.1f}s; '
+            f'{len(report.errors)} rows rejected'
+        ))
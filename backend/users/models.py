@@ -9,6 +9,8 @@ class CustomUser(AbstractUser):
     )
     
     user_type = models.CharField(max_length=20, choices=USER_TYPE_CHOICES, default='student')
+    # The school a 'school' account acts for; it only sees that school's data
+    school = models.ForeignKey('School', on_delete=models.SET_NULL, null=True, blank=True, related_name='accounts')
     phone_number = models.CharField(max_length=15, blank=True)
     date_of_birth = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
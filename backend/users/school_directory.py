@@ -0,0 +1,106 @@
+import bisect
+import re
+from types import MappingProxyType
+
+from recommendations.catalogue import VersionedSnapshot
+from recommendations.search import normalize
+
+SCHOOL_DIRECTORY = 'schools'
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# How a query matched a school, best first
+NAME_PREFIX, WORD_PREFIX, CODE_PREFIX = range(3)
+
+_apostrophes = re.compile(r"['’]")
+_separators = re.compile(r'[\W_]+')
+
+def normalize_name(text):
+    """Lowercase words without accents or punctuation: "St. Mary's" -> "st marys" """
+    return ' '.join(_separators.split(_apostrophes.sub('', normalize(text)))).strip()
+
+class PrefixIndex:
+    """Sorted (key, position) pairs; lookup is a bisect plus a walk over the matching keys"""
+
+    def __init__(self, entries):
+        entries = sorted(entries)
+        self.keys = [key for key, _ in entries]
+        self.positions = [position for _, position in entries]
+
+    def matches(self, prefix):
+        """Positions whose key starts with `prefix`, in key order"""
+        for i in range(bisect.bisect_left(self.keys, prefix), len(self.keys)):
+            if not self.keys[i].startswith(prefix):
+                break
+            yield self.positions[i]
+
+class SchoolDirectory:
+    """
+    Every school, with prefix indexes for typeahead.
+
+    A query matches the start of a school's name, the start of a later word
+    of the name ("high" finds "Alliance High School") or the start of its
+    KNEC code. Results are ranked by how they matched, then schools in the
+    requested county first, then alphabetically. `schools` holds SchoolSerializer
+    payloads; treat them as read-only, they are shared by every request in
+    the worker.
+    """
+
+    def __init__(self, version, updated_at, schools):
+        self.version = version
+        self.updated_at = updated_at
+        self.schools = tuple(sorted(schools, key=lambda school: normalize_name(school['name'])))
+        self.schools_by_id = MappingProxyType({school['id']: school for school in self.schools})
+        counties = {}
+        for position, school in enumerate(self.schools):
+            counties.setdefault(normalize_name(school['county']), []).append(position)
+        self.counties = MappingProxyType({county: tuple(positions) for county, positions in counties.items()})
+        # {county or None: {match kind: PrefixIndex}}; None indexes every school
+        self.indexes = {None: self.build_indexes(range(len(self.schools)))}
+        for county, positions in self.counties.items():
+            self.indexes[county] = self.build_indexes(positions)
+
+    @classmethod
+    def build(cls, version, updated_at):
+        from .models import School
+        from .serializers import SchoolSerializer
+
+        return cls(version, updated_at, School.objects.values(*SchoolSerializer.Meta.fields))
+
+    def build_indexes(self, positions):
+        names, words, codes = [], [], []
+        for position in positions:
+            school = self.schools[position]
+            name = normalize_name(school['name']).split()
+            names.append((' '.join(name), position))
+            words.extend((' '.join(name[i:]), position) for i in range(1, len(name)))
+            codes.append((normalize_name(school['code']), position))
+        return {NAME_PREFIX: PrefixIndex(names), WORD_PREFIX: PrefixIndex(words), CODE_PREFIX: PrefixIndex(codes)}
+
+    def search(self, query, county=None, limit=DEFAULT_LIMIT):
+        """Up to `limit` schools matching the typed prefix, best first"""
+        query = normalize_name(query)
+        county = normalize_name(county) if county else None
+        scopes = [county, None] if county in self.indexes else [None]
+        if query:
+            candidates = (
+                self.indexes[scope][kind].matches(query)
+                for kind in (NAME_PREFIX, WORD_PREFIX, CODE_PREFIX) for scope in scopes
+            )
+        else:
+            candidates = (self.counties[scope] if scope else range(len(self.schools)) for scope in scopes)
+
+        found = {}
+        for positions in candidates:
+            for position in positions:
+                found.setdefault(position, None)
+                if len(found) == limit:
+                    return [self.schools[position] for position in found]
+        return [self.schools[position] for position in found]
+
+school_directory = VersionedSnapshot(SCHOOL_DIRECTORY, SchoolDirectory.build)
+
+def get_school_directory():
+    """Current school directory snapshot for this worker"""
+    return school_directory.get()
@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+
+DEFAULT_REFRESH_FRACTION = 0.1
+# Unix time of the session's last save, stored in the session itself
+REFRESHED_AT_KEY = '_refreshed_at'
+
+class SessionRefreshMiddleware:
+    """
+    Keep active sessions alive without saving them on every request.
+
+    With SESSION_SAVE_EVERY_REQUEST off, Django only saves a session when it
+    changes, so it would expire SESSION_COOKIE_AGE after login however
+    active the user is. This re-saves it, pushing back its expiry, once its
+    last save is older than SESSION_REFRESH_FRACTION of SESSION_COOKIE_AGE:
+    about one write a day and a half with the defaults, instead of one per
+    request. Must come after SessionMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        session = getattr(request, 'session', None)
+        # Sessions the request never read are left alone rather than loaded here
+        if session is None or not session.accessed or settings.SESSION_SAVE_EVERY_REQUEST:
+            return response
+        if session.is_empty():
+            return response
+
+        now = int(time.time())
+        if session.modified:
+            # Being saved anyway; record it so the next refresh is counted from now
+            session[REFRESHED_AT_KEY] = now
+            return response
+
+        fraction = getattr(settings, 'SESSION_REFRESH_FRACTION', DEFAULT_REFRESH_FRACTION)
+        refreshed_at = session.get(REFRESHED_AT_KEY, 0)
+        if now - refreshed_at >= settings.SESSION_COOKIE_AGE * fraction:
+            session[REFRESHED_AT_KEY] = now
+        return response
@@ -1,7 +1,12 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import StudentProfile
+from assessments.models import AssessmentResult
+from recommendations.catalogue import CAREER_CATALOGUE, bump_catalogue_version, catalogue_bumped
+from recommendations.models import LearningStyle, StudentRecommendation
+from .models import School, StudentProfile
+from .school_directory import SCHOOL_DIRECTORY
+from .summary import invalidate_all_student_summaries, invalidate_student_summaries
 
 User = get_user_model()
 
@@ -12,7 +17,38 @@ def create_student_profile(sender, instance, created, **kwargs):
         StudentProfile.objects.get_or_create(user=instance)
 
 @receiver(post_save, sender=User)
-def save_student_profile(sender, instance, **kwargs):
+def save_student_profile(sender, instance, update_fields=None, **kwargs):
     """Save the student profile when the user is saved"""
+    # Logging in only touches last_login; the profile hasn't changed
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
     if hasattr(instance, 'studentprofile'):
-        instance.studentprofile.save()
\ No newline at end of file
+        instance.studentprofile.save()
+
+@receiver(post_save, sender=StudentProfile)
+def student_profile_changed(sender, instance, **kwargs):
+    """Profile completion is part of the dashboard summary"""
+    invalidate_student_summaries(user_ids=[instance.user_id])
+
+@receiver([post_save, post_delete], sender=AssessmentResult)
+@receiver([post_save, post_delete], sender=StudentRecommendation)
+def student_results_changed(sender, instance, **kwargs):
+    """Drop the dashboard summary when a result or recommendation is saved or deleted"""
+    # Bulk writes in persist_recommendations invalidate explicitly
+    invalidate_student_summaries(student_ids=[instance.student_id])
+
+@receiver(catalogue_bumped)
+def catalogue_text_changed(sender, name, **kwargs):
+    """Summaries copy career and personality type text; drop them all when it changes"""
+    if name == CAREER_CATALOGUE:
+        invalidate_all_student_summaries()
+
+@receiver([post_save, post_delete], sender=LearningStyle)
+def learning_style_changed(sender, **kwargs):
+    """Summaries copy learning style descriptions"""
+    invalidate_all_student_summaries()
+
+@receiver([post_save, post_delete], sender=School)
+def school_directory_changed(sender, **kwargs):
+    """Bump the school directory version so every worker rebuilds its search index"""
+    bump_catalogue_version(SCHOOL_DIRECTORY)
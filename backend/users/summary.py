@@ -0,0 +1,143 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Case, CharField, F, OuterRef, Subquery, Value, When
+
+from ai_coach.services import DEFAULT_LEARNING_STYLE, LEARNING_STYLE_BY_MBTI
+from recommendations.models import LearningStyle
+from .models import StudentProfile
+
+DEFAULT_SUMMARY_CACHE_TTL = 60 * 15
+TOP_CAREERS = 5
+
+# Token of the catalogue text summaries were built from; see invalidate_all_student_summaries
+GENERATION_KEY = 'users:summary:generation'
+
+def summary_key(user_id):
+    return f'users:summary:{user_id}'
+
+def summary_cache():
+    """
+    Cache holding the summaries. It must be shared by every worker, or an
+    invalidation would only reach the worker that made the change.
+    """
+    return caches[getattr(settings, 'USERS_SUMMARY_CACHE_ALIAS', settings.SESSION_CACHE_ALIAS)]
+
+class StudentSummary:
+    """
+    What the dashboard shows about a student: personality type, top careers
+    and learning style. Plain values only, so it can live in the cache.
+    """
+
+    def __init__(self, student_id, profile_started, personality_type=None, careers=(), learning_style=None):
+        self.student_id = student_id
+        # School or grade level filled in
+        self.profile_started = profile_started
+        # {'mbti_type', 'name'} or None before the assessment
+        self.personality_type = personality_type
+        # ({'name', 'description', 'overall_score'}, ...) best first
+        self.careers = tuple(careers)
+        # {'name', 'description'} or None
+        self.learning_style = learning_style
+        # GENERATION_KEY value when built; a different value means stale text
+        self.generation = None
+
+    @classmethod
+    def build(cls, user_id):
+        """Read a student's summary with one query; None if the user has no student profile"""
+        style_name = Case(
+            *[
+                When(assessmentresult__personality_type__mbti_type=mbti_type, then=Value(style))
+                for mbti_type, style in LEARNING_STYLE_BY_MBTI.items()
+            ],
+            default=Value(DEFAULT_LEARNING_STYLE),
+            output_field=CharField(),
+        )
+        rows = list(StudentProfile.objects.filter(user_id=user_id).annotate(
+            learning_style_name=style_name,
+            learning_style_description=Subquery(
+                LearningStyle.objects.filter(name=OuterRef('learning_style_name')).order_by('id').values('description')[:1]
+            ),
+        ).order_by(
+            F('studentrecommendation__overall_score').desc(nulls_last=True)
+        ).values_list(
+            'id', 'school_id', 'grade_level',
+            'assessmentresult__personality_type__mbti_type', 'assessmentresult__personality_type__name',
+            'learning_style_name', 'learning_style_description',
+            'studentrecommendation__career__name', 'studentrecommendation__career__description',
+            'studentrecommendation__overall_score',
+        )[:TOP_CAREERS])
+        if not rows:
+            return None
+
+        student_id, school_id, grade_level, mbti_type, type_name, style, style_description = rows[0][:7]
+        assessed = mbti_type is not None
+        return cls(
+            student_id,
+            profile_started=bool(school_id or grade_level),
+            personality_type={'mbti_type': mbti_type, 'name': type_name} if assessed else None,
+            careers=[
+                {'name': name, 'description': description, 'overall_score': score}
+                for name, description, score in (row[7:] for row in rows) if name is not None
+            ],
+            # Same rule as AICoachService.get_learning_style_recommendation
+            learning_style=(
+                {'name': style, 'description': style_description}
+                if assessed and style_description is not None else None
+            ),
+        )
+
+def get_student_summary(user):
+    """
+    Cached StudentSummary of a user, creating their student profile if it
+    is missing. A cache hit costs no queries.
+    """
+    cache = summary_cache()
+    key = summary_key(user.id)
+    cached = cache.get_many([GENERATION_KEY, key])
+    generation = cached.get(GENERATION_KEY)
+    if generation is None:
+        # Never fall back to an old token: summaries built from it would revive
+        cache.add(GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    summary = cached.get(key)
+    if summary is not None and summary.generation == generation:
+        return summary
+
+    summary = StudentSummary.build(user.id)
+    if summary is None:
+        profile = StudentProfile.objects.create(user=user)
+        summary = StudentSummary(profile.id, profile_started=bool(profile.grade_level))
+    summary.generation = generation
+    cache.set(key, summary, getattr(settings, 'USERS_SUMMARY_CACHE_TTL', DEFAULT_SUMMARY_CACHE_TTL))
+    return summary
+
+def invalidate_student_summaries(student_ids=None, user_ids=None):
+    """
+    Drop the cached summaries of the given students (StudentProfile ids)
+    and users once the current transaction commits, so a concurrent
+    dashboard can't cache the rows being replaced.
+    """
+    student_ids = list(student_ids or [])
+    user_ids = list(user_ids or [])
+
+    def delete():
+        keys = [summary_key(user_id) for user_id in user_ids]
+        if student_ids:
+            keys += [
+                summary_key(user_id)
+                for user_id in StudentProfile.objects.filter(id__in=student_ids).values_list('user_id', flat=True)
+            ]
+        summary_cache().delete_many(keys)
+
+    transaction.on_commit(delete)
+
+def invalidate_all_student_summaries():
+    """
+    Make every cached summary stale once the current transaction commits,
+    for changes to the career, personality type or learning style text
+    they copy. Summaries are rebuilt as they are next read.
+    """
+    transaction.on_commit(lambda: summary_cache().set(GENERATION_KEY, uuid.uuid4().hex, timeout=None))
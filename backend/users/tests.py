@@ -1,3 +1,319 @@
-from django.test import TestCase
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from assessments.models import AssessmentResult, PersonalityType
+from recommendations.loaders import load_catalogue
+from recommendations.models import Career, LearningStyle, StudentRecommendation, Subject
+from recommendations.services import persist_recommendations
+from .importer import StudentImporter
+from .models import School, StudentProfile
+from .school_directory import get_school_directory
+from .summary import StudentSummary, get_student_summary, summary_cache, summary_key
+from .views import DashboardView
+
+CSV = (
+    'username,first_name,password,kcpe_score,kcse_score,subjects\n'
+    'amina,Amina,secret123,401,B+,MAT;ENG\n'
+    'brian,Brian,,388.5,a-,ENG\n'
+    'carol,Carol,,,Z,\n'
+    'amina,Again,,,,\n'
+    'existing,,,,,\n'
+    'dan,Dan,,,,BIO\n'
+    ',Nobody,,,,\n'
+)
+
+class StudentImporterTests(TestCase):
+    def setUp(self):
+        self.school = School.objects.create(name='Alliance', code='10001', county='Kiambu', type='national')
+        self.math = Subject.objects.create(name='Mathematics', code='MAT', category='core')
+        self.english = Subject.objects.create(name='English', code='ENG', category='core')
+        get_user_model().objects.create_user(username='existing', password='password123')
+
+    def test_valid_rows_are_created_and_invalid_rows_reported(self):
+        with self.assertNumQueries(7):
+            # subject codes, taken usernames, then each insert in its savepoint
+            report = StudentImporter(self.school, workers=0, batch_size=100).run(StringIO(CSV))
+
+        self.assertEqual(report.created, 2)
+        self.assertEqual([(line, username) for line, username, _ in report.errors], [
+            (4, 'carol'), (5, 'amina'), (7, 'dan'), (8, ''), (6, 'existing'),
+        ])
+
+        amina = StudentProfile.objects.get(user__username='amina')
+        self.assertEqual(amina.school, self.school)
+        self.assertEqual(amina.kcse_score, 'B+')
+        self.assertEqual(float(amina.kcpe_score), 401)
+        self.assertEqual(set(amina.subjects.values_list('code', flat=True)), {'MAT', 'ENG'})
+        self.assertEqual(amina.user.user_type, 'student')
+        self.assertTrue(amina.user.check_password('secret123'))
+
+        brian = StudentProfile.objects.get(user__username='brian')
+        self.assertEqual(brian.kcse_score, 'A-')
+        self.assertFalse(brian.user.has_usable_password())
+
+    def test_rows_are_imported_in_batches(self):
+        rows = ''.join(f'student{i},MAT\n' for i in range(25))
+        report = StudentImporter(self.school, workers=0, batch_size=10).run(StringIO('username,subjects\n' + rows))
+
+        self.assertEqual(report.created, 25)
+        self.assertEqual(StudentProfile.objects.filter(school=self.school, subjects=self.math).count(), 25)
+
+    def test_passwords_are_hashed_in_worker_processes(self):
+        csv_text = 'username,password\n' + ''.join(f'student{i},pass{i}word\n' for i in range(4))
+        report = StudentImporter(self.school, workers=2).run(StringIO(csv_text))
+
+        self.assertEqual(report.created, 4)
+        user = get_user_model().objects.get(username='student3')
+        self.assertTrue(user.check_password('pass3word'))
+
+    def test_missing_username_column_is_rejected(self):
+        report = StudentImporter(self.school, workers=0).run(StringIO('name,email\nAmina,a@example.com\n'))
+
+        self.assertEqual(report.created, 0)
+        self.assertEqual(report.errors, [(1, '', 'missing column(s): username')])
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as csv_file:
+            csv_file.write(CSV)
+        out, err = StringIO(), StringIO()
+        call_command('import_students', csv_file.name, school='10001', workers=0, stdout=out, stderr=err)
+
+        self.assertIn('Imported 2 students', out.getvalue())
+        self.assertIn("line 7 (dan): unknown subject code 'BIO'", err.getvalue())
+
+    def test_admin_upload(self):
+        admin = get_user_model().objects.create_superuser(username='admin', password='password123')
+        self.client.force_login(admin)
+        upload = SimpleUploadedFile('students.csv', CSV.encode())
+
+        with mock.patch('users.importer.ProcessPoolExecutor') as pool:
+            response = self.client.post('/admin/users/studentprofile/import/', {
+                'school': self.school.id, 'csv_file': upload,
+            })
+
+        pool.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'unknown subject code')
+        self.assertEqual(StudentProfile.objects.filter(school=self.school).count(), 2)
+
+    @override_settings(USERS_ADMIN_IMPORT_MAX_PASSWORDS=0)
+    def test_admin_upload_sends_files_with_many_passwords_to_the_command(self):
+        admin = get_user_model().objects.create_superuser(username='admin', password='password123')
+        self.client.force_login(admin)
+        upload = SimpleUploadedFile('students.csv', CSV.encode())
+
+        response = self.client.post('/admin/users/studentprofile/import/', {
+            'school': self.school.id, 'csv_file': upload,
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'python manage.py import_students --school {self.school.code} students.csv')
+        self.assertFalse(StudentProfile.objects.filter(school=self.school).exists())
+
+class DashboardSummaryTests(TestCase):
+    def setUp(self):
+        summary_cache().clear()
+        self.user = get_user_model().objects.create_user(username='student', password='password123')
+        self.student = self.user.studentprofile
+        self.personality_type = PersonalityType.objects.create(
+            mbti_type='ENFJ', name='The Protagonist', description='', strengths='',
+            weaknesses='', career_recommendations=''
+        )
+        LearningStyle.objects.create(name='auditory', description='Learn by listening', study_recommendations='')
+        self.careers = [
+            Career.objects.create(
+                name=f'Career {i}', description='', category='stem', job_outlook='high', kenyan_market_demand='growing'
+            )
+            for i in range(8)
+        ]
+        self.client.force_login(self.user)
+
+    def recommend(self, scores):
+        persist_recommendations({self.student.id: [
+            {
+                'career': career, 'personality_match_score': score, 'academic_match_score': None,
+                'overall_score': score, 'reasoning': '',
+            }
+            for career, score in zip(self.careers, scores)
+        ]})
+
+    def assess(self):
+        return AssessmentResult.objects.create(
+            student=self.student, personality_type=self.personality_type,
+            ei_score=0, sn_score=0, tf_score=0, jp_score=0, confidence=0
+        )
+
+    def test_summary_is_one_query(self):
+        self.assess()
+        self.recommend([0.1 * i for i in range(8)])
+
+        with self.assertNumQueries(1):
+            summary = StudentSummary.build(self.user.id)
+
+        self.assertEqual(summary.personality_type, {'mbti_type': 'ENFJ', 'name': 'The Protagonist'})
+        self.assertEqual([career['name'] for career in summary.careers], [f'Career {i}' for i in (7, 6, 5, 4, 3)])
+        self.assertEqual(summary.learning_style, {'name': 'auditory', 'description': 'Learn by listening'})
+        self.assertFalse(summary.profile_started)
+
+    def test_summary_before_assessment(self):
+        summary = StudentSummary.build(self.user.id)
+
+        self.assertIsNone(summary.personality_type)
+        self.assertIsNone(summary.learning_style)
+        self.assertEqual(summary.careers, ())
+
+    def test_dashboard_context_comes_from_cached_summary(self):
+        self.assess()
+        request = RequestFactory().get('/users/dashboard/')
+        request.user = self.user
+        view = DashboardView()
+        view.setup(request)
+        view.get_context_data()
+
+        with self.assertNumQueries(0):
+            context = view.get_context_data()
+        self.assertEqual(context['summary'].personality_type['mbti_type'], 'ENFJ')
+
+    def test_saves_invalidate_the_summary(self):
+        get_student_summary(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assess()
+        self.assertEqual(get_student_summary(self.user).personality_type['mbti_type'], 'ENFJ')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recommend([0.5, 0.9])
+        self.assertEqual(get_student_summary(self.user).careers[0]['name'], 'Career 1')
+
+        self.student.grade_level = 'Form 4'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.save()
+        self.assertTrue(get_student_summary(self.user).profile_started)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentRecommendation.objects.filter(student=self.student, career=self.careers[1]).delete()
+        self.assertEqual(get_student_summary(self.user).careers[0]['name'], 'Career 0')
+
+    def test_catalogue_edits_invalidate_every_summary(self):
+        self.assess()
+        self.recommend([0.5, 0.9])
+        self.assertEqual(get_student_summary(self.user).careers[0]['name'], 'Career 1')
+
+        self.careers[1].name = 'Surgeon'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.careers[1].save()
+        self.assertEqual(get_student_summary(self.user).careers[0]['name'], 'Surgeon')
+
+        self.personality_type.name = 'The Teacher'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.personality_type.save()
+        self.assertEqual(get_student_summary(self.user).personality_type['name'], 'The Teacher')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            LearningStyle.objects.get(name='auditory').delete()
+        self.assertIsNone(get_student_summary(self.user).learning_style)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            load_catalogue({'learning_styles': [
+                {'name': 'auditory', 'description': 'Learn by discussion', 'study_recommendations': ''},
+            ]})
+        self.assertEqual(get_student_summary(self.user).learning_style['description'], 'Learn by discussion')
+
+    def test_summary_is_kept_in_the_shared_cache(self):
+        get_student_summary(self.user)
+
+        self.assertIsNotNone(caches[settings.USERS_SUMMARY_CACHE_ALIAS].get(summary_key(self.user.id)))
+        self.assertIsNone(cache.get(summary_key(self.user.id)))
+
+    def test_missing_profile_is_created(self):
+        self.student.delete()
+        summary_cache().clear()
+
+        summary = get_student_summary(self.user)
+
+        self.assertEqual(summary.student_id, StudentProfile.objects.get(user=self.user).id)
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db', SESSION_REFRESH_FRACTION=0.1)
+class SessionRefreshTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='student', password='password123')
+        self.client.force_login(self.user)
+
+    def session_writes(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/assessments/api/personality-types/').status_code, 200)
+        return [query['sql'] for query in queries if 'django_session' in query['sql'] and 'SELECT' not in query['sql']]
+
+    def test_session_is_saved_only_when_due(self):
+        # force_login skips the middleware, so the first request stamps the session
+        self.assertEqual(len(self.session_writes()), 1)
+        self.assertEqual(self.session_writes(), [])
+
+        two_days_later = time.time() + 2 * 24 * 60 * 60
+        with mock.patch('users.sessions.time.time', return_value=two_days_later):
+            self.assertEqual(len(self.session_writes()), 1)
+            self.assertEqual(self.session_writes(), [])
+
+    def test_login_stamps_the_session(self):
+        self.client.logout()
+        self.client.post('/users/login/', {'username': 'student', 'password': 'password123'})
+        self.assertEqual(self.session_writes(), [])
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_sessions', questions=4, stdout=out)
+        rows = {line[:26].strip(): line.split() for line in out.getvalue().splitlines()[1:]}
+        # requests, reads, writes, writes/request
+        self.assertEqual(rows['db, save every request'][-2], '6')
+        self.assertEqual(rows['signed_cookies, refresh'][-2], '0')
+
+class SchoolSearchTests(TestCase):
+    def setUp(self):
+        School.objects.bulk_create([
+            School(name='Alliance High School', code='11200001', county='Kiambu', type='national'),
+            School(name="St. Mary's Girls High School", code='20401002', county='Nairobi', type='county'),
+            School(name='Highway Secondary School', code='20401003', county='Nairobi', type='county'),
+            School(name='Highridge Academy', code='11200004', county='Kiambu', type='private'),
+        ])
+        # bulk_create sends no signals
+        School.objects.create(name='Kenya High School', code='20401005', county='Nairobi', type='national')
+
+    def search(self, **params):
+        response = self.client.get('/users/api/schools/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [school['name'] for school in response.json()]
+
+    def test_ranks_name_prefix_then_word_prefix_then_county(self):
+        self.assertEqual(self.search(q='high'), [
+            'Highridge Academy', 'Highway Secondary School',
+            'Alliance High School', 'Kenya High School', "St. Mary's Girls High School",
+        ])
+        self.assertEqual(self.search(q='high', county='nairobi', limit=3), [
+            'Highway Secondary School', 'Highridge Academy', 'Kenya High School',
+        ])
+
+    def test_matches_punctuation_free_names_and_knec_codes(self):
+        self.assertEqual(self.search(q='st marys'), ["St. Mary's Girls High School"])
+        self.assertEqual(self.search(q='112'), ['Alliance High School', 'Highridge Academy'])
+
+    def test_keystrokes_do_not_query_the_database(self):
+        get_school_directory()
+        with self.assertNumQueries(0):
+            for prefix in ('al', 'all', 'alli', 'allia'):
+                self.assertEqual(self.search(q=prefix), ['Alliance High School'])
+
+    def test_saving_a_school_rebuilds_the_index(self):
+        self.assertEqual(self.search(q='mang'), [])
+        School.objects.create(name='Mang\'u High School', code='11200006', county='Kiambu', type='national')
+        self.assertEqual(self.search(q='mang'), ["Mang'u High School"])
@@ -12,6 +12,8 @@ from django.urls import reverse_lazy
 from django.shortcuts import render, redirect
 from .forms import CustomUserCreationForm
 from .models import CustomUser, StudentProfile, School
+from .school_directory import DEFAULT_LIMIT, MAX_LIMIT, get_school_directory
+from .summary import get_student_summary
 from .serializers import (
     UserSerializer, RegisterSerializer, LoginSerializer,
     StudentProfileSerializer, SchoolSerializer
@@ -213,72 +215,28 @@ class SchoolViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = SchoolSerializer
     queryset = School.objects.all()
     
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def search(self, request):
-        query = request.query_params.get('q', '')
-        if query:
-            schools = School.objects.filter(name__icontains=query)[:10]
-        else:
-            schools = School.objects.all()[:10]
-        
-        serializer = self.get_serializer(schools, many=True)
-        return Response(serializer.data)
+        """Typeahead for registration forms: ?q=<name or KNEC code prefix>&county=<county>&limit=<n>"""
+        try:
+            limit = min(max(int(request.query_params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        except ValueError:
+            limit = DEFAULT_LIMIT
+        # Served from the worker's in-memory index; no query per keystroke
+        schools = get_school_directory().search(
+            request.query_params.get('q', ''), county=request.query_params.get('county'), limit=limit
+        )
+        return Response(schools)
 
 class DashboardView(LoginRequiredMixin, TemplateView):
     template_name = 'dashboard/home.html'
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
-        
-        # Ensure user has a student profile
-        self.ensure_student_profile(user)
-        
-        # Get assessment results if exists
-        try:
-            from assessments.models import AssessmentResult
-            assessment_result = AssessmentResult.objects.get(student=user.studentprofile)
-            context['assessment_result'] = assessment_result
-        except AssessmentResult.DoesNotExist:
-            context['assessment_result'] = None
-        except Exception as e:
-            # Handle any other exceptions gracefully
-            context['assessment_result'] = None
-            print(f"Error getting assessment result: {e}")
-        
-        # Get recent recommendations
-        try:
-            from recommendations.models import StudentRecommendation
-            recommendations = StudentRecommendation.objects.filter(
-                student=user.studentprofile
-            ).select_related('career')[:5]
-            context['recommendations'] = recommendations
-        except Exception as e:
-            context['recommendations'] = []
-            print(f"Error getting recommendations: {e}")
-        
-        # Get learning style if available
-        try:
-            from ai_coach.services import AICoachService
-            coach = AICoachService(user.studentprofile)
-            learning_style = coach.get_learning_style_recommendation()
-            context['learning_style'] = learning_style
-        except Exception as e:
-            context['learning_style'] = None
-            print(f"Error getting learning style: {e}")
-        
+        # Cached per student and dropped when results or recommendations change;
+        # creates the student profile if it is missing
+        context['summary'] = get_student_summary(self.request.user)
         return context
-    
-    def ensure_student_profile(self, user):
-        """Ensure the user has a student profile, create if missing"""
-        try:
-            # Try to access the student profile
-            _ = user.studentprofile
-        except Exception:
-            # Profile doesn't exist, create one
-            from .models import StudentProfile
-            StudentProfile.objects.create(user=user)
-            print(f"Created student profile for user: {user.username}")
 
 class ProfileView(LoginRequiredMixin, TemplateView):
     template_name = 'dashboard/profile.html'